@@ -0,0 +1,75 @@
+# benchmarks/async_benchmark.py
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to path to import from other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.async_store import as_async
+from storage.file_store import FileStore
+from storage.segment_store import SegmentStore
+from storage.sqlite_store import SQLiteStore
+from benchmarks.storage_benchmark import make_annotation
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Worst delay of a periodic tick, i.e. how long the event loop was blocked"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+async def run_writers(save, writers: int, per_writer: int) -> tuple:
+    """Run concurrent writer coroutines; returns (ops/sec, worst loop lag in ms)"""
+    annotations = [[make_annotation(w * per_writer + i) for i in range(per_writer)] for w in range(writers)]
+
+    async def writer(batch):
+        for annotation in batch:
+            await save(annotation)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(batch) for batch in annotations))
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    return writers * per_writer / elapsed, await lag * 1000
+
+async def blocking_save(store):
+    """A coroutine that calls the synchronous store directly, blocking the loop"""
+    async def save(annotation):
+        return store.save_annotation(annotation)
+    return save
+
+async def main(writers: int, per_writer: int):
+    factories = [
+        ("FileStore", FileStore),
+        ("FileStore (write-behind)", lambda d: FileStore(d, write_behind=True)),
+        ("SegmentStore", SegmentStore),
+        ("SQLiteStore", SQLiteStore)
+    ]
+
+    print(f"{writers} writers x {per_writer} annotations")
+    print(f"{'store':<28}{'mode':<10}{'ops/sec':>10}{'max lag ms':>12}")
+    for name, factory in factories:
+        for mode in ("blocking", "async"):
+            with tempfile.TemporaryDirectory() as data_dir:
+                store = factory(data_dir)
+                if mode == "async":
+                    save = as_async(store).asave_annotation
+                else:
+                    save = await blocking_save(store)
+                ops, lag = await run_writers(save, writers, per_writer)
+                if hasattr(store, "close"):
+                    store.close()
+            print(f"{name:<28}{mode:<10}{ops:>10,.0f}{lag:>12.1f}")
+
+if __name__ == "__main__":
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_writer = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(main(writers, per_writer))
@@ -0,0 +1,95 @@
+# benchmarks/footprint_benchmark.py
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+# Add the parent directory to path to import from other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.storage_benchmark import make_annotation
+from storage.file_store import FileStore
+
+def build_store(store_factory: Callable, data_dir: str, documents: int, runs: int,
+                review_fraction: float = 0.3) -> FileStore:
+    """Annotate each document `runs` times (as the pipeline does per model) and review some"""
+    store = store_factory(data_dir)
+    document_ids = []
+    for index in range(documents):
+        annotation = make_annotation(index)
+        for run in range(runs):
+            document_ids.append(store.save_annotation(dict(annotation, model_name=f"model-{run}")))
+
+    for document_id in random.sample(document_ids, int(len(document_ids) * review_fraction)):
+        entities = [dict(entity) for entity in store.find_by_id(document_id)["entities"]]
+        entities[0]["type"] = "CORRECTED"
+        store.update_after_review(document_id, entities)
+    store.flush()
+    return store
+
+def read_amplification(store: FileStore) -> Dict[str, float]:
+    """Bytes read from disk per byte of annotation returned, with a cold cache"""
+    reopened = FileStore(store.data_dir, compress_documents=store.compress_documents,
+                         compression=store._blobs.compression)
+    disk_bytes = returned_bytes = 0
+    start = time.perf_counter()
+    for document_id in list(reopened._manifest.annotations):
+        annotation = reopened.find_by_id(document_id)
+        disk_bytes += reopened._layout.record_path(reopened.annotations_dir, document_id).stat().st_size
+        if store.compress_documents:
+            blobs = store._blobs
+            disk_bytes += blobs._path(blobs.hash_text(annotation["document"])).stat().st_size
+        returned_bytes += len(json.dumps(annotation, separators=(",", ":")))
+    elapsed = time.perf_counter() - start
+    reads = len(reopened._manifest.annotations)
+    return {"amplification": disk_bytes / returned_bytes, "reads_per_sec": reads / elapsed}
+
+def legacy_footprint(store: FileStore) -> Dict[str, int]:
+    """Bytes the same data took as pretty-printed files with full correction entity lists"""
+    annotation_bytes = sum(len(json.dumps(store.find_by_id(document_id), indent=2))
+                           for document_id in list(store._manifest.annotations))
+    correction_bytes = sum(len(json.dumps(correction, indent=2))
+                           for correction in store.get_corrections(limit=len(store._manifest.corrections)))
+    return {"annotation_bytes": annotation_bytes, "correction_bytes": correction_bytes, "blob_bytes": 0}
+
+def zstd_with_dictionary(data_dir: str) -> FileStore:
+    store = FileStore(data_dir, compress_documents=True, compression="zstd")
+    store.train_document_dictionary([make_annotation(-i)["document"] for i in range(1, 500)])
+    return store
+
+if __name__ == "__main__":
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    runs = 3
+    random.seed(0)
+
+    print(f"{documents} documents x {runs} annotation runs, 30% reviewed")
+    print(f"{'store':<28}{'annotations':>13}{'corrections':>13}{'blobs':>11}{'total':>11}"
+          f"{'read amp':>10}{'reads/s':>10}")
+    def print_row(name: str, footprint: Dict[str, int], reads: Dict[str, float] = None):
+        total = footprint["annotation_bytes"] + footprint["correction_bytes"] + footprint["blob_bytes"]
+        line = (f"{name:<28}{footprint['annotation_bytes'] / 1e6:>11.2f}MB"
+                f"{footprint['correction_bytes'] / 1e6:>11.2f}MB{footprint['blob_bytes'] / 1e6:>9.2f}MB"
+                f"{total / 1e6:>9.2f}MB")
+        if reads:
+            line += f"{reads['amplification']:>10.2f}{reads['reads_per_sec']:>10,.0f}"
+        print(line)
+
+    for name, factory in [
+        ("inline JSON", lambda d: FileStore(d)),
+        ("blobs (gzip)", lambda d: FileStore(d, compress_documents=True, compression="gzip")),
+        ("blobs (zstd)", lambda d: FileStore(d, compress_documents=True)),
+        ("blobs (zstd, dictionary)", zstd_with_dictionary),
+    ]:
+        with tempfile.TemporaryDirectory() as data_dir:
+            try:
+                store = build_store(factory, data_dir, documents, runs)
+            except ImportError as e:
+                print(f"{name:<28}skipped: {e}")
+                continue
+            if not store.compress_documents:
+                print_row("previous format (pretty)", legacy_footprint(store))
+            print_row(name, store.get_storage_footprint(), read_amplification(store))
+            store.close()
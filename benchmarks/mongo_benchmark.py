@@ -0,0 +1,44 @@
+# benchmarks/mongo_benchmark.py
+import os
+import sys
+import time
+
+# Add the parent directory to path to import from other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.annotation_store import AnnotationStore
+from benchmarks.storage_benchmark import make_annotation, report
+
+def make_store() -> AnnotationStore:
+    """Connect to MONGO_URI if set, otherwise run against an in-process mongomock"""
+    uri = os.getenv("MONGO_URI")
+    if uri:
+        store = AnnotationStore(uri, db_name="annotation_benchmark")
+    else:
+        import mongomock
+        store = AnnotationStore(db_name="annotation_benchmark", client=mongomock.MongoClient())
+    store.annotations.delete_many({})
+    store.corrections.delete_many({})
+    return store
+
+def timed(operation, count: int) -> float:
+    start = time.perf_counter()
+    operation()
+    return count / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    store = make_store()
+
+    single = timed(lambda: [store.save_annotation(make_annotation(i)) for i in range(count)], count)
+    bulk = timed(lambda: store.save_annotations([make_annotation(i) for i in range(count)]), count)
+
+    ids = [str(annotation["_id"]) for annotation in store.find_by_review_status(False, count)]
+    review = timed(lambda: [store.update_after_review(document_id, [])
+                            for document_id in ids], len(ids))
+
+    report([
+        ("save_annotation", single),
+        ("save_annotations (bulk)", bulk),
+        ("update_after_review", review)
+    ])
@@ -0,0 +1,61 @@
+# benchmarks/search_benchmark.py
+import os
+import sys
+import tempfile
+import time
+from typing import List, Dict, Any
+
+# Add the parent directory to path to import from other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.storage_benchmark import make_annotation
+from storage.search_index import SearchIndex
+
+def queries(templates: List[Dict[str, Any]]) -> List[str]:
+    entity = templates[7]["entities"][0]
+    return [
+        "7",                              # word in 1 document of every 1000
+        "lorem",                          # word in every document
+        "lorem 7",
+        f'{entity["type"]}:"{entity["text"]}"',
+        "7 OR 12 OR 99",
+        f'(7 OR 12) AND NOT {entity["type"]}:*',
+        "NOT 7",
+    ]
+
+def build_index(directory: str, templates: List[Dict[str, Any]], count: int) -> SearchIndex:
+    """Index `count` documents cycling through the template annotations"""
+    index = SearchIndex(directory)
+    for number in range(count):
+        annotation = templates[number % len(templates)]
+        index.add(f"doc-{number:09d}", 1, annotation["document"], annotation["entities"])
+    return index
+
+def time_query(index: SearchIndex, query: str, repeat: int = 5) -> float:
+    """Best-of-n milliseconds for the first page of a query"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        index.search(query, limit=20)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    templates = [make_annotation(i) for i in range(1000)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        build_index(directory, templates, count).save()
+        print(f"indexed {count:,} documents in {time.perf_counter() - start:.1f}s")
+
+        index = SearchIndex(directory)
+        start = time.perf_counter()
+        index.load()
+        print(f"loaded the index in {time.perf_counter() - start:.2f}s")
+
+        print(f"{'query':<34}{'matches':>10}{'ms':>10}")
+        for query in queries(templates):
+            _, total = index.search(query, limit=20)
+            print(f"{query:<34}{total:>10,}{time_query(index, query):>10.2f}")
@@ -0,0 +1,65 @@
+# benchmarks/startup_benchmark.py
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the parent directory to path to import from other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.storage_benchmark import make_annotation
+from storage.file_store import FileStore
+from storage.manifest import encode_annotation_row, encode_correction_row
+from storage.summary import summarize_annotation
+
+def write_manifest(data_dir: str, start: int, count: int, versions: int = 2):
+    """Append manifest rows for `count` annotations (each written `versions` times) and some corrections"""
+    templates = [summarize_annotation(make_annotation(i)) for i in range(100)]
+    with open(Path(data_dir) / "manifest.tsv", "a") as f:
+        for version in range(1, versions + 1):
+            for index in range(start, start + count):
+                summary = dict(templates[index % 100], _id=f"doc-{index:09d}",
+                               timestamp=1.7e9 + index, version=version)
+                f.write("\t".join(encode_annotation_row(summary)) + "\n")
+        for index in range(start, start + count, 10):
+            correction = {"_id": f"corr-{index:09d}", "document_id": f"doc-{index:09d}",
+                          "timestamp": 1.7e9 + index, "original_confidence": 0.5, "entities_changed": True}
+            f.write("\t".join(encode_correction_row(correction)) + "\n")
+
+def time_open(data_dir: str, repeat: int = 3) -> float:
+    """Best-of-n seconds to open the store"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        store = FileStore(data_dir, snapshot_interval=None)
+        best = min(best, time.perf_counter() - start)
+        store.close()
+    return best
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    # Two manifest lines per annotation: the longest tail the default snapshot_interval leaves
+    tail = 5000
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_manifest(data_dir, 0, count)
+        print(f"{count:,} annotations (2 versions each) and {count // 10:,} corrections in the manifest")
+        print(f"{'open':<40}{'seconds':>10}")
+
+        # No saved statistics: everything is recounted
+        print(f"{'manifest, recount statistics':<40}{time_open(data_dir, repeat=1):>10.3f}")
+
+        # Saved statistics (stats.json) but no snapshot
+        FileStore(data_dir, snapshot_interval=None).close()
+        print(f"{'manifest + saved statistics':<40}{time_open(data_dir):>10.3f}")
+
+        store = FileStore(data_dir, snapshot_interval=None)
+        store.write_snapshot()
+        store.close()
+        print(f"{'snapshot':<40}{time_open(data_dir):>10.3f}")
+
+        # Journal entries written after the snapshot are replayed; stores snapshot again
+        # every snapshot_interval lines, so the tail stays this short
+        write_manifest(data_dir, count, tail)
+        print(f"{f'snapshot + {tail * 2:,} newer manifest lines':<40}{time_open(data_dir):>10.3f}")
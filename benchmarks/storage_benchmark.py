@@ -0,0 +1,77 @@
+# benchmarks/storage_benchmark.py
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+# Add the parent directory to path to import from other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.file_store import FileStore
+from storage.segment_store import SegmentStore
+from storage.sqlite_store import SQLiteStore
+
+ENTITY_TYPES = ["PATIENT", "DATE", "DOCTOR", "MED", "DOSAGE", "TEST", "RESULT", "FACILITY"]
+
+def make_annotation(index: int) -> Dict:
+    """Build a synthetic annotation shaped like the pipeline output"""
+    entities = [{
+        "type": random.choice(ENTITY_TYPES),
+        "text": f"entity {index}-{i}",
+        "start": i * 20,
+        "end": i * 20 + 12,
+        "validation": {"valid": random.random() > 0.1, "issues": []}
+    } for i in range(8)]
+
+    return {
+        "document": f"Patient note {index}. " + "Lorem ipsum dolor sit amet. " * 30,
+        "entities": entities,
+        "confidence_score": random.random(),
+        "validation_score": random.random(),
+        "model_name": "gpt-3.5-turbo",
+        "needs_human_review": random.random() < 0.3
+    }
+
+def benchmark_writes(store_factory: Callable, count: int, batch_size: int = 1) -> float:
+    """Return annotations written per second into a fresh store"""
+    annotations = [make_annotation(i) for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = store_factory(data_dir)
+        start = time.perf_counter()
+        if batch_size > 1 and hasattr(store, "save_annotations"):
+            for i in range(0, count, batch_size):
+                store.save_annotations(annotations[i:i + batch_size])
+        else:
+            for annotation in annotations:
+                store.save_annotation(annotation)
+        if hasattr(store, "flush"):
+            store.flush()
+        elapsed = time.perf_counter() - start
+        if hasattr(store, "close"):
+            store.close()
+
+    return count / elapsed
+
+def report(results: List[tuple]):
+    """Print a throughput table"""
+    print(f"{'store':<36}{'ops/sec':>12}")
+    for name, ops in results:
+        print(f"{name:<36}{ops:>12,.0f}")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    report([
+        ("FileStore", benchmark_writes(FileStore, count)),
+        ("FileStore (write-behind)", benchmark_writes(lambda d: FileStore(d, write_behind=True), count)),
+        ("FileStore (write-behind, no fsync)",
+         benchmark_writes(lambda d: FileStore(d, write_behind=True, fsync=False), count)),
+        ("SegmentStore", benchmark_writes(SegmentStore, count)),
+        ("SegmentStore (batch=100)", benchmark_writes(SegmentStore, count, batch_size=100)),
+        ("SegmentStore (fsync)", benchmark_writes(lambda d: SegmentStore(d, fsync=True), count)),
+        ("SQLiteStore", benchmark_writes(SQLiteStore, count)),
+        ("SQLiteStore (batch=500)", benchmark_writes(SQLiteStore, count, batch_size=500)),
+    ])
@@ -18,6 +18,17 @@ ANNOTATION_RUNS = 3  # Number of runs for consistency scoring
 CONFIDENCE_THRESHOLD = 0.85
 VALIDATION_THRESHOLD = 0.90
 
+# Calibrated thresholds written by the calibration job and loaded by ReviewRouter
+CALIBRATION_FILE = os.getenv("CALIBRATION_FILE", "data/calibration/review_thresholds.json")
+TARGET_ERROR_RATE = 0.05
+
+# MongoDB connection pool sizing for AnnotationStore
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+
+# Review queue ordering: "confidence" (lowest first), "issues" (most invalid entities first) or "oldest"
+REVIEW_QUEUE_PRIORITY = "confidence"
+
 # Entity validation weights
 CONFIDENCE_WEIGHTS = {
     "format": 0.2,
@@ -2,6 +2,9 @@
 from typing import List, Dict, Any
 from collections import defaultdict
 
+from config.settings import CALIBRATION_FILE, TARGET_ERROR_RATE
+from core.threshold_calibration import ThresholdCalibrator
+
 class ActiveLearningController:
     """Controller for analyzing human corrections and improving the system"""
     
@@ -122,3 +125,16 @@ class ActiveLearningController:
                 }
         
         return calibration
+    
+    def calibrate_review_thresholds(self, method: str = "isotonic",
+                                    target_error_rate: float = TARGET_ERROR_RATE,
+                                    output_path: str = CALIBRATION_FILE,
+                                    max_corrections: int = 100000) -> Dict[str, Any]:
+        """Fit confidence calibration on correction history and save thresholds for ReviewRouter"""
+        corrections = self.annotation_store.get_corrections(limit=max_corrections)
+        
+        calibrator = ThresholdCalibrator(method=method, target_error_rate=target_error_rate)
+        result = calibrator.calibrate(corrections)
+        calibrator.save(result, output_path)
+        
+        return result
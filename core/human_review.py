@@ -6,31 +6,105 @@ from datetime import datetime
 class HumanReviewInterface:
     """Interface for retrieving and processing human reviews of annotations"""
     
-    def __init__(self, annotation_store):
-        """Initialize with an annotation store"""
+    def __init__(self, annotation_store, review_queue=None, lease_manager=None):
+        """Initialize with an annotation store, optional review queue and lease manager"""
         self.annotation_store = annotation_store
+        self.review_queue = review_queue
+        self.lease_manager = lease_manager
     
     def get_documents_for_review(self, limit: int = 10) -> List[Dict]:
         """Retrieve documents that need human review based on confidence scores"""
-        return self.annotation_store.find_by_review_status(needs_review=True, limit=limit)
+        if self.review_queue is None:
+            return self.annotation_store.find_by_review_status(needs_review=True, limit=limit)
+        
+        # Serve documents in review-priority order from the queue
+        documents = []
+        for document_id in self.review_queue.peek_many(limit):
+            document = self.annotation_store.find_by_id(document_id)
+            if document:
+                documents.append(document)
+        return documents
+    
+    def checkout_documents(self, reviewer_id: str, limit: int = 10,
+                           ttl: Optional[float] = None) -> List[Dict]:
+        """Lease documents for a reviewer so concurrent reviewers never get the same ones"""
+        if self.lease_manager is None:
+            raise ValueError("Document checkout requires a lease manager")
+        
+        # Over-fetch by the number of active leases so leased documents can be skipped
+        candidate_limit = limit + self.lease_manager.active_count()
+        if self.review_queue is not None:
+            candidate_ids = self.review_queue.peek_many(candidate_limit)
+        else:
+            candidate_ids = [str(doc["_id"]) for doc in self.annotation_store.find_by_review_status(
+                needs_review=True, limit=candidate_limit)]
+        
+        # Documents leased by other reviewers are skipped before any is loaded
+        candidates = {}
+        for document_id in self.lease_manager.available(reviewer_id, candidate_ids):
+            if len(candidates) >= limit:
+                break
+            document = self.annotation_store.find_by_id(document_id)
+            if document:
+                candidates[document_id] = document
+        
+        leases = self.lease_manager.checkout(
+            reviewer_id, list(candidates), limit=limit, ttl=ttl,
+            versions={doc_id: doc.get("version", 0) for doc_id, doc in candidates.items()})
+        
+        documents = []
+        for lease in leases:
+            document = dict(candidates[lease["document_id"]])
+            document["lease_token"] = lease["lease_token"]
+            document["lease_expires_at"] = lease["expires_at"]
+            documents.append(document)
+        
+        return documents
+    
+    def heartbeat(self, lease_token: str, ttl: Optional[float] = None) -> bool:
+        """Keep a checked-out document leased while the reviewer is still working"""
+        return self.lease_manager.heartbeat(lease_token, ttl)
+    
+    def release_document(self, lease_token: str) -> bool:
+        """Return a checked-out document to the pool without reviewing it"""
+        return self.lease_manager.release(lease_token)
     
-    def submit_correction(self, document_id: str, corrected_entities: List[Dict]) -> Dict:
+    def submit_correction(self, document_id: str, corrected_entities: List[Dict],
+                          lease_token: Optional[str] = None) -> Dict:
         """Process human corrections and update annotation store"""
-        # Update the annotation store with corrections
-        result = self.annotation_store.update_after_review(document_id, corrected_entities)
+        if lease_token is None:
+            # Update the annotation store with corrections
+            return self.annotation_store.update_after_review(document_id, corrected_entities)
+        
+        # Only the lease holder may submit, and only against the version it checked out
+        lease = self.lease_manager.validate(document_id, lease_token)
+        result = self.annotation_store.update_after_review(
+            document_id, corrected_entities, expected_version=lease["document_version"])
+        self.lease_manager.release(lease_token)
         
         return result
     
+    def get_review_page(self, cursor: Optional[str] = None, limit: int = 10,
+                        filters: Optional[Dict[str, Any]] = None,
+                        projection: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Page through documents needing review, newest first; pass next_cursor for the next page"""
+        filters = dict(filters or {}, needs_review=True)
+        return self.annotation_store.query(filters, projection=projection, limit=limit, cursor=cursor)
+    
     def get_review_statistics(self) -> Dict[str, Any]:
         """Get statistics on human reviews"""
-        # Get all annotations
-        needs_review = self.annotation_store.find_by_review_status(needs_review=True, limit=1000)
-        reviewed = self.annotation_store.find_by_review_status(needs_review=False, limit=1000)
+        if hasattr(self.annotation_store, "count"):
+            # Counted by the store without loading any documents
+            needs_review = self.annotation_store.count({"needs_review": True})
+            reviewed = self.annotation_store.count({"needs_review": False})
+        else:
+            needs_review = len(self.annotation_store.find_by_review_status(needs_review=True, limit=1000))
+            reviewed = len(self.annotation_store.find_by_review_status(needs_review=False, limit=1000))
         
         return {
-            "total_needing_review": len(needs_review),
-            "total_reviewed": len(reviewed),
-            "review_completion_rate": len(reviewed) / (len(needs_review) + len(reviewed)) if (len(needs_review) + len(reviewed)) > 0 else 0
+            "total_needing_review": needs_review,
+            "total_reviewed": reviewed,
+            "review_completion_rate": reviewed / (needs_review + reviewed) if (needs_review + reviewed) > 0 else 0
         }
 
 def _modify_entity_during_review(document_text, entity, new_text):
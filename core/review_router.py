@@ -1,41 +1,163 @@
 # core/review_router.py
-from typing import Dict, List
-from config.settings import CONFIDENCE_THRESHOLD, VALIDATION_THRESHOLD
+from collections import Counter
+from enum import Flag, auto
+from typing import Dict, List, Optional, Tuple
+from config.settings import CONFIDENCE_THRESHOLD, VALIDATION_THRESHOLD, CALIBRATION_FILE
+from core.threshold_calibration import load_calibrated_thresholds
+
+class ReviewReason(Flag):
+    """Structured reasons an annotation was routed to human review."""
+    NONE = 0
+    LOW_CONFIDENCE = auto()
+    LOW_VALIDATION = auto()
+    VALIDATION_ISSUES = auto()
+    
+    @property
+    def codes(self) -> List[str]:
+        """Names of the individual reasons set in this flag."""
+        return [reason.name for reason in ReviewReason
+                if reason is not ReviewReason.NONE and reason in self]
 
 class ReviewRouter:
     """Routes annotations to human reviewers based on confidence thresholds."""
     
-    def __init__(self, confidence_threshold: float = CONFIDENCE_THRESHOLD, 
-                validation_threshold: float = VALIDATION_THRESHOLD):
-        self.confidence_threshold = confidence_threshold
+    def __init__(self, confidence_threshold: Optional[float] = None, 
+                validation_threshold: float = VALIDATION_THRESHOLD, review_queue=None,
+                calibration_path: Optional[str] = CALIBRATION_FILE):
+        self.confidence_threshold = CONFIDENCE_THRESHOLD if confidence_threshold is None else confidence_threshold
         self.validation_threshold = validation_threshold
+        self.review_queue = review_queue
+        self.entity_thresholds = {}
+        
+        # Replace the default thresholds with calibrated ones when a calibration job has
+        # run; an explicitly passed confidence threshold always wins
+        if calibration_path and confidence_threshold is None:
+            self._load_calibration(calibration_path)
     
-    def route_annotation(self, validated_annotation: Dict) -> Dict:
-        """Determine if annotation needs human review based on confidence and validation scores."""
-        confidence_score = validated_annotation.get("confidence_score", 0)
-        validation_score = validated_annotation.get("validation_score", 0)
+    def _load_calibration(self, calibration_path: str):
+        """Load global and per-entity-type confidence thresholds fitted on correction history."""
+        calibration = load_calibrated_thresholds(calibration_path)
+        if not calibration:
+            return
+        
+        if calibration.get("global"):
+            self.confidence_threshold = calibration["global"]["confidence_threshold"]
+        self.entity_thresholds = {
+            entity_type: result["confidence_threshold"]
+            for entity_type, result in calibration.get("entity_types", {}).items()
+        }
+    
+    def _confidence_threshold_for(self, entities: List[Dict]) -> float:
+        """Use the strictest calibrated threshold among the entity types present."""
+        thresholds = [self.entity_thresholds[e.get("type")] for e in entities
+                      if e.get("type") in self.entity_thresholds]
+        return max(thresholds, default=self.confidence_threshold)
+    
+    def _evaluate(self, annotation: Dict) -> Tuple[ReviewReason, List[int], float]:
+        """Compute the review reasons, offending entity indices and confidence threshold."""
+        confidence_score = annotation.get("confidence_score", 0)
+        validation_score = annotation.get("validation_score", 0)
+        entities = annotation.get("entities", [])
         
         # Check for validation issues
-        entities = validated_annotation.get("entities", [])
-        invalid_entities = [e for e in entities if not e.get("validation", {}).get("valid", True)]
+        invalid_indices = [i for i, e in enumerate(entities)
+                           if not e.get("validation", {}).get("valid", True)]
+        confidence_threshold = self._confidence_threshold_for(entities)
+        
+        reasons = ReviewReason.NONE
+        if confidence_score < confidence_threshold:
+            reasons |= ReviewReason.LOW_CONFIDENCE
+        if validation_score < self.validation_threshold:
+            reasons |= ReviewReason.LOW_VALIDATION
+        if invalid_indices:
+            reasons |= ReviewReason.VALIDATION_ISSUES
         
-        needs_review = (confidence_score < self.confidence_threshold or 
-                        validation_score < self.validation_threshold or
-                        len(invalid_entities) > 0)
+        return reasons, invalid_indices, confidence_threshold
+    
+    def route_annotation(self, validated_annotation: Dict) -> Dict:
+        """Determine if annotation needs human review based on confidence and validation scores."""
+        self._route(validated_annotation)
+        return validated_annotation
+    
+    def _route(self, annotation: Dict) -> ReviewReason:
+        """Record the routing decision on an annotation and return its review reasons."""
+        reasons, invalid_indices, confidence_threshold = self._evaluate(annotation)
+        entities = annotation.get("entities", [])
         
         # Enhance annotation with routing decision
-        validated_annotation["needs_human_review"] = needs_review
-        validated_annotation["review_reason"] = self._get_review_reason(
-            confidence_score, validation_score, invalid_entities)
+        annotation["needs_human_review"] = bool(reasons)
+        annotation["review_reason"] = self._get_review_reason(
+            annotation.get("confidence_score", 0),
+            annotation.get("validation_score", 0),
+            [entities[i] for i in invalid_indices], confidence_threshold)
+        annotation["review_reason_codes"] = reasons.codes
+        annotation["review_entity_indices"] = invalid_indices
         
-        return validated_annotation
+        return reasons
+    
+    def route_batch(self, annotations: List[Dict]) -> Dict:
+        """Route a batch of annotations and aggregate the review reasons across it."""
+        decisions = []
+        reason_counts = Counter()
+        
+        for annotation in annotations:
+            reasons = self._route(annotation)
+            reason_counts.update(annotation["review_reason_codes"])
+            
+            decisions.append({
+                "document_id": annotation.get("_id"),
+                "needs_human_review": annotation["needs_human_review"],
+                "reasons": reasons,
+                "entity_indices": annotation["review_entity_indices"],
+                "review_reason": annotation["review_reason"]
+            })
+        
+        needs_review = sum(1 for d in decisions if d["needs_human_review"])
+        
+        return {
+            "annotations": annotations,
+            "decisions": decisions,
+            "reason_counts": {reason.name: reason_counts.get(reason.name, 0)
+                              for reason in ReviewReason if reason is not ReviewReason.NONE},
+            "total": len(decisions),
+            "needs_review": needs_review,
+            "auto_approved": len(decisions) - needs_review
+        }
+    
+    def enqueue(self, annotation: Dict, document_id: str):
+        """
+        Push or remove a routed annotation from the review queue based on its routing.
+        
+        Call it once the store has saved the annotation, with the ID the store
+        returned, so the queue never points at a document that wasn't saved.
+        """
+        if self.review_queue is None:
+            return
+        if annotation.get("needs_human_review"):
+            self.review_queue.push(dict(annotation, _id=str(document_id)))
+        else:
+            self.review_queue.remove(str(document_id))
+    
+    def enqueue_batch(self, annotations: List[Dict], document_ids: List[str]):
+        """Like enqueue() for a saved batch, with one queue journal write for all of it."""
+        if self.review_queue is None:
+            return
+        push, remove = [], []
+        for annotation, document_id in zip(annotations, document_ids):
+            if annotation.get("needs_human_review"):
+                push.append(dict(annotation, _id=str(document_id)))
+            else:
+                remove.append(str(document_id))
+        self.review_queue.update_many(push, remove)
     
     def _get_review_reason(self, confidence_score: float, validation_score: float, 
-                          invalid_entities: List[Dict]) -> str:
+                          invalid_entities: List[Dict], confidence_threshold: float = None) -> str:
         """Generate a reason for human review."""
         reasons = []
+        if confidence_threshold is None:
+            confidence_threshold = self.confidence_threshold
         
-        if confidence_score < self.confidence_threshold:
+        if confidence_score < confidence_threshold:
             reasons.append(f"Low confidence score ({confidence_score:.2f})")
             
         if validation_score < self.validation_threshold:
@@ -0,0 +1,213 @@
+# core/threshold_calibration.py
+import json
+import math
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+def _entity_keys(entities: List[Dict], entity_type: Optional[str] = None) -> List[Tuple]:
+    """Comparable (type, text, start, end) keys, optionally restricted to one type"""
+    # Missing fields become "" or -1 so keys of incomplete entities still sort
+    return sorted((e.get("type") or "", e.get("text") or "",
+                   -1 if e.get("start") is None else e.get("start"),
+                   -1 if e.get("end") is None else e.get("end"))
+                  for e in entities if entity_type is None or e.get("type") == entity_type)
+
+def correction_outcomes(corrections: List[Dict]) -> Dict[str, List[Tuple[float, int]]]:
+    """
+    Turn correction records into (confidence, error) samples.
+
+    Returns:
+        Samples keyed by entity type, plus "__all__" for document-level outcomes
+    """
+    samples = defaultdict(list)
+
+    for correction in corrections:
+        confidence = float(correction.get("original_confidence", 0) or 0)
+        original = correction.get("original_entities", [])
+        corrected = correction.get("corrected_entities", [])
+
+        samples["__all__"].append((confidence, int(_entity_keys(original) != _entity_keys(corrected))))
+
+        # An entity type is in error if any of its entities were added, removed or changed
+        entity_types = {e.get("type") for e in original} | {e.get("type") for e in corrected}
+        for entity_type in entity_types:
+            changed = _entity_keys(original, entity_type) != _entity_keys(corrected, entity_type)
+            samples[entity_type].append((confidence, int(changed)))
+
+    return dict(samples)
+
+class IsotonicCalibration:
+    """Monotone mapping from confidence score to probability of being correct"""
+
+    def __init__(self, x: List[float] = None, y: List[float] = None):
+        self.x = x or []
+        self.y = y or []
+
+    def fit(self, samples: List[Tuple[float, int]]) -> "IsotonicCalibration":
+        """Fit with the pool-adjacent-violators algorithm"""
+        # Blocks of [sum of correct outcomes, weight, max confidence]
+        blocks = []
+        for confidence, error in sorted(samples):
+            blocks.append([1.0 - error, 1.0, confidence])
+            while len(blocks) > 1 and blocks[-2][0] / blocks[-2][1] > blocks[-1][0] / blocks[-1][1]:
+                total, weight, upper = blocks.pop()
+                blocks[-1][0] += total
+                blocks[-1][1] += weight
+                blocks[-1][2] = upper
+
+        self.x = [block[2] for block in blocks]
+        self.y = [block[0] / block[1] for block in blocks]
+        return self
+
+    def predict(self, confidence: float) -> float:
+        """Calibrated probability that an annotation with this confidence is correct"""
+        if not self.x:
+            return confidence
+        # Each block covers scores up to its upper bound; scores past the last block take its value
+        index = min(bisect_left(self.x, confidence), len(self.x) - 1)
+        return self.y[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"method": "isotonic", "x": self.x, "y": self.y}
+
+class PlattCalibration:
+    """Logistic mapping from confidence score to probability of being correct"""
+
+    def __init__(self, a: float = 1.0, b: float = 0.0):
+        self.a = a
+        self.b = b
+
+    def fit(self, samples: List[Tuple[float, int]], iterations: int = 50) -> "PlattCalibration":
+        """Fit sigmoid(a * confidence + b) with Newton's method"""
+        a, b = 0.0, 0.0
+        for _ in range(iterations):
+            grad_a = grad_b = h_aa = h_ab = h_bb = 0.0
+            for confidence, error in samples:
+                p = 1.0 / (1.0 + math.exp(-(a * confidence + b)))
+                residual = p - (1 - error)
+                weight = max(p * (1 - p), 1e-9)
+                grad_a += residual * confidence
+                grad_b += residual
+                h_aa += weight * confidence * confidence
+                h_ab += weight * confidence
+                h_bb += weight
+
+            # Small ridge term keeps the Hessian invertible on separable data
+            h_aa += 1e-6
+            h_bb += 1e-6
+            det = h_aa * h_bb - h_ab * h_ab
+            if det == 0:
+                break
+            step_a = (h_bb * grad_a - h_ab * grad_b) / det
+            step_b = (h_aa * grad_b - h_ab * grad_a) / det
+            a, b = a - step_a, b - step_b
+            if abs(step_a) < 1e-8 and abs(step_b) < 1e-8:
+                break
+
+        self.a, self.b = a, b
+        return self
+
+    def predict(self, confidence: float) -> float:
+        """Calibrated probability that an annotation with this confidence is correct"""
+        z = self.a * confidence + self.b
+        return 1.0 / (1.0 + math.exp(-max(min(z, 500), -500)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"method": "platt", "a": self.a, "b": self.b}
+
+CALIBRATION_METHODS = {
+    "isotonic": IsotonicCalibration,
+    "platt": PlattCalibration
+}
+
+def select_threshold(samples: List[Tuple[float, int]], calibration, target_error_rate: float,
+                     min_samples: int = 10) -> Optional[Dict[str, float]]:
+    """
+    Pick the lowest confidence threshold whose auto-approved set meets the target error rate.
+
+    Lower thresholds auto-approve more documents, so the lowest threshold that
+    satisfies the target maximizes auto-approval.
+    """
+    if len(samples) < min_samples:
+        return None
+
+    ordered = sorted(samples, reverse=True)
+    expected_errors = [1.0 - calibration.predict(confidence) for confidence, _ in ordered]
+
+    # Walk down from the highest confidence, keeping the last threshold that meets the target
+    best = None
+    cumulative_error = 0.0
+    for count, ((confidence, _), expected_error) in enumerate(zip(ordered, expected_errors), start=1):
+        cumulative_error += expected_error
+        # Only evaluate at the last sample of a run of equal confidences
+        if count < len(ordered) and ordered[count][0] == confidence:
+            continue
+        error_rate = cumulative_error / count
+        if error_rate <= target_error_rate and count >= min_samples:
+            best = {
+                "confidence_threshold": confidence,
+                "expected_error_rate": error_rate,
+                "auto_approval_rate": count / len(ordered),
+                "samples": len(ordered)
+            }
+
+    return best
+
+class ThresholdCalibrator:
+    """Fits confidence calibration on correction history and derives review thresholds"""
+
+    def __init__(self, method: str = "isotonic", target_error_rate: float = 0.05,
+                 min_samples: int = 10):
+        if method not in CALIBRATION_METHODS:
+            raise ValueError(f"Unknown calibration method '{method}', expected one of {sorted(CALIBRATION_METHODS)}")
+        self.method = method
+        self.target_error_rate = target_error_rate
+        self.min_samples = min_samples
+
+    def calibrate(self, corrections: List[Dict]) -> Dict[str, Any]:
+        """Fit calibration and pick global and per-entity-type thresholds"""
+        samples = correction_outcomes(corrections)
+        all_samples = samples.pop("__all__", [])
+
+        calibration = CALIBRATION_METHODS[self.method]().fit(all_samples)
+
+        entity_thresholds = {}
+        for entity_type, type_samples in samples.items():
+            type_calibration = CALIBRATION_METHODS[self.method]().fit(type_samples)
+            threshold = select_threshold(type_samples, type_calibration,
+                                         self.target_error_rate, self.min_samples)
+            if threshold:
+                entity_thresholds[entity_type] = threshold
+
+        return {
+            "method": self.method,
+            "target_error_rate": self.target_error_rate,
+            "fitted_at": datetime.now().isoformat(),
+            "samples": len(all_samples),
+            "calibration": calibration.to_dict(),
+            "global": select_threshold(all_samples, calibration,
+                                       self.target_error_rate, self.min_samples),
+            "entity_types": entity_thresholds
+        }
+
+    def save(self, result: Dict[str, Any], path: str) -> Path:
+        """Write the calibration result for ReviewRouter to load at startup"""
+        output_path = Path(path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(result, f, indent=2)
+        return output_path
+
+def load_calibrated_thresholds(path: str) -> Optional[Dict[str, Any]]:
+    """Load a saved calibration result, or None if no calibration has been run"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error loading calibrated thresholds {path}: {e}")
+        return None
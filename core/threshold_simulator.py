@@ -0,0 +1,124 @@
+# core/threshold_simulator.py
+from typing import List, Dict, Any, Optional, Sequence
+import numpy as np
+
+from config.settings import CONFIDENCE_THRESHOLD, VALIDATION_THRESHOLD
+from core.threshold_calibration import _entity_keys
+
+def _corrected_document_ids(corrections: List[Dict]) -> set:
+    """IDs of documents whose review actually changed the entities"""
+    corrected = set()
+    for correction in corrections:
+        # Compare entities the way the calibrator does, ignoring order and extra fields
+        if _entity_keys(correction.get("original_entities", [])) != \
+                _entity_keys(correction.get("corrected_entities", [])):
+            corrected.add(str(correction.get("document_id")))
+    return corrected
+
+def _suffix_sum_2d(counts: np.ndarray) -> np.ndarray:
+    """result[i, j] = counts[i:, j:].sum() for every cell"""
+    return counts[::-1, ::-1].cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
+
+class ThresholdSimulator:
+    """What-if analysis of review routing thresholds over the stored corpus"""
+
+    def __init__(self, confidence: np.ndarray, validation: np.ndarray, invalid_entities: np.ndarray,
+                 reviewed: np.ndarray, corrected: np.ndarray):
+        """Initialize with one array element per stored annotation"""
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+        self.validation = np.asarray(validation, dtype=np.float64)
+        self.invalid_entities = np.asarray(invalid_entities, dtype=np.int32)
+        self.reviewed = np.asarray(reviewed, dtype=bool)
+        self.corrected = np.asarray(corrected, dtype=bool)
+
+    @classmethod
+    def from_store(cls, annotation_store, max_corrections: int = 10_000_000) -> "ThresholdSimulator":
+        """Load routing fields and correction outcomes for every stored annotation"""
+        corrected_ids = _corrected_document_ids(annotation_store.get_corrections(limit=max_corrections))
+
+        confidence, validation, invalid_entities, reviewed, corrected = [], [], [], [], []
+        for summary in annotation_store.iter_summaries():
+            confidence.append(summary["confidence_score"])
+            validation.append(summary["validation_score"])
+            invalid_entities.append(summary["invalid_entities"])
+            reviewed.append(summary["human_reviewed"])
+            corrected.append(str(summary["_id"]) in corrected_ids)
+
+        return cls(np.array(confidence), np.array(validation), np.array(invalid_entities),
+                   np.array(reviewed), np.array(corrected))
+
+    def __len__(self) -> int:
+        return len(self.confidence)
+
+    def sweep(self, confidence_grid: Optional[Sequence[float]] = None,
+              validation_grid: Optional[Sequence[float]] = None) -> Dict[str, np.ndarray]:
+        """
+        Evaluate every (confidence, validation) threshold pair in one pass.
+
+        A document is auto-approved at (c, v) when confidence >= c, validation >= v and
+        it has no invalid entities. Each document is binned once against both grids and
+        the per-cell counts are turned into "at or above" counts with 2-D suffix sums,
+        so the cost is O(documents + grid cells) rather than O(documents x grid cells).
+
+        Returns:
+            2-D arrays indexed [confidence_index, validation_index]
+        """
+        c_grid = np.unique(np.asarray(confidence_grid if confidence_grid is not None
+                                      else np.linspace(0.5, 1.0, 51).round(4), dtype=np.float64))
+        v_grid = np.unique(np.asarray(validation_grid if validation_grid is not None
+                                      else np.linspace(0.5, 1.0, 51).round(4), dtype=np.float64))
+        n_c, n_v = len(c_grid), len(v_grid)
+
+        # Index of the highest threshold each document still passes (-1 if none)
+        c_index = np.searchsorted(c_grid, self.confidence, side="right") - 1
+        v_index = np.searchsorted(v_grid, self.validation, side="right") - 1
+        eligible = (self.invalid_entities == 0) & (c_index >= 0) & (v_index >= 0)
+
+        cells = c_index[eligible] * n_v + v_index[eligible]
+        reviewed = self.reviewed[eligible]
+        corrected = self.corrected[eligible] & reviewed
+
+        def cell_counts(weights=None):
+            counts = np.bincount(cells, weights=weights, minlength=n_c * n_v)
+            return _suffix_sum_2d(counts.reshape(n_c, n_v))
+
+        total = max(len(self), 1)
+        approved = cell_counts()
+        approved_reviewed = cell_counts(reviewed.astype(np.float64))
+        approved_corrected = cell_counts(corrected.astype(np.float64))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correction_rate = np.where(approved_reviewed > 0,
+                                       approved_corrected / approved_reviewed, np.nan)
+
+        return {
+            "confidence_thresholds": c_grid,
+            "validation_thresholds": v_grid,
+            "auto_approved": approved,
+            "auto_approval_rate": approved / total,
+            "review_volume": len(self) - approved,
+            "observed_correction_rate": correction_rate
+        }
+
+    def _row(self, result: Dict[str, np.ndarray], i: int, j: int) -> Dict[str, Any]:
+        """One table row for the threshold pair at grid position (i, j)"""
+        rate = result["observed_correction_rate"][i, j]
+        return {
+            "confidence_threshold": float(result["confidence_thresholds"][i]),
+            "validation_threshold": float(result["validation_thresholds"][j]),
+            "auto_approval_rate": float(result["auto_approval_rate"][i, j]),
+            "review_volume": int(result["review_volume"][i, j]),
+            "observed_correction_rate": None if np.isnan(rate) else float(rate)
+        }
+
+    def to_table(self, result: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Flatten a sweep result into one row per threshold pair"""
+        return [self._row(result, i, j)
+                for i in range(len(result["confidence_thresholds"]))
+                for j in range(len(result["validation_thresholds"]))]
+
+    def current_operating_point(self, result: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """Row of the sweep closest to the configured thresholds"""
+        i = int(np.abs(result["confidence_thresholds"] - CONFIDENCE_THRESHOLD).argmin())
+        j = int(np.abs(result["validation_thresholds"] - VALIDATION_THRESHOLD).argmin())
+        return self._row(result, i, j)
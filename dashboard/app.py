@@ -551,6 +551,7 @@ import json
 import os
 import sys
 import re
+import uuid
 from datetime import datetime, timedelta
 
 # Add the parent directory to path to import from other modules
@@ -558,14 +559,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import your existing modules
 from storage.file_store import FileStore
+from storage.review_leases import ReviewLeaseManager
+from storage.errors import LeaseError, VersionConflictError
 from core.human_review import (
+    HumanReviewInterface,
     _modify_entity_during_review, 
     _get_entity_context,
     calculate_correction_impact
 )
 from utils.helpers import format_entity_for_display
 # Import your process_document function
-from main import process_document
+from main import process_document, get_review_queue
 
 # Page configuration
 st.set_page_config(
@@ -575,8 +579,12 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize file storage
-store = FileStore()
+# Initialize file storage; the explorer's search box needs the search index.
+# Reviews submitted here dequeue from the same queue the pipeline fills
+review_queue = get_review_queue()
+store = FileStore(search_index=True, review_queue=review_queue)
+lease_manager = ReviewLeaseManager()
+review_interface = HumanReviewInterface(store, review_queue=review_queue, lease_manager=lease_manager)
 
 def document_annotation_page():
     """Interactive document annotation interface with review capabilities."""
@@ -612,7 +620,7 @@ def document_annotation_page():
     if st.button("Annotate Document") and document and selected_types:
         # Process the document using your existing pipeline
         with st.spinner("Processing document..."):
-            result = process_document(document, selected_types)
+            result = process_document(document, selected_types, review_queue)
             
             # Store result in session state for review access
             st.session_state.last_result = result
@@ -626,7 +634,7 @@ def document_annotation_page():
                 if st.button("Begin Human Review", key="begin_review_button"):
                     st.session_state.phase = "review"
                     st.session_state.review_document_id = result.get("_id")
-                    st.rerun()
+                    st.experimental_rerun()
             else:
                 st.success("Document annotated successfully! No human review required.")
     
@@ -642,7 +650,7 @@ def document_annotation_page():
                 if st.button("Begin Human Review", key="review_button"):
                     st.session_state.phase = "review"
                     st.session_state.review_document_id = result.get("_id")
-                    st.rerun()
+                    st.experimental_rerun()
 
 
 def display_annotation_results(result):
@@ -694,7 +702,7 @@ def display_human_review(document_id):
     # Add a button to return to annotation
     if st.button("← Return to Annotation"):
         st.session_state.phase = "input"
-        st.rerun()
+        st.experimental_rerun()
         return
     
     # Get annotation from storage
@@ -704,6 +712,12 @@ def display_human_review(document_id):
         st.error("Could not retrieve annotation data.")
         return
     
+    # Lease the document so concurrent reviewers don't work on it at the same time
+    lease_token = _acquire_review_lease(document_id)
+    if not lease_token:
+        st.warning("This document is currently checked out by another reviewer.")
+        return
+    
     document_text = annotation.get("document", "")
     entities = annotation.get("entities", [])
     
@@ -722,22 +736,17 @@ def display_human_review(document_id):
     
     # Flag problematic entities
     problematic_entities = []
-    review_reason = annotation.get("review_reason", "")
     
-    # Extract types with issues from review reason
-    issue_types = []
-    if "validation issues" in review_reason.lower():
-        issue_matches = re.findall(r"([A-Z]+): ([^;]+)", review_reason)
-        issue_types = [entity_type for entity_type, _ in issue_matches]
+    # Entity indices the router flagged when it made the routing decision
+    flagged_indices = set(annotation.get("review_entity_indices", []))
     
     # Mark entities that need review
     for i, entity in enumerate(entities):
         needs_review = False
         validation = entity.get("validation", {})
-        entity_type = entity.get("type", "")
         
-        # Flag entity if it has validation issues or its type is mentioned in review reason
-        if not validation.get("valid", True) or entity_type in issue_types:
+        # Flag entity if it has validation issues or the router flagged it
+        if not validation.get("valid", True) or i in flagged_indices:
             needs_review = True
             
         problematic_entities.append({
@@ -888,8 +897,17 @@ def display_human_review(document_id):
     
     # Submit corrections button
     if st.button("Submit Review"):
-        # Submit to storage
-        result = store.update_after_review(document_id, st.session_state.corrected_entities)
+        # Submit to storage under the review lease
+        try:
+            result = review_interface.submit_correction(
+                document_id, st.session_state.corrected_entities, lease_token=lease_token)
+        except (LeaseError, VersionConflictError) as e:
+            st.error(f"Review could not be submitted: {e}")
+            # A stale version leaves the lease held; hand the document back
+            review_interface.release_document(lease_token)
+            del st.session_state.review_lease
+            return
+        del st.session_state.review_lease
         
         # Calculate impact
         impact = calculate_correction_impact(entities, st.session_state.corrected_entities)
@@ -918,6 +936,30 @@ def display_human_review(document_id):
         if st.button("Annotate Another Document"):
             st.experimental_rerun()
 
+def _acquire_review_lease(document_id):
+    """Check out (or renew) the review lease on a document for this session."""
+    if "reviewer_id" not in st.session_state:
+        st.session_state.reviewer_id = str(uuid.uuid4())
+    
+    # Renew the lease we already hold on every rerun
+    lease = st.session_state.get("review_lease")
+    if lease and lease["document_id"] == document_id and review_interface.heartbeat(lease["lease_token"]):
+        return lease["lease_token"]
+    if lease:
+        # Switched documents (or the lease lapsed): hand the old one back first
+        review_interface.release_document(lease["lease_token"])
+        del st.session_state.review_lease
+    
+    annotation = store.find_by_id(document_id)
+    leases = lease_manager.checkout(
+        st.session_state.reviewer_id, [document_id], limit=1,
+        versions={document_id: annotation.get("version", 0)})
+    if not leases:
+        return None
+    
+    st.session_state.review_lease = leases[0]
+    return leases[0]["lease_token"]
+
 def highlight_entities_in_text(text, entities):
     """Create HTML with highlighted entities in the text."""
     # Convert the text to HTML with proper escaping
@@ -959,36 +1001,91 @@ def highlight_entities_in_text(text, entities):
     # Wrap in a div with styling
     return f'<div style="font-family: monospace; white-space: pre-wrap; line-height: 1.5;">{html_text}</div>'
 
-def display_annotations_explorer():
-    """Display annotation history and allow browsing previous annotations."""
-    st.title("Annotation Explorer")
+# Index fields shown in the explorer table, so listing pages never loads documents
+EXPLORER_FIELDS = ["model_name", "confidence_score", "validation_score", "needs_human_review",
+                   "human_reviewed", "entity_count"]
+EXPLORER_PAGE_SIZE = 50
+
+def display_annotations_page():
+    """Show the current page of filtered annotations; None when there are none"""
+    # Filters are applied by the store; only the rows of the current page are fetched
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        review_filter = st.selectbox("Review status", ["All", "Needs review", "Auto-approved"])
+    with col2:
+        model_filter = st.selectbox("Model", ["All"] + sorted(store.get_statistics().get("models", {})))
+    with col3:
+        min_confidence, max_confidence = st.slider("Confidence", 0.0, 1.0, (0.0, 1.0))
     
-    # Get all annotations
-    annotations = []
-    for annotation_id, annotation in store._annotations_cache.items():
-        annotations.append({
-            "id": annotation_id,
-            "timestamp": annotation.get("timestamp", ""),
-            "model_name": annotation.get("model_name", ""),
-            "confidence_score": annotation.get("confidence_score", 0),
-            "validation_score": annotation.get("validation_score", 0),
-            "needs_human_review": annotation.get("needs_human_review", True),
-            "entity_count": len(annotation.get("entities", [])),
-            "document_preview": annotation.get("document", "")[:100] + "..."
-        })
+    filters = {"min_confidence": min_confidence, "max_confidence": max_confidence}
+    if review_filter != "All":
+        filters["needs_review"] = review_filter == "Needs review"
+    if model_filter != "All":
+        filters["model_name"] = model_filter
     
-    if not annotations:
+    # Cursors of the pages visited so far, reset when the filters change
+    if st.session_state.get("explorer_filters") != filters:
+        st.session_state.explorer_filters = filters
+        st.session_state.explorer_cursors = [None]
+    cursors = st.session_state.explorer_cursors
+    
+    page = store.query(filters, projection=EXPLORER_FIELDS, limit=EXPLORER_PAGE_SIZE, cursor=cursors[-1])
+    total = store.count(filters)
+    
+    if not page["items"]:
         st.warning("No annotations found. Process some documents first!")
-        return
+        return None
     
-    # Convert to DataFrame and sort by timestamp
-    df = pd.DataFrame(annotations)
-    if "timestamp" in df.columns:
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df = df.sort_values("timestamp", ascending=False)
+    # Display the current page of annotations
+    df = pd.DataFrame(page["items"]).rename(columns={"_id": "id"})
+    st.dataframe(df, use_container_width=True)
     
-    # Display annotations table
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if len(cursors) > 1 and st.button("Previous page"):
+            cursors.pop()
+            st.experimental_rerun()
+    with col2:
+        st.caption(f"Page {len(cursors)} of {max(1, -(-total // EXPLORER_PAGE_SIZE))} ({total} annotations)")
+    with col3:
+        if page["next_cursor"] and st.button("Next page"):
+            cursors.append(page["next_cursor"])
+            st.experimental_rerun()
+    return df
+
+def display_search_results(search_query):
+    """Show the newest annotations matching a search; None when there are none"""
+    try:
+        results = store.search(search_query, limit=EXPLORER_PAGE_SIZE, projection=EXPLORER_FIELDS)
+    except ValueError as e:
+        st.error(f"Invalid search: {e}")
+        return None
+    
+    if not results["items"]:
+        st.warning("No annotations match the search.")
+        return None
+    
+    df = pd.DataFrame(results["items"]).rename(columns={"_id": "id"})
     st.dataframe(df, use_container_width=True)
+    st.caption(f"Showing {len(results['items'])} of {results['total']} matching annotations")
+    return df
+
+def display_annotations_explorer():
+    """Display annotation history and allow browsing previous annotations."""
+    st.title("Annotation Explorer")
+    
+    # Word and entity search, e.g. metoprolol AND DOCTOR:"Dr. Chen"
+    search_query = ""
+    if hasattr(store, "search"):
+        search_query = st.text_input(
+            "Search documents and entities",
+            help='Words, or entities like MED:metoprolol and DOCTOR:"Dr. Chen", '
+                 'combined with AND, OR, NOT and parentheses'
+        )
+    
+    df = display_search_results(search_query) if search_query else display_annotations_page()
+    if df is None:
+        return
     
     # Select annotation to view details
     selected_id = st.selectbox("Select annotation to view details:", df["id"].tolist())
@@ -1042,24 +1139,16 @@ def display_statistics():
     with col4:
         st.metric("Total Corrections", stats["total_corrections"])
     
-    # Get entity statistics
-    all_entities = []
-    for annotation in store._annotations_cache.values():
-        entities = annotation.get("entities", [])
-        for entity in entities:
-            all_entities.append({
-                "type": entity.get("type", ""),
-                "valid": entity.get("validation", {}).get("valid", True)
-            })
+    # Per-type entity counts are maintained by the store as annotations are saved
+    entity_counts = stats.get("entity_types", {})
     
-    if all_entities:
-        # Convert to DataFrame
-        entity_df = pd.DataFrame(all_entities)
-        
+    if entity_counts:
         # Entity type distribution
         st.subheader("Entity Type Distribution")
-        type_counts = entity_df["type"].value_counts().reset_index()
-        type_counts.columns = ["entity_type", "count"]
+        type_counts = pd.DataFrame(
+            [(entity_type, total) for entity_type, (total, _) in entity_counts.items()],
+            columns=["entity_type", "count"]
+        )
         
         fig = px.pie(
             type_counts,
@@ -1071,7 +1160,12 @@ def display_statistics():
         
         # Validation status by entity type
         st.subheader("Validation Status by Entity Type")
-        validation_by_type = entity_df.groupby(["type", "valid"]).size().reset_index(name="count")
+        validation_by_type = pd.DataFrame(
+            [(entity_type, valid, count)
+             for entity_type, (total, invalid) in entity_counts.items()
+             for valid, count in ((True, total - invalid), (False, invalid)) if count > 0],
+            columns=["type", "valid", "count"]
+        )
         
         fig = px.bar(
             validation_by_type,
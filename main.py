@@ -1,23 +1,35 @@
 # main.py
 import json
-from typing import List, Dict
-import re
+from typing import List, Dict, Optional
 
 from core.annotation_engine import TextAnnotator
 from core.rule_validator import RuleValidator
 from core.review_router import ReviewRouter
 from storage.file_store import FileStore
+from storage.review_queue import ReviewQueue
+from config.settings import REVIEW_QUEUE_PRIORITY
 from utils.helpers import format_entity_for_display, _get_entity_context
 from core.human_review import (_modify_entity_during_review, _get_entity_context, 
                               calculate_correction_impact)
 
-def process_document(document: str, entity_types: List[str]) -> Dict:
+_review_queue = None
+
+def get_review_queue() -> ReviewQueue:
+    """The review queue shared by the pipeline and the review tools of this process"""
+    global _review_queue
+    # Loading replays the whole journal, so it happens once per process
+    if _review_queue is None:
+        _review_queue = ReviewQueue(priority=REVIEW_QUEUE_PRIORITY)
+    return _review_queue
+
+def process_document(document: str, entity_types: List[str], review_queue: Optional[ReviewQueue] = None) -> Dict:
     """
     Process a document through the annotation pipeline
     
     Args:
         document: Text document to annotate
         entity_types: List of entity types to extract
+        review_queue: Queue for documents needing review; defaults to get_review_queue()
         
     Returns:
         Processed annotation with validation and routing
@@ -25,8 +37,10 @@ def process_document(document: str, entity_types: List[str]) -> Dict:
     # Initialize components
     annotator = TextAnnotator()
     validator = RuleValidator()
-    router = ReviewRouter()
-    store = FileStore()
+    if review_queue is None:
+        review_queue = get_review_queue()
+    router = ReviewRouter(review_queue=review_queue)
+    store = FileStore(review_queue=review_queue)
     
     # Clear any cached document data
     store.clear_document_cache()
@@ -46,9 +60,10 @@ def process_document(document: str, entity_types: List[str]) -> Dict:
     print("Determining routing...")
     routed_annotation = router.route_annotation(validated_annotation)
     
-    # Step 4: Store the annotation
+    # Step 4: Store the annotation, then queue it for review under the ID the store assigned
     document_id = store.save_annotation(routed_annotation)
     routed_annotation["_id"] = document_id
+    router.enqueue(routed_annotation, document_id)
     # Store the current document ID for targeted review
     store.last_processed_id = document_id
     
@@ -60,7 +75,7 @@ def demonstrate_human_review(document_id=None):
     while implementing Snorkel AI's programmatic validation principles.
     """
     # Initialize components
-    store = FileStore()
+    store = FileStore(review_queue=get_review_queue())
     
     if document_id:
         # Target a specific document
@@ -69,9 +84,9 @@ def demonstrate_human_review(document_id=None):
         # Use the most recently processed document
         doc = store.find_by_id(store.last_processed_id)
     else:
-        # Fall back to the previous behavior
-        docs_for_review = store.find_by_review_status(needs_review=True, limit=1)
-        doc = docs_for_review[0] if docs_for_review else None
+        # Fall back to the highest-priority document in the review queue
+        next_id = store.review_queue.peek()
+        doc = store.find_by_id(next_id) if next_id else None
     
     if not doc:
         print("No documents requiring human review")
@@ -99,23 +114,16 @@ def demonstrate_human_review(document_id=None):
     entities = doc.get("entities", [])
     problematic_entities = []
     
-    # Parse review reason to identify specific issues
-    review_reason = doc.get("review_reason", "")
-    issue_types = []
-    
-    if "validation issues" in review_reason.lower():
-        # Extract specific entity types with issues
-        issue_matches = re.findall(r"([A-Z]+): ([^;]+)", review_reason)
-        issue_types = [entity_type for entity_type, _ in issue_matches]
+    # Entity indices the router flagged when it made the routing decision
+    flagged_indices = set(doc.get("review_entity_indices", []))
     
     # Flag entities that need review based on validation issues
     for i, entity in enumerate(entities):
         needs_review = False
         validation = entity.get("validation", {})
-        entity_type = entity.get("type", "")
         
-        # Flag entity if it has validation issues or its type is mentioned in review reason
-        if not validation.get("valid", True) or entity_type in issue_types:
+        # Flag entity if it has validation issues or the router flagged it
+        if not validation.get("valid", True) or i in flagged_indices:
             needs_review = True
             
         problematic_entities.append({
@@ -1,4 +1,8 @@
 # storage/__init__.py
+from .async_store import AsyncStore, ThreadedAsyncStore, as_async
 from .file_store import FileStore
+from .review_queue import ReviewQueue
+from .segment_store import SegmentStore
+from .sqlite_store import SQLiteStore
 
-__all__ = ['FileStore']
+__all__ = ['AsyncStore', 'ThreadedAsyncStore', 'as_async', 'FileStore', 'ReviewQueue', 'SegmentStore', 'SQLiteStore']
\ No newline at end of file
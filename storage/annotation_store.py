@@ -1,70 +1,279 @@
 import pymongo
+from pymongo import InsertOne, ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from bson import ObjectId
 
+from config.settings import MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE
+from .errors import VersionConflictError
+from .query import normalize_filters, encode_cursor, decode_cursor, project, DERIVED_FIELDS
+from .summary import summarize_annotation
+
+# Fields summarize_annotation needs, so summary scans skip document text
+SUMMARY_PROJECTION = {
+    "timestamp": 1, "needs_human_review": 1, "human_reviewed": 1, "confidence_score": 1,
+    "validation_score": 1, "model_name": 1, "version": 1,
+    "entities.type": 1, "entities.validation.valid": 1
+}
+
+# Fields of the pre-review annotation that go into a correction record
+REVIEW_PROJECTION = {"entities": 1, "confidence_score": 1, "version": 1}
+
+# Indexes shared by AnnotationStore and MotorAnnotationStore. The review index serves
+# review pages newest first; the (timestamp, _id) index serves query() pages.
+ANNOTATION_INDEXES = [
+    [("needs_human_review", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)],
+    [("timestamp", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+]
+CORRECTION_INDEXES = [
+    [("document_id", pymongo.ASCENDING), ("correction_timestamp", pymongo.ASCENDING)]
+]
+
+def id_match(document_id: Any) -> Any:
+    """Query value for a document ID given as a string, whether it is stored as an ObjectId or a string"""
+    if isinstance(document_id, str) and ObjectId.is_valid(document_id):
+        return {"$in": [ObjectId(document_id), document_id]}
+    return document_id
+
+def replace_filter(annotation: Dict[str, Any], current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Set an annotation's version one past the stored one (current, or None if not stored)
+    and return a replace filter that only matches the stored version, so concurrent
+    saves can't share a version. An upsert that matches nothing raises DuplicateKeyError.
+    """
+    if current is None:
+        annotation["version"] = annotation.get("version", 0) + 1
+        return {"_id": annotation["_id"]}
+    annotation["version"] = (current.get("version") or 0) + 1
+    return {"_id": annotation["_id"], "version": current.get("version")}
+
+def bulk_save_requests(annotations: List[Dict[str, Any]]) -> List[Any]:
+    """Bulk write requests saving annotations, bumping the versions they were read at"""
+    requests = []
+    for annotation in annotations:
+        annotation["version"] = annotation.get("version", 0) + 1
+        if "_id" not in annotation:
+            # Assign IDs client-side so they can be returned without reading results back
+            annotation["_id"] = ObjectId()
+            requests.append(InsertOne(annotation))
+        else:
+            requests.append(ReplaceOne({"_id": annotation["_id"]}, annotation, upsert=True))
+    return requests
+
+def review_query(document_id: str, expected_version: Optional[int]) -> Dict[str, Any]:
+    """Filter matching the annotation a review applies to"""
+    query = {"_id": id_match(document_id)}
+    if expected_version is not None:
+        # Documents saved before versioning have no version field and count as 0
+        query["version"] = {"$in": [0, None]} if expected_version == 0 else expected_version
+    return query
+
+def review_update(corrected_entities: List[Dict]) -> Dict[str, Any]:
+    """Update applying a review and bumping the version"""
+    return {
+        "$set": {
+            "entities": corrected_entities,
+            "human_reviewed": True,
+            "review_timestamp": datetime.now()
+        },
+        "$inc": {"version": 1}
+    }
+
+def correction_record(original: Dict[str, Any], corrected_entities: List[Dict]) -> Dict[str, Any]:
+    """Correction record for active learning from the pre-review annotation"""
+    return {
+        # Same type as the annotation's _id, so imported string IDs match too
+        "document_id": original["_id"],
+        "original_entities": original.get("entities", []),
+        "corrected_entities": corrected_entities,
+        "correction_timestamp": datetime.now(),
+        "original_confidence": original.get("confidence_score", 0)
+    }
+
 class AnnotationStore:
     """MongoDB storage for annotations with human review tracking"""
-    
-    def __init__(self, connection_string: str = "mongodb://localhost:27017/", 
-                 db_name: str = "annotation_db"):
-        """Initialize connection to MongoDB"""
-        self.client = pymongo.MongoClient(connection_string)
+
+    # pymongo clients are safe to share between threads
+    thread_safe = True
+
+    def __init__(self, connection_string: str = "mongodb://localhost:27017/",
+                 db_name: str = "annotation_db", max_pool_size: int = MONGO_MAX_POOL_SIZE,
+                 min_pool_size: int = MONGO_MIN_POOL_SIZE, client=None):
+        """
+        Initialize connection to MongoDB
+
+        Args:
+            max_pool_size: Most concurrent connections per server
+            min_pool_size: Connections kept open while idle
+            client: Existing client to use instead of connecting (e.g. mongomock)
+        """
+        self.client = client or pymongo.MongoClient(connection_string, maxPoolSize=max_pool_size,
+                                                    minPoolSize=min_pool_size)
         self.db = self.client[db_name]
         self.annotations = self.db.annotations
         self.corrections = self.db.corrections
-        
+
         # Create indexes for faster queries
-        self.annotations.create_index("needs_human_review")
-        self.corrections.create_index("document_id")
-    
+        for keys in ANNOTATION_INDEXES:
+            self.annotations.create_index(keys)
+        for keys in CORRECTION_INDEXES:
+            self.corrections.create_index(keys)
+
     def save_annotation(self, annotation: Dict[str, Any]) -> str:
-        """Save an annotation to the database"""
+        """Save an annotation to the database, one version past the stored one"""
         if "_id" not in annotation:
+            annotation["version"] = annotation.get("version", 0) + 1
             result = self.annotations.insert_one(annotation)
             return str(result.inserted_id)
-        else:
-            self.annotations.replace_one({"_id": annotation["_id"]}, annotation)
+
+        while True:
+            current = self.annotations.find_one({"_id": annotation["_id"]}, {"version": 1})
+            try:
+                self.annotations.replace_one(replace_filter(annotation, current), annotation, upsert=True)
+            except DuplicateKeyError:
+                # Another save replaced or inserted it first; bump past that one
+                continue
             return str(annotation["_id"])
-    
-    def find_by_review_status(self, needs_review: bool = True, limit: int = 10) -> List[Dict]:
-        """Find annotations by review status"""
-        cursor = self.annotations.find({"needs_human_review": needs_review}).limit(limit)
+
+    def save_annotations(self, annotations: List[Dict[str, Any]]) -> List[str]:
+        """Save many annotations in one unordered bulk write"""
+        requests = bulk_save_requests(annotations)
+        if requests:
+            self.annotations.bulk_write(requests, ordered=False)
+        return [str(annotation["_id"]) for annotation in annotations]
+
+    def find_by_review_status(self, needs_review: bool = True, limit: int = 10,
+                              projection: Optional[Dict[str, int]] = None) -> List[Dict]:
+        """Find annotations by review status, newest first"""
+        cursor = self.annotations.find({"needs_human_review": needs_review}, projection) \
+            .sort("timestamp", pymongo.DESCENDING).limit(limit)
         return list(cursor)
-    
-    def find_by_id(self, document_id: str) -> Optional[Dict]:
+
+    def find_by_id(self, document_id: str, projection: Optional[Dict[str, int]] = None) -> Optional[Dict]:
         """Find an annotation by ID"""
-        return self.annotations.find_one({"_id": ObjectId(document_id)})
-    
-    def update_after_review(self, document_id: str, corrected_entities: List[Dict]) -> Dict:
+        return self.annotations.find_one({"_id": id_match(document_id)}, projection)
+
+    def iter_summaries(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the routing fields of every stored annotation"""
+        for annotation in self.annotations.find({}, SUMMARY_PROJECTION):
+            annotation["_id"] = str(annotation["_id"])
+            yield summarize_annotation(annotation)
+
+    def iter_annotations(self, after: Optional[str] = None, batch_size: int = 1000) -> Iterator[Dict]:
+        """Every annotation in _id order, optionally only those after an ID, for bulk exports"""
+        query = {}
+        if after is not None:
+            query = {"_id": {"$gt": ObjectId(after) if ObjectId.is_valid(after) else after}}
+        return self.annotations.find(query).sort("_id", pymongo.ASCENDING).batch_size(batch_size)
+
+    def _build_query(self, filters: Optional[Dict[str, Any]], cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Translate query filters and a page cursor into a MongoDB query"""
+        filters = normalize_filters(filters)
+        clauses = []
+        if "needs_review" in filters:
+            clauses.append({"needs_human_review": filters["needs_review"]})
+        if "human_reviewed" in filters:
+            # Unreviewed documents usually have no human_reviewed field at all
+            clauses.append({"human_reviewed": True if filters["human_reviewed"] else {"$ne": True}})
+        if "model_name" in filters:
+            clauses.append({"model_name": filters["model_name"]})
+        confidence = {}
+        if "min_confidence" in filters:
+            confidence["$gte"] = filters["min_confidence"]
+        if "max_confidence" in filters:
+            confidence["$lte"] = filters["max_confidence"]
+        if confidence:
+            clauses.append({"confidence_score": confidence})
+        if "entity_type" in filters:
+            clauses.append({"entities.type": filters["entity_type"]})
+        if "start" in filters or "end" in filters:
+            # Timestamps are stored as epoch seconds or ISO strings; match either
+            epoch, iso = {}, {}
+            for key, operator in (("start", "$gte"), ("end", "$lt")):
+                if key in filters:
+                    epoch[operator] = filters[key]
+                    iso[operator] = datetime.fromtimestamp(filters[key]).isoformat()
+            clauses.append({"$or": [{"timestamp": epoch}, {"timestamp": iso}]})
+        if cursor is not None:
+            clauses.append(self._after_cursor(cursor))
+        return {"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else {})
+
+    def _after_cursor(self, cursor: str) -> Dict[str, Any]:
+        """Condition for documents after a cursor in (timestamp, _id) descending order"""
+        timestamp, document_id, is_object_id = decode_cursor(cursor)
+        last_id = ObjectId(document_id) if is_object_id else document_id
+        if timestamp is None:
+            return {"timestamp": None, "_id": {"$lt": last_id}}
+        # Comparisons only match values of the same BSON type, and in descending
+        # order strings come before numbers, which come before missing timestamps
+        conditions = [{"timestamp": {"$lt": timestamp}},
+                      {"timestamp": timestamp, "_id": {"$lt": last_id}},
+                      {"timestamp": None}]
+        if isinstance(timestamp, str):
+            conditions.append({"timestamp": {"$type": "number"}})
+        return {"$or": conditions}
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, projection: Optional[List[str]] = None,
+              limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Page through annotations newest first; see FileStore.query"""
+        query = self._build_query(filters, cursor)
+        mongo_projection = None
+        derived = projection is not None and any(field in DERIVED_FIELDS for field in projection)
+        if projection is not None:
+            mongo_projection = {field: 1 for field in projection if field not in DERIVED_FIELDS}
+            mongo_projection["timestamp"] = 1
+            if derived and "entities" not in mongo_projection:
+                mongo_projection.update({"entities.type": 1, "entities.validation.valid": 1})
+
+        documents = list(self.annotations.find(query, mongo_projection)
+                         .sort([("timestamp", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+                         .limit(limit + 1))
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = encode_cursor([last.get("timestamp"), str(last["_id"]),
+                                         isinstance(last["_id"], ObjectId)])
+
+        items = [project(document, projection, summarize_annotation(document) if derived else None)
+                 for document in documents]
+        return {"items": items, "next_cursor": next_cursor}
+
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Number of annotations matching the filters"""
+        return self.annotations.count_documents(self._build_query(filters))
+
+    def update_after_review(self, document_id: str, corrected_entities: List[Dict],
+                            expected_version: Optional[int] = None) -> Dict:
         """Update annotation after human review"""
-        # Find original annotation
-        original = self.find_by_id(document_id)
-        if not original:
-            raise ValueError(f"Document with ID {document_id} not found")
-        
-        # Store correction record for active learning
-        correction_record = {
-            "document_id": ObjectId(document_id),
-            "original_entities": original.get("entities", []),
-            "corrected_entities": corrected_entities,
-            "correction_timestamp": datetime.now(),
-            "original_confidence": original.get("confidence_score", 0)
-        }
-        self.corrections.insert_one(correction_record)
-        
-        # Update the original annotation
-        self.annotations.update_one(
-            {"_id": ObjectId(document_id)},
-            {"$set": {
-                "entities": corrected_entities,
-                "human_reviewed": True,
-                "review_timestamp": datetime.now()
-            }}
+        # Apply the review and read back the pre-review state in one round trip
+        original = self.annotations.find_one_and_update(
+            review_query(document_id, expected_version),
+            review_update(corrected_entities),
+            projection=REVIEW_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
-        
+
+        if original is None:
+            # Only the failure path pays for a second lookup to tell the two cases apart
+            current = self.find_by_id(document_id, {"version": 1})
+            if not current:
+                raise ValueError(f"Document with ID {document_id} not found")
+            raise VersionConflictError(document_id, expected_version, current.get("version", 0))
+
+        # Store correction record for active learning
+        self.corrections.insert_one(correction_record(original, corrected_entities))
+
         return {"status": "success", "document_id": document_id}
-    
-    def get_corrections(self, limit: int = 100) -> List[Dict]:
+
+    def get_corrections(self, limit: int = 100, projection: Optional[Dict[str, int]] = None) -> List[Dict]:
         """Retrieve correction records for active learning"""
-        return list(self.corrections.find().limit(limit))
+        return list(self.corrections.find({}, projection).limit(limit))
+
+    def get_corrections_for_document(self, document_id: str,
+                                     projection: Optional[Dict[str, int]] = None) -> List[Dict]:
+        """All corrections of a document, oldest first"""
+        cursor = self.corrections.find({"document_id": id_match(document_id)}, projection) \
+            .sort("correction_timestamp", pymongo.ASCENDING)
+        return list(cursor)
@@ -0,0 +1,242 @@
+# storage/archive.py
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator
+
+from .errors import MissingSegmentError
+
+try:
+    import zstandard
+except ImportError:  # gzip is used when zstandard isn't installed
+    zstandard = None
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS archived (
+        _id TEXT PRIMARY KEY,
+        segment TEXT NOT NULL,
+        block_offset INTEGER NOT NULL,
+        block_length INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        archived_at REAL NOT NULL,
+        manifest_row TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_archived_segment ON archived (segment);
+"""
+
+class AnnotationArchive:
+    """
+    Cold tier of annotations packed into compressed, write-once segment files.
+
+    Records are grouped into blocks of block_records JSON lines, each block
+    compressed on its own so one annotation is read back by decompressing one
+    block. A SQLite catalog holds the stub of every archived annotation: where
+    it is and its manifest row.
+    """
+
+    def __init__(self, directory: Path, compression: Optional[str] = None, level: int = 9,
+                 block_records: int = 128, cache_blocks: int = 16):
+        if compression is None:
+            compression = "zstd" if zstandard is not None else "gzip"
+        if compression not in ("zstd", "gzip"):
+            raise ValueError(f"Unknown compression '{compression}', expected 'zstd' or 'gzip'")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires zstandard (pip install zstandard)")
+
+        self.directory = Path(directory)
+        self.segments_dir = self.directory / "segments"
+        self.catalog_path = self.directory / "catalog.db"
+        self.compression = compression
+        self.level = level
+        self.block_records = block_records
+        self.cache_blocks = cache_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        # Opened on first use, so stores that never archive create nothing
+        self._conn = None
+
+    def exists(self) -> bool:
+        return self._conn is not None or self.catalog_path.exists()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.segments_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.catalog_path), timeout=30.0,
+                                         isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def _decompress(self, data: bytes, segment: str) -> bytes:
+        if segment.endswith(".gz"):
+            return gzip.decompress(data)
+        if zstandard is None:
+            raise ImportError("Reading zstd archive segments requires zstandard (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    def add(self, records: List[Dict[str, Any]], rows: List[List[str]]) -> str:
+        """Write records (with their manifest rows) to a new segment and catalog them"""
+        suffix = ".zst" if self.compression == "zstd" else ".gz"
+        segment = f"{int(time.time())}-{uuid.uuid4().hex[:8]}.seg{suffix}"
+        self._connection()
+
+        data = bytearray()
+        stubs = []
+        archived_at = time.time()
+        for start in range(0, len(records), self.block_records):
+            block_records = records[start:start + self.block_records]
+            block = self._compress("".join(json.dumps(record, separators=(",", ":")) + "\n"
+                                           for record in block_records).encode("utf-8"))
+            for position, record in enumerate(block_records):
+                row = rows[start + position]
+                stubs.append((record["_id"], segment, len(data), len(block), position,
+                              int(record.get("version", 0) or 0), archived_at, "\t".join(row)))
+            data += block
+
+        # The segment is durable before the catalog points at it
+        tmp_path = self.segments_dir / f".{segment}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.segments_dir / segment)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO archived VALUES (?, ?, ?, ?, ?, ?, ?, ?)", stubs)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return segment
+
+    def _stub(self, document_id: str) -> Optional[tuple]:
+        if not self.exists():
+            return None
+        with self._lock:
+            return self._connection().execute(
+                "SELECT segment, block_offset, block_length, position, version FROM archived WHERE _id = ?",
+                (document_id,)).fetchone()
+
+    def contains(self, document_id: str) -> bool:
+        return self._stub(document_id) is not None
+
+    def version(self, document_id: str) -> Optional[int]:
+        """Archived version of an annotation, or None if it isn't archived"""
+        stub = self._stub(document_id)
+        return stub[4] if stub is not None else None
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Read an archived record back from its segment"""
+        stub = self._stub(document_id)
+        if stub is None:
+            return None
+        segment, block_offset, block_length, position, _ = stub
+
+        key = (segment, block_offset)
+        with self._lock:
+            lines = self._blocks.get(key)
+            if lines is None:
+                try:
+                    with open(self.segments_dir / segment, "rb") as f:
+                        f.seek(block_offset)
+                        block = f.read(block_length)
+                except FileNotFoundError:
+                    # The annotation may have been saved again, emptying and deleting its segment
+                    if self._conn.execute("SELECT 1 FROM archived WHERE _id = ? AND segment = ?",
+                                          (document_id, segment)).fetchone() is None:
+                        return None
+                    raise MissingSegmentError(document_id, segment)
+                lines = self._decompress(block, segment).splitlines()
+                # Annotations archived together tend to be read together
+                self._blocks[key] = lines
+                while len(self._blocks) > self.cache_blocks:
+                    self._blocks.popitem(last=False)
+            else:
+                self._blocks.move_to_end(key)
+        return json.loads(lines[position])
+
+    def remove(self, document_id: str):
+        """Forget an archived annotation that was saved again in the hot tier, deleting its segment once empty"""
+        if not self.exists():
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stub = conn.execute("SELECT segment FROM archived WHERE _id = ?", (document_id,)).fetchone()
+                conn.execute("DELETE FROM archived WHERE _id = ?", (document_id,))
+                empty = stub is not None and conn.execute(
+                    "SELECT 1 FROM archived WHERE segment = ? LIMIT 1", (stub[0],)).fetchone() is None
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if empty:
+                self._delete_segment(stub[0])
+
+    def _delete_segment(self, segment: str):
+        (self.segments_dir / segment).unlink(missing_ok=True)
+        for key in [key for key in self._blocks if key[0] == segment]:
+            del self._blocks[key]
+
+    def collect_garbage(self) -> int:
+        """
+        Delete segment files no catalog entry refers to, e.g. left behind by a crash,
+        and temp files of interrupted writes. Returns the number of files deleted.
+
+        The caller must hold the store lock, so no segment is being added meanwhile.
+        """
+        if not self.exists() or not self.segments_dir.exists():
+            return 0
+        deleted = 0
+        with self._lock:
+            live = {segment for (segment,) in
+                    self._connection().execute("SELECT DISTINCT segment FROM archived")}
+            for path in self.segments_dir.iterdir():
+                if path.name not in live:
+                    self._delete_segment(path.name)
+                    deleted += 1
+        return deleted
+
+    def count(self) -> int:
+        if not self.exists():
+            return 0
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM archived").fetchone()[0]
+
+    def iter_rows(self) -> Iterator[List[str]]:
+        """Manifest rows of every archived annotation"""
+        if not self.exists():
+            return
+        with self._lock:
+            rows = self._connection().execute("SELECT manifest_row FROM archived").fetchall()
+        for (row,) in rows:
+            yield row.split("\t")
+
+    def footprint(self) -> Dict[str, int]:
+        """Bytes used by segments and the catalog"""
+        segment_bytes = sum(path.stat().st_size for path in self.segments_dir.glob("*.seg.*")) \
+            if self.segments_dir.exists() else 0
+        catalog_bytes = self.catalog_path.stat().st_size if self.catalog_path.exists() else 0
+        return {"segment_bytes": segment_bytes, "catalog_bytes": catalog_bytes}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
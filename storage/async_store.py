@@ -0,0 +1,111 @@
+# storage/async_store.py
+import asyncio
+import threading
+from itertools import islice
+from typing import List, Dict, Any, Optional, AsyncIterator, Protocol, runtime_checkable
+
+@runtime_checkable
+class AsyncStore(Protocol):
+    """Store interface for code running on an asyncio event loop"""
+
+    async def asave_annotation(self, annotation: Dict[str, Any]) -> str: ...
+
+    async def asave_annotations(self, annotations: List[Dict[str, Any]]) -> List[str]: ...
+
+    async def afind_by_id(self, document_id: str) -> Optional[Dict]: ...
+
+    async def afind_by_review_status(self, needs_review: bool = True, limit: int = 10) -> List[Dict]: ...
+
+    async def aupdate_after_review(self, document_id: str, corrected_entities: List[Dict],
+                                   expected_version: Optional[int] = None) -> Dict: ...
+
+    async def aget_corrections(self, limit: int = 100) -> List[Dict]: ...
+
+    async def aget_statistics(self) -> Dict[str, Any]: ...
+
+    def aiter_summaries(self, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]: ...
+
+    async def aflush(self): ...
+
+class ThreadedAsyncStore:
+    """Runs a synchronous store's blocking calls in worker threads"""
+
+    def __init__(self, store, serialize: Optional[bool] = None):
+        """
+        Wrap a synchronous store
+
+        Args:
+            store: FileStore, MemoryStore, SegmentStore, SQLiteStore or AnnotationStore
+            serialize: Run one call at a time; defaults to True unless the store
+                declares itself thread-safe
+        """
+        self.store = store
+        if serialize is None:
+            serialize = not getattr(store, "thread_safe", False)
+        # FileStore keeps plain dicts as its index, so calls must not interleave
+        self._lock = threading.Lock() if serialize else None
+
+    def _call(self, method, *args, **kwargs):
+        if self._lock is None:
+            return method(*args, **kwargs)
+        with self._lock:
+            return method(*args, **kwargs)
+
+    async def _run(self, method, *args, **kwargs):
+        return await asyncio.to_thread(self._call, method, *args, **kwargs)
+
+    async def asave_annotation(self, annotation: Dict[str, Any]) -> str:
+        return await self._run(self.store.save_annotation, annotation)
+
+    async def asave_annotations(self, annotations: List[Dict[str, Any]]) -> List[str]:
+        """Save a batch, using the store's bulk path when it has one"""
+        if hasattr(self.store, "save_annotations"):
+            return await self._run(self.store.save_annotations, annotations)
+        return await self._run(lambda: [self.store.save_annotation(a) for a in annotations])
+
+    async def afind_by_id(self, document_id: str) -> Optional[Dict]:
+        return await self._run(self.store.find_by_id, document_id)
+
+    async def afind_by_review_status(self, needs_review: bool = True, limit: int = 10) -> List[Dict]:
+        return await self._run(self.store.find_by_review_status, needs_review, limit)
+
+    async def aupdate_after_review(self, document_id: str, corrected_entities: List[Dict],
+                                   expected_version: Optional[int] = None) -> Dict:
+        return await self._run(self.store.update_after_review, document_id, corrected_entities,
+                               expected_version=expected_version)
+
+    async def aget_corrections(self, limit: int = 100) -> List[Dict]:
+        return await self._run(self.store.get_corrections, limit)
+
+    async def aget_statistics(self) -> Dict[str, Any]:
+        return await self._run(self.store.get_statistics)
+
+    async def aiter_summaries(self, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over summaries, fetching them from a worker thread in batches"""
+        if self._lock is not None:
+            # Other calls may modify the index between batches, so take one snapshot
+            summaries = await self._run(lambda: list(self.store.iter_summaries()))
+            for start in range(0, len(summaries), batch_size):
+                for summary in summaries[start:start + batch_size]:
+                    yield summary
+                await asyncio.sleep(0)
+            return
+
+        iterator = iter(self.store.iter_summaries())
+        while True:
+            batch = await self._run(lambda: list(islice(iterator, batch_size)))
+            if not batch:
+                return
+            for summary in batch:
+                yield summary
+
+    async def aflush(self):
+        """Flush buffered writes if the store buffers them"""
+        if hasattr(self.store, "flush"):
+            await self._run(self.store.flush)
+
+def as_async(store) -> AsyncStore:
+    """Return an async view of a store, wrapping synchronous stores in worker threads"""
+    if isinstance(store, AsyncStore):
+        return store
+    return ThreadedAsyncStore(store)
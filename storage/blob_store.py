@@ -0,0 +1,143 @@
+# storage/blob_store.py
+import gzip
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # gzip is used when zstandard isn't installed
+    zstandard = None
+
+from .write_behind import atomic_write
+
+class BlobStore:
+    """Content-addressed store of compressed document texts, each stored once"""
+
+    def __init__(self, directory: Path, compression: Optional[str] = None, level: int = 6,
+                 cache_size: int = 256, fsync: bool = False):
+        """
+        Initialize the blob directory
+
+        Args:
+            directory: Where blobs are kept, sharded by the first two hash characters
+            compression: "zstd" or "gzip"; defaults to zstd when installed
+            level: Compression level
+            cache_size: Decompressed texts kept in memory
+            fsync: Make each new blob durable before put() returns
+        """
+        if compression is None:
+            compression = "zstd" if zstandard is not None else "gzip"
+        if compression not in ("zstd", "gzip"):
+            raise ValueError(f"Unknown compression '{compression}', expected 'zstd' or 'gzip'")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires zstandard (pip install zstandard)")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self.level = level
+        self.fsync = fsync
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+        # Trained dictionaries by ID; new blobs use the latest one
+        self._dictionaries = {}
+        self._compressor = None
+        if compression == "zstd":
+            self._load_dictionaries()
+
+    def _load_dictionaries(self):
+        latest = None
+        for path in sorted(self.directory.glob("dictionary-*.zdict"), key=lambda p: p.stat().st_mtime_ns):
+            dictionary = zstandard.ZstdCompressionDict(path.read_bytes())
+            self._dictionaries[dictionary.dict_id()] = dictionary
+            latest = dictionary
+        self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=latest)
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _path(self, blob_hash: str, compression: Optional[str] = None) -> Path:
+        suffix = ".zst" if (compression or self.compression) == "zstd" else ".gz"
+        return self.directory / blob_hash[:2] / f"{blob_hash}{suffix}"
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == "zstd":
+            return self._compressor.compress(data)
+        # mtime=0 keeps the bytes identical for identical texts
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def _decompress(self, data: bytes, compression: str) -> bytes:
+        if compression == "gzip":
+            return gzip.decompress(data)
+        if zstandard is None:
+            raise ImportError("Reading zstd blobs requires zstandard (pip install zstandard)")
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        dictionary = self._dictionaries.get(dict_id) if dict_id else None
+        if dict_id and dictionary is None:
+            # Trained by another process since this one started
+            self._load_dictionaries()
+            dictionary = self._dictionaries[dict_id]
+        return zstandard.ZstdDecompressor(dict_data=dictionary).decompress(data)
+
+    def put(self, text: str) -> str:
+        """Store a text if it isn't stored yet; returns its hash"""
+        blob_hash = self.hash_text(text)
+        path = self._path(blob_hash)
+        if blob_hash not in self._cache and not path.exists() and \
+                not self._path(blob_hash, self._other_compression()).exists():
+            path.parent.mkdir(exist_ok=True)
+            atomic_write(path, self._compress(text.encode("utf-8")), fsync=self.fsync)
+        self._remember(blob_hash, text)
+        return blob_hash
+
+    def get(self, blob_hash: str) -> Optional[str]:
+        """Text stored under a hash, or None if there is no such blob"""
+        text = self._cache.get(blob_hash)
+        if text is not None:
+            self._cache.move_to_end(blob_hash)
+            return text
+        # Blobs written before a change of compression keep their original codec
+        for compression in (self.compression, self._other_compression()):
+            try:
+                data = self._path(blob_hash, compression).read_bytes()
+            except FileNotFoundError:
+                continue
+            text = self._decompress(data, compression).decode("utf-8")
+            break
+        else:
+            return None
+        self._remember(blob_hash, text)
+        return text
+
+    def _other_compression(self) -> str:
+        return "gzip" if self.compression == "zstd" else "zstd"
+
+    def _remember(self, blob_hash: str, text: str):
+        self._cache[blob_hash] = text
+        self._cache.move_to_end(blob_hash)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def train_dictionary(self, samples: List[str], dict_size: int = 112640) -> int:
+        """
+        Train a zstd dictionary on sample documents and use it for new blobs.
+
+        Short clinical notes share most of their boilerplate, which per-blob
+        compression can't exploit; a dictionary can. Existing blobs stay readable.
+        """
+        if self.compression != "zstd":
+            raise ValueError("Dictionaries require zstd compression")
+        dictionary = zstandard.train_dictionary(dict_size, [s.encode("utf-8") for s in samples])
+        atomic_write(self.directory / f"dictionary-{dictionary.dict_id()}.zdict",
+                     dictionary.as_bytes(), fsync=True)
+        self._load_dictionaries()
+        return dictionary.dict_id()
+
+    def footprint(self) -> Dict[str, int]:
+        """Blob count and bytes on disk"""
+        sizes = [path.stat().st_size for path in self.directory.glob("*/*")]
+        return {"blobs": len(sizes), "bytes": sum(sizes)}
@@ -0,0 +1,277 @@
+# storage/change_feed.py
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from .write_behind import atomic_write
+
+# Event types appended by the stores
+ANNOTATION_SAVED = "annotation_saved"
+REVIEW_COMPLETED = "review_completed"
+ANNOTATION_ARCHIVED = "annotation_archived"
+EVENT_TYPES = (ANNOTATION_SAVED, REVIEW_COMPLETED, ANNOTATION_ARCHIVED)
+
+CONSUMER_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+class ChangeFeed:
+    """
+    Durable, ordered log of store changes, one JSON event per line.
+
+    Every event gets the next sequence number (starting at 1). Events are kept in
+    segment files of segment_size events named after their first sequence number,
+    so the segment holding any sequence number is known without an index.
+    Appends must be made under the store's lock; reads need no lock.
+    """
+
+    def __init__(self, directory: Path, writer=None, segment_size: int = 100000, fsync: bool = False):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.writer = writer
+        self.segment_size = segment_size
+        # Without it, events lost with the page cache would have their sequence numbers handed out again
+        self.fsync = fsync
+
+        # Next sequence number and where the last append ended, re-synced from disk
+        # before each append since other processes append to the same feed
+        self._next_sequence = 1
+        self._segment_path = None
+        self._segment_offset = 0
+        self._handle = None
+
+        # Where reads ended: sequence number -> (segment path, byte offset after it)
+        self._positions = OrderedDict()
+
+    def segment_path(self, sequence: int) -> Path:
+        first = (sequence - 1) // self.segment_size * self.segment_size + 1
+        return self.directory / f"{first:020d}.jsonl"
+
+    def append(self, event_type: str, fields: Dict[str, Any]):
+        """Append an event; with a write-behind writer it is appended once the batch it describes is on disk"""
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown change event type '{event_type}', expected one of {EVENT_TYPES}")
+        event = {"type": event_type, "time": time.time()}
+        event.update(fields)
+        if self.writer is not None:
+            # The writer syncs the segment once per batch
+            self.writer.append_callback(lambda: self._write(event), sync=self._fsync)
+        else:
+            self._write(event)
+            self._fsync()
+
+    def _fsync(self):
+        """Make the events appended to the open segment durable, if asked to"""
+        if self.fsync and self._handle is not None:
+            os.fsync(self._handle.fileno())
+
+    def _write(self, event: Dict[str, Any]) -> int:
+        self._sync()
+        sequence = self._next_sequence
+        line = json.dumps(dict(event, seq=sequence), separators=(",", ":"), default=str) + "\n"
+        path = self.segment_path(sequence)
+        if path != self._segment_path:
+            self._segment_path, self._segment_offset = path, 0
+        # The segment stays open for appends; flushed so other processes see each event
+        if self._handle is None or self._handle.name != str(path):
+            # Events of a batch left in the segment being closed are synced first
+            self._fsync()
+            self.close()
+            self._handle = open(path, "ab")
+        data = line.encode("utf-8")
+        self._handle.write(data)
+        self._handle.flush()
+        self._segment_offset += len(data)
+        self._next_sequence = sequence + 1
+        return sequence
+
+    def _sync(self):
+        """Advance past events other processes appended since our last append"""
+        while True:
+            path = self.segment_path(self._next_sequence)
+            offset = self._segment_offset if path == self._segment_path else 0
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                return
+            if size == offset:
+                return
+            if size < offset:
+                offset = 0
+
+            with open(path, "rb+") as f:
+                f.seek(offset)
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    # A torn last line from an interrupted append; cut it so the next one starts clean
+                    f.truncate(offset + end)
+            last_line = data[:end].splitlines()[-1] if end else None
+            if last_line is not None:
+                self._next_sequence = json.loads(last_line)["seq"] + 1
+            self._segment_path, self._segment_offset = path, offset + end
+            if last_line is None or self.segment_path(self._next_sequence) == path:
+                return
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def last_sequence(self) -> int:
+        """Sequence number of the newest event, 0 if the feed is empty"""
+        for path in sorted(self.directory.glob("*.jsonl"), reverse=True):
+            with open(path, "rb") as f:
+                # The last complete line is almost always in the final few kilobytes
+                size = os.path.getsize(path)
+                f.seek(max(0, size - 65536))
+                lines = f.read().split(b"\n")[:-1]
+                if size > 65536 and len(lines) < 2:
+                    f.seek(0)
+                    lines = f.read().split(b"\n")[:-1]
+            lines = [line for line in lines[1 if size > 65536 else 0:] if line]
+            if lines:
+                return json.loads(lines[-1])["seq"]
+        return 0
+
+    def first_sequence(self) -> int:
+        """Sequence number of the oldest kept event (segments may have been pruned)"""
+        segments = sorted(self.directory.glob("*.jsonl"))
+        return int(segments[0].stem) if segments else 1
+
+    def read(self, after: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Up to `limit` events with sequence numbers above `after`, in order"""
+        events = []
+        sequence = max(after, self.first_sequence() - 1)
+        while len(events) < limit:
+            path, offset = self._position(sequence)
+            if path is None:
+                break
+            # Sequence numbers are contiguous, so an exhausted segment means no newer events yet
+            batch, end = self._read_segment(path, offset, limit - len(events))
+            if not batch:
+                break
+            events.extend(batch)
+            sequence = batch[-1]["seq"]
+            self._remember(sequence, path, end)
+        return events
+
+    def iter_events(self, after: int = 0, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Every event above `after` that exists now, read in batches"""
+        while True:
+            batch = self.read(after, batch_size)
+            if not batch:
+                return
+            yield from batch
+            after = batch[-1]["seq"]
+
+    def prune(self, before: int) -> int:
+        """Delete segments holding only events below `before`; returns segments deleted"""
+        deleted = 0
+        for path in sorted(self.directory.glob("*.jsonl")):
+            if int(path.stem) + self.segment_size <= before and path != self.segment_path(self._next_sequence):
+                path.unlink()
+                deleted += 1
+        return deleted
+
+    def _remember(self, sequence: int, path: Path, offset: int):
+        self._positions[sequence] = (path, offset)
+        while len(self._positions) > 64:
+            self._positions.popitem(last=False)
+
+    def _position(self, after: int) -> Tuple[Optional[Path], int]:
+        """Segment and byte offset of the first event above `after`"""
+        path = self.segment_path(after + 1)
+        if not path.exists():
+            return None, 0
+        # A read that ended at the end of a segment continues at the start of the next
+        if after in self._positions and self._positions[after][0] == path:
+            return self._positions[after]
+        return path, self._find_offset(path, after + 1)
+
+    def _find_offset(self, path: Path, sequence: int) -> int:
+        """Byte offset of the first event at or above `sequence`, by binary search over the segment"""
+        with open(path, "rb") as f:
+            low, high = 0, os.path.getsize(path)
+            while low < high:
+                middle = (low + high) // 2
+                # Move to the first line starting at or after middle
+                f.seek(middle - 1 if middle else 0)
+                if middle:
+                    f.readline()
+                line_start = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n") or json.loads(line)["seq"] >= sequence:
+                    high = middle
+                else:
+                    low = line_start + len(line)
+            # low is at a line start (or the end) after the binary search
+            return low
+
+    def _read_segment(self, path: Path, offset: int, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        events = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written
+                events.append(json.loads(line))
+                offset += len(line)
+                if len(events) >= limit:
+                    break
+        return events, offset
+
+class FeedConsumer:
+    """Named reader of a change feed that checkpoints how far it has processed"""
+
+    def __init__(self, feed: ChangeFeed, name: str):
+        if not CONSUMER_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid consumer name '{name}': use letters, digits, '-' and '_'")
+        self.feed = feed
+        self.name = name
+        self.checkpoint_path = feed.directory / "consumers" / f"{name}.json"
+        self.position = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> int:
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                return json.load(f)["sequence"]
+        except FileNotFoundError:
+            return 0
+
+    def commit(self, sequence: Optional[int] = None):
+        """Record that every event up to `sequence` (default: the last polled) is processed"""
+        if sequence is not None:
+            self.position = sequence
+        self.checkpoint_path.parent.mkdir(exist_ok=True)
+        atomic_write(self.checkpoint_path, json.dumps({"sequence": self.position, "time": time.time()}))
+
+    def seek(self, sequence: int):
+        """Continue after `sequence` (0 replays the whole feed); committed on the next commit()"""
+        self.position = sequence
+
+    def poll(self, limit: int = 1000) -> List[Dict[str, Any]]:
+        """The next batch of events after the current position"""
+        events = self.feed.read(self.position, limit)
+        if events:
+            self.position = events[-1]["seq"]
+        return events
+
+    def batches(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Batches of events until the feed is caught up. Each batch is checkpointed
+        when the next one is requested, so a consumer that stops mid-batch gets
+        that batch again on restart.
+        """
+        while True:
+            events = self.poll(batch_size)
+            if not events:
+                return
+            yield events
+            self.commit()
+
+    def lag(self) -> int:
+        """Events appended but not yet polled"""
+        return max(0, self.feed.last_sequence() - self.position)
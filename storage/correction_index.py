@@ -0,0 +1,35 @@
+# storage/correction_index.py
+from typing import List, Dict, Optional
+
+class CorrectionIndex:
+    """Maps each document ID to its correction IDs and its earliest correction"""
+
+    def __init__(self):
+        self._by_document = {}
+        # document_id -> (timestamp, correction_id) of the first correction
+        self._first = {}
+
+    def add(self, document_id: str, correction_id: str, timestamp: float):
+        """Record a correction of a document"""
+        correction_ids = self._by_document.setdefault(document_id, [])
+        if correction_id in correction_ids:
+            return
+        correction_ids.append(correction_id)
+
+        first = self._first.get(document_id)
+        if first is None or timestamp < first[0]:
+            self._first[document_id] = (timestamp, correction_id)
+
+    def first(self, document_id: str) -> Optional[str]:
+        """ID of the earliest correction, which holds the pre-review entities"""
+        first = self._first.get(document_id)
+        return first[1] if first else None
+
+    def correction_ids(self, document_id: str) -> List[str]:
+        return list(self._by_document.get(document_id, []))
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._first
+
+    def __len__(self) -> int:
+        return len(self._first)
@@ -0,0 +1,66 @@
+# storage/entity_delta.py
+import json
+from collections import defaultdict
+from typing import List, Dict, Any, Union
+
+# A delta lists the corrected entities in order: an int is the index of an
+# unchanged original entity, a [start, stop] pair a run of them, and a dict an
+# entity the reviewer added or edited.
+EntityDelta = List[Union[int, List[int], Dict[str, Any]]]
+
+def _entity_key(entity: Dict[str, Any]) -> str:
+    return json.dumps(entity, sort_keys=True, default=str)
+
+def diff_entities(original: List[Dict], corrected: List[Dict]) -> EntityDelta:
+    """Encode corrected entities relative to the original ones"""
+    positions = defaultdict(list)
+    for index, entity in enumerate(original):
+        positions[_entity_key(entity)].append(index)
+
+    delta = []
+    for entity in corrected:
+        indexes = positions.get(_entity_key(entity))
+        if not indexes:
+            delta.append(entity)
+            continue
+        index = indexes.pop(0)
+        # Extend a run of consecutive unchanged entities, so a delta grows with the edit
+        previous = delta[-1] if delta else None
+        if isinstance(previous, int) and previous + 1 == index:
+            delta[-1] = [previous, index + 1]
+        elif isinstance(previous, list) and previous[1] == index:
+            previous[1] = index + 1
+        else:
+            delta.append(index)
+    return delta
+
+def apply_entity_delta(original: List[Dict], delta: EntityDelta) -> List[Dict]:
+    """Rebuild the corrected entities from the original ones and a delta"""
+    entities = []
+    for item in delta:
+        if isinstance(item, int):
+            entities.append(original[item])
+        elif isinstance(item, list):
+            entities.extend(original[item[0]:item[1]])
+        else:
+            entities.append(item)
+    return entities
+
+def compact_correction(correction: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace corrected_entities with a delta against original_entities"""
+    if "corrected_entities" not in correction:
+        return correction
+    compact = {key: value for key, value in correction.items() if key != "corrected_entities"}
+    compact["corrected_delta"] = diff_entities(correction.get("original_entities", []),
+                                               correction["corrected_entities"])
+    return compact
+
+def expand_correction(correction: Dict[str, Any]) -> Dict[str, Any]:
+    """Restore corrected_entities on a correction stored as a delta"""
+    # Corrections referring to an original_version need it filled in from the history first
+    if "corrected_delta" not in correction or "original_entities" not in correction:
+        return correction
+    expanded = {key: value for key, value in correction.items() if key != "corrected_delta"}
+    expanded["corrected_entities"] = apply_entity_delta(correction.get("original_entities", []),
+                                                        correction["corrected_delta"])
+    return expanded
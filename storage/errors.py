@@ -0,0 +1,23 @@
+# storage/errors.py
+
+class VersionConflictError(ValueError):
+    """Raised when a write is based on a stale version of an annotation"""
+
+    def __init__(self, document_id: str, expected_version: int, actual_version: int):
+        super().__init__(
+            f"Document {document_id} was modified concurrently "
+            f"(expected version {expected_version}, found {actual_version})")
+        self.document_id = document_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+
+class LeaseError(ValueError):
+    """Raised when a review lease is missing, expired or held by someone else"""
+
+class MissingSegmentError(FileNotFoundError):
+    """Raised when the archive catalog refers to a segment file that no longer exists"""
+
+    def __init__(self, document_id: str, segment: str):
+        super().__init__(f"Archived annotation {document_id} is in segment {segment}, which is missing")
+        self.document_id = document_id
+        self.segment = segment
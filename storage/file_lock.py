@@ -0,0 +1,52 @@
+# storage/file_lock.py
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an in-process lock only
+    fcntl = None
+
+class FileLock:
+    """Exclusive lock shared by every thread and process using a data directory"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # flock is per open file, so threads of one process coordinate through an RLock
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._owner = None
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644) if fcntl else None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+        self._owner = threading.get_ident()
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def held(self) -> bool:
+        """Whether the calling thread holds the lock"""
+        return self._owner == threading.get_ident()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -1,53 +1,513 @@
 # storage/file_store.py
 import copy
-from typing import List, Dict, Any, Optional
+import heapq
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterator
 from pathlib import Path
+import re
+import threading
 import uuid
 import json
+import time
 from datetime import datetime
 
+from .archive import AnnotationArchive
+from .blob_store import BlobStore
+from .change_feed import ChangeFeed, FeedConsumer, ANNOTATION_SAVED, REVIEW_COMPLETED, ANNOTATION_ARCHIVED
+from .correction_index import CorrectionIndex
+from .entity_delta import compact_correction, expand_correction
+from .errors import VersionConflictError
+from .file_lock import FileLock
+from .layout import StoreLayout, FLAT, SHARDED
+from .search_index import SearchIndex
+from .snapshot import read_snapshot, encode_snapshot, snapshots_supported
+from .retention import RetentionPolicy
+from .query import normalize_filters, encode_cursor, decode_cursor, index_only, row_predicate, project
+from .manifest import decode_annotation_row, paused_gc, Manifest, ANNOTATION_TAG, ARCHIVED_TAG, A_ID, A_TIMESTAMP, A_NEEDS_REVIEW, A_VERSION, C_ID, C_DOCUMENT_ID, C_TIMESTAMP
+from .store_stats import StoreStatistics
+from .summary import summarize_annotation, summarize_correction, timestamp_to_epoch
+from .version_history import VersionHistory
+from .write_behind import WriteBehindWriter, atomic_write
+
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+def namespace_dir(data_dir: str, namespace: Optional[str] = None) -> Path:
+    """Root directory of a namespace; the default namespace is data_dir itself"""
+    if namespace is None:
+        return Path(data_dir)
+    if not NAMESPACE_PATTERN.match(namespace):
+        raise ValueError(f"Invalid namespace '{namespace}': use letters, digits, '-' and '_'")
+    return Path(data_dir) / "namespaces" / namespace
+
+def list_namespaces(data_dir: str = "data") -> List[str]:
+    """Names of the namespaces created under a data directory"""
+    root = Path(data_dir) / "namespaces"
+    return sorted(path.name for path in root.iterdir() if path.is_dir()) if root.exists() else []
+
 class FileStore:
     """File-based storage for annotations with human review tracking"""
     
-    def __init__(self, data_dir: str = "data"):
-        """Initialize file-based storage system"""
-        self.data_dir = Path(data_dir)
+    def __init__(self, data_dir: str = "data", review_queue=None, cache_size: int = 1024,
+                 stats_flush_interval: int = 100, write_behind: bool = False, fsync: bool = True,
+                 refresh_interval: Optional[float] = 1.0, namespace: Optional[str] = None,
+                 compress_documents: bool = False, compression: Optional[str] = None,
+                 snapshot_interval: Optional[int] = 10000, search_index: bool = False,
+                 keep_history: Optional[bool] = None, change_feed: Optional[bool] = None, sharded_layout: bool = False):
+        """
+        Initialize file-based storage system
+        
+        Args:
+            write_behind: Hand file writes to a background thread that commits them in
+                batches; call flush() before relying on them being on disk
+            fsync: Make each write-behind batch durable before flush() returns, and
+                each change feed event durable when it is appended
+            refresh_interval: Seconds between checks for other processes' writes on
+                reads (0 checks every read, None only on refresh())
+            namespace: Project whose annotations, indexes and statistics are kept
+                separately under data_dir/namespaces/<namespace>
+            compress_documents: Keep document texts once each in a compressed,
+                content-addressed blob store and only their hash in annotations, and
+                corrected entities as a delta from the original ones
+            compression: "zstd" or "gzip" for document blobs; zstd when installed
+            snapshot_interval: Manifest lines written between binary snapshots of the
+                index, which later opens load before replaying at most this many newer
+                lines (None only snapshots on write_snapshot(); needs msgpack, without it
+                the index is always rebuilt from the manifest)
+            search_index: Keep an inverted index of document words and entities for
+                search(); loaded on the first search and saved with the snapshot
+            keep_history: Keep every earlier version of an annotation as a delta from
+                the version that replaced it (see get_version() and as_of()); None keeps
+                it for stores that already have a history, which corrections refer to
+            change_feed: Append an event for every save, review and archiving to a
+                sequenced change feed for downstream consumers (see read_changes()); None
+                keeps appending to a feed the store already has, so consumers miss nothing
+            sharded_layout: Keep record files of a new store in hash-prefix subdirectories;
+                existing stores keep their layout until storage.migrate_layout converts them
+        """
+        self.namespace = namespace
+        self.data_dir = namespace_dir(data_dir, namespace)
+        self.review_queue = review_queue
         self.annotations_dir = self.data_dir / "annotations"
         self.corrections_dir = self.data_dir / "corrections"
         
+        # A store that kept a history goes on keeping it, as its corrections refer to it
+        has_history = next((self.data_dir / "history").glob("*/*.jsonl"), None) is not None
+        if keep_history is None:
+            keep_history = has_history
+        elif not keep_history and has_history:
+            raise ValueError("Corrections in this store refer to its version history; "
+                             "drop it with compact_history(keep_versions=0) before opening with keep_history=False")
+        
         # Create directories if they don't exist
         self.annotations_dir.mkdir(parents=True, exist_ok=True)
         self.corrections_dir.mkdir(parents=True, exist_ok=True)
         
-        # In-memory caches for faster access
-        self._annotations_cache = {}
-        self._corrections_cache = {}
+        # Serializes writers across processes sharing this directory
+        self._lock = FileLock(self.data_dir / ".lock")
+        
+        # Record files are flat unless a new store asks for shards; existing stores keep their layout
+        self._layout = StoreLayout(self.data_dir)
+        with self._lock:
+            if self._layout.path.exists():
+                self._layout.load()
+            else:
+                has_flat_files = next(self.annotations_dir.glob("*.json"), None) is not None
+                self._layout.load(default=SHARDED if sharded_layout and not has_flat_files else FLAT)
+        self._shard_dirs = set()
+        
+        # Optional background writer taking disk latency off the save path
+        self._writer = WriteBehindWriter(fsync=fsync, lock=self._lock) if write_behind else None
+        
+        # Document texts by content hash; re-annotations and reviews don't copy them.
+        # Only opened for stores that compress or already have blobs, so others get no blobs/
+        self.compress_documents = compress_documents
+        self._compression = compression
+        self._blob_fsync = fsync and write_behind
+        self._blobs = None
+        if compress_documents or (self.data_dir / "blobs").exists():
+            self._blob_store()
+        
+        # Earlier versions of updated annotations, as deltas
+        self._history = VersionHistory(self.data_dir / "history", writer=self._writer) if keep_history else None
+        
+        # Ordered events for downstream consumers; with write-behind they are appended once on disk
+        if change_feed is None:
+            change_feed = (self.data_dir / "feed").exists()
+        self._feed = ChangeFeed(self.data_dir / "feed", writer=self._writer, fsync=fsync) if change_feed else None
+        
+        # Cold tier of annotations moved out by apply_retention(), read back on demand
+        self._archive = AnnotationArchive(self.data_dir / "archive", compression)
+        
+        # Compact on-disk index of every annotation and correction
+        self._manifest = Manifest(self.data_dir / "manifest.tsv", writer=self._writer)
+        
+        # Bounded LRU of full annotation bodies, loaded on demand
+        self.cache_size = cache_size
+        self._annotation_lru = OrderedDict()
+        
+        # document_id -> corrections, so review pages don't scan every correction
+        self._correction_index = CorrectionIndex()
+        
+        # Running statistics, saved every stats_flush_interval writes
+        self._stats_path = self.data_dir / "stats.json"
+        self.stats_flush_interval = stats_flush_interval
+        self._stats_pending = 0
+        
+        # Other processes' writes are picked up by tailing the manifest
+        self.refresh_interval = refresh_interval
+        self._last_refresh = time.monotonic()
+        
+        # Binary snapshot of the index plus the manifest offset it covers
+        self._snapshot_path = self.data_dir / "index.snapshot"
+        self.snapshot_interval = snapshot_interval
+        self._snapshot_lines = 0
+        
+        # Full-text and entity search; documents whose indexed version is behind the
+        # manifest are stale and re-indexed before the next search
+        self._search = SearchIndex(self.data_dir / "search") if search_index else None
+        self._search_loaded = False
+        self._search_stale = set()
+        # Only threads holding _search_lock touch the index; writers just mark documents stale
+        self._search_lock = threading.RLock()
+        
+        # Load the index (not the annotation bodies)
+        self._load_manifest()
+    
+    def _load_manifest(self):
+        """Load the manifest index, building it from the data files on first use"""
+        with self._lock, paused_gc(freeze=True):
+            if not self._manifest.exists():
+                self._rebuild_manifest()
+                self._manifest.mark_read()
+                stats = None
+            else:
+                stats = self._restore_snapshot()
+                if stats is None:
+                    self._manifest.load()
+                    stats = StoreStatistics.load(self._stats_path, self._manifest.line_count)
+                    # Parsing the whole manifest is what the snapshot avoids, so take one soon
+                    self._snapshot_lines = -self.snapshot_interval if self.snapshot_interval else 0
+                if self._manifest.needs_compaction():
+                    self._manifest.compact()
+                    self._snapshot_lines = -self.snapshot_interval if self.snapshot_interval else 0
+            
+            self._build_indexes(stats)
+    
+    def _restore_snapshot(self) -> Optional[StoreStatistics]:
+        """Load the index from the snapshot and replay newer manifest lines; None if unusable"""
+        state = read_snapshot(self._snapshot_path)
+        if state is None or not self._manifest.restore(state):
+            return None
+        stats = StoreStatistics.from_state(state["stats"])
+        
+        changes = self._manifest.refresh()
+        if changes is None or stats is None:
+            # The manifest was replaced while loading; it has now been read in full
+            return StoreStatistics.load(self._stats_path, self._manifest.line_count)
+        for tag, previous, row in changes:
+            if tag == ANNOTATION_TAG:
+                stats.replace_annotation_row(previous, row)
+            elif tag == ARCHIVED_TAG:
+                stats.add_annotation_row(previous, -1)
+            else:
+                stats.add_correction_row(row)
+        self._snapshot_lines = state["line_count"]
+        return stats
+    
+    def write_snapshot(self) -> bool:
+        """Save the index so the next open loads it instead of parsing the manifest"""
+        if not snapshots_supported():
+            return False
+        # Rows in the snapshot must describe files that are already on disk
+        for _ in range(3):
+            if self._writer is not None:
+                self._writer.flush()
+            with self._lock:
+                if self._writer is not None and not self._writer.idle():
+                    continue
+                self.refresh()
+                state = self._manifest.snapshot_state()
+                state["stats"] = self._stats.to_state()
+            break
+        else:
+            return False
+        
+        # Encoding a large index takes a while; do it without holding up writers
+        data = encode_snapshot(state)
+        with self._lock:
+            atomic_write(self._snapshot_path, data)
+        if self._search_loaded:
+            with self._search_lock:
+                self._search.save()
+        self._snapshot_lines = state["line_count"]
+        return True
+    
+    def _maybe_snapshot(self):
+        if self.snapshot_interval is not None and \
+                self._manifest.line_count - self._snapshot_lines >= self.snapshot_interval:
+            self.write_snapshot()
+    
+    def _build_indexes(self, stats: Optional[StoreStatistics] = None):
+        """Build the correction index and, unless given, the statistics from the manifest"""
+        self._correction_index = CorrectionIndex()
+        for row in self._manifest.corrections.values():
+            self._index_correction(row)
+        
+        # Recount from the index when saved statistics are missing or stale
+        if stats is None:
+            stats = StoreStatistics.count_rows(self._manifest.annotations.values(),
+                                               self._manifest.corrections.values())
+        self._stats = stats
+        self.flush_statistics()
+    
+    def refresh(self) -> int:
+        """Pick up annotations and reviews written by other processes; returns changes applied"""
+        self._last_refresh = time.monotonic()
+        self._layout.check()
+        changes = self._manifest.refresh()
+        
+        # The manifest was compacted by another process and reloaded in full
+        if changes is None:
+            self._annotation_lru.clear()
+            self._build_indexes()
+            # Reloaded and reconciled by the next search
+            self._search_loaded = False
+            return len(self._manifest.annotations)
         
-        # Load existing data into cache
-        self._load_cache()
+        for tag, previous, row in changes:
+            if tag == ANNOTATION_TAG:
+                # Cached bodies of documents changed elsewhere are stale
+                self._annotation_lru.pop(row[A_ID], None)
+                if self._search_loaded:
+                    self._search_stale.add(row[A_ID])
+                self._stats.replace_annotation_row(previous, row)
+            elif tag == ARCHIVED_TAG:
+                # Archived elsewhere; find_by_id reads it back from the archive
+                self._annotation_lru.pop(previous[A_ID], None)
+                if self._search_loaded:
+                    self._search_stale.add(previous[A_ID])
+                self._stats.add_annotation_row(previous, -1)
+            else:
+                self._index_correction(row)
+                self._stats.add_correction_row(row)
+        return len(changes)
+    
+    def _maybe_refresh(self):
+        """Refresh if refresh_interval has passed since the last check"""
+        if self.refresh_interval is not None and \
+                time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+    
+    def flush_statistics(self):
+        """Save the running statistics so the next open can skip recounting"""
+        # Counters and line count must not move while they are written out, and
+        # another process's save must not interleave with this one
+        with self._lock:
+            self._stats.save(self._stats_path, self._manifest.line_count)
+            self._stats_pending = 0
+    
+    def _statistics_changed(self):
+        self._stats_pending += 1
+        if self._stats_pending >= self.stats_flush_interval:
+            self.flush_statistics()
+    
+    def _index_correction(self, row: List[str]):
+        """Add a manifest correction row to the per-document index"""
+        self._correction_index.add(row[C_DOCUMENT_ID], row[C_ID], float(row[C_TIMESTAMP]))
     
-    def _load_cache(self):
-        """Load existing annotations and corrections into memory"""
+    def _rebuild_manifest(self):
+        """Scan annotation and correction files once to create the manifest"""
         # Load annotations
-        for file_path in self.annotations_dir.glob("*.json"):
+        for file_path in StoreLayout.iter_record_files(self.annotations_dir):
             try:
                 with open(file_path, "r") as f:
                     annotation = json.load(f)
-                    self._annotations_cache[file_path.stem] = annotation
+                # Files are addressed by name, so the stem is the indexed ID
+                annotation["_id"] = file_path.stem
+                self._manifest.put_annotation(summarize_annotation(annotation))
             except Exception as e:
                 print(f"Error loading annotation {file_path}: {e}")
         
         # Load corrections
-        for file_path in self.corrections_dir.glob("*.json"):
+        for file_path in StoreLayout.iter_record_files(self.corrections_dir):
             try:
                 with open(file_path, "r") as f:
                     correction = json.load(f)
-                    self._corrections_cache[file_path.stem] = correction
+                correction["_id"] = file_path.stem
+                self._manifest.put_correction(summarize_correction(correction))
             except Exception as e:
                 print(f"Error loading correction {file_path}: {e}")
+        
+        # Make sure an empty store still gets a manifest file
+        self._manifest.path.touch()
+    
+    def _cache_annotation(self, annotation: Dict[str, Any]):
+        """Add an annotation body to the LRU, evicting the least recently used"""
+        self._annotation_lru[annotation["_id"]] = annotation
+        self._annotation_lru.move_to_end(annotation["_id"])
+        while len(self._annotation_lru) > self.cache_size:
+            self._annotation_lru.popitem(last=False)
+    
+    def _read_json(self, directory: Path, record_id: str, quiet: bool = False) -> Optional[Dict]:
+        """Read a JSON record, including writes still queued for the disk"""
+        # During a layout migration a record may still be at its old location
+        for file_path in self._layout.candidate_paths(directory, record_id):
+            try:
+                pending = self._writer.pending_file(file_path) if self._writer else None
+                if pending is not None:
+                    return json.loads(pending)
+                with open(file_path, "r") as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                continue
+            except (OSError, json.JSONDecodeError) as e:
+                if not quiet:
+                    print(f"Error loading {file_path}: {e}")
+                return None
+        
+        if not quiet:
+            print(f"Error loading {record_id}: no file in {directory}")
+        return None
+    
+    def _write_json(self, directory: Path, record: Dict[str, Any]):
+        """Write a JSON record, replacing any previous version atomically"""
+        # Pick up layout changes made by a migration in another process
+        self._layout.check()
+        file_path = self._layout.record_path(directory, record["_id"])
+        if file_path.parent not in self._shard_dirs:
+            file_path.parent.mkdir(exist_ok=True)
+            self._shard_dirs.add(file_path.parent)
+        
+        data = json.dumps(record, separators=(",", ":"))
+        if self._writer is not None:
+            self._writer.write_file(file_path, data)
+        else:
+            atomic_write(file_path, data)
+    
+    def _store_document(self, annotation: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of an annotation with its document text replaced by a blob reference"""
+        if not self.compress_documents or not isinstance(annotation.get("document"), str):
+            return annotation
+        record = {key: value for key, value in annotation.items() if key != "document"}
+        record["document_ref"] = self._blob_store().put(annotation["document"])
+        return record
+    
+    def _blob_store(self) -> BlobStore:
+        """The document blob store, opened on first use"""
+        if self._blobs is None:
+            self._blobs = BlobStore(self.data_dir / "blobs", self._compression, fsync=self._blob_fsync)
+        return self._blobs
+    
+    def _load_document(self, annotation: Dict[str, Any]) -> Dict[str, Any]:
+        """Restore the document text of an annotation read from disk"""
+        blob_hash = annotation.pop("document_ref", None)
+        if blob_hash is not None:
+            # Another process may have compressed it since this store was opened
+            annotation["document"] = self._blob_store().get(blob_hash)
+        return annotation
+    
+    def expand_records(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Put document texts back into hot annotation files that reference a blob, and full
+        corrected entity lists back into corrections stored as deltas, e.g. before rolling
+        back to a release without compact storage. Open the store with compress_documents=False
+        so later saves stay expanded. Versions are kept as the records don't change, and the
+        blobs are left in place.
+        
+        Returns:
+            {"annotations": annotation files rewritten, "corrections": correction files rewritten}
+        """
+        with self._lock:
+            self.refresh()
+            document_ids = list(self._manifest.annotations)
+            correction_ids = list(self._manifest.corrections)
+        
+        rewritten = {"annotations": 0, "corrections": 0}
+        for start in range(0, max(len(document_ids), len(correction_ids)), batch_size):
+            # History entries must be on disk before corrections referring to them are expanded
+            if self._writer is not None:
+                self._writer.flush()
+            with self._lock:
+                self.refresh()
+                for document_id in document_ids[start:start + batch_size]:
+                    if document_id not in self._manifest.annotations:
+                        continue
+                    record = self._read_json(self.annotations_dir, document_id, quiet=True)
+                    if record is not None and "document_ref" in record:
+                        self._write_json(self.annotations_dir, self._load_document(record))
+                        rewritten["annotations"] += 1
+                for correction_id in correction_ids[start:start + batch_size]:
+                    correction = self._read_json(self.corrections_dir, correction_id, quiet=True)
+                    if correction is not None and "corrected_delta" in correction:
+                        expanded = self._expand_correction(correction)
+                        if "corrected_entities" in expanded:
+                            self._write_json(self.corrections_dir, expanded)
+                            rewritten["corrections"] += 1
+        if self._writer is not None:
+            self._writer.flush()
+        return rewritten
+    
+    def _expand_correction(self, correction: Dict[str, Any]) -> Dict[str, Any]:
+        """A stored correction with corrected_entities instead of a delta, if its original is still known"""
+        original_entities = correction.get("original_entities")
+        if original_entities is None and self._history is not None:
+            current = self._read_record(correction["document_id"])
+            original = self._history.get(current, correction["original_version"]) if current is not None else None
+            original_entities = original.get("entities", []) if original is not None else None
+        if original_entities is None:
+            return correction
+        expanded = expand_correction(dict(correction, original_entities=original_entities))
+        if "original_entities" not in correction:
+            # Corrections referring to a history version keep doing so
+            del expanded["original_entities"]
+        return expanded
+    
+    def _read_correction(self, correction_id: str) -> Optional[Dict]:
+        """Read a correction; callers flush history first with _flush_history()"""
+        correction = self._read_json(self.corrections_dir, correction_id)
+        if correction is None:
+            return None
+        if self._history is not None and "original_version" in correction and "original_entities" not in correction:
+            original = self._get_version(correction["document_id"], correction["original_version"])
+            if original is not None:
+                correction["original_entities"] = original.get("entities", [])
+        return expand_correction(correction)
+    
+    def flush(self):
+        """Block until every queued write is on disk"""
+        if self._writer is not None:
+            self._writer.flush()
+        self.flush_statistics()
+        self._maybe_snapshot()
+    
+    def close(self):
+        """Flush pending writes and stop the background writer"""
+        if self._writer is not None:
+            self._writer.close()
+        self.flush_statistics()
+        self._maybe_snapshot()
+        if self._search_loaded:
+            with self._search_lock:
+                self._search.save()
+        if self._feed is not None:
+            self._feed.close()
+        self._archive.close()
+        self._lock.close()
     
     def save_annotation(self, annotation: Dict[str, Any]) -> str:
         """Save an annotation to the file system"""
+        with self._lock:
+            # Versions are bumped from what every process has written so far
+            self.refresh()
+            document_id = self._save_locked(annotation)
+        
+        # Write-behind stores snapshot on flush(), once their rows are on disk
+        if self._writer is None:
+            self._maybe_snapshot()
+        return document_id
+    
+    def _save_locked(self, annotation: Dict[str, Any]) -> str:
+        """Save an annotation; the caller holds the lock and has refreshed the manifest"""
         # Generate ID if not provided
         if "_id" not in annotation:
             annotation["_id"] = str(uuid.uuid4())
@@ -56,40 +516,83 @@ class FileStore:
         if "timestamp" not in annotation:
             annotation["timestamp"] = datetime.now().isoformat()
         
+        previous = self._manifest.annotations.get(annotation["_id"])
+        # Saving an archived annotation brings it back to the hot tier
+        archived = previous is None and self._archive.contains(annotation["_id"])
+        
+        # Bump the version used for optimistic concurrency checks past the stored one,
+        # so saves of a stale copy, or from two processes, never share a version
+        if previous is not None:
+            stored_version = int(previous[A_VERSION])
+        else:
+            stored_version = (self._archive.version(annotation["_id"]) or 0) if archived else 0
+        annotation["version"] = max(annotation.get("version", 0), stored_version) + 1
+        record = self._store_document(annotation)
+        
+        # Keep the version being replaced as a delta from this one
+        if self._history is not None and (previous is not None or archived):
+            previous_record = self._read_record(annotation["_id"])
+            if previous_record is not None:
+                self._history.append(previous_record, record, time.time())
+        
         # Save to file
-        file_path = self.annotations_dir / f"{annotation['_id']}.json"
-        with open(file_path, "w") as f:
-            json.dump(annotation, f, indent=2)
+        self._write_json(self.annotations_dir, record)
+        if archived:
+            # Forgotten by the archive once the hot copy is on disk
+            if self._writer is not None:
+                self._writer.append_callback(lambda: self._archive.remove(annotation["_id"]))
+            else:
+                self._archive.remove(annotation["_id"])
         
-        # Update cache
-        self._annotations_cache[annotation["_id"]] = annotation
+        # Update index, statistics and cache
+        summary = summarize_annotation(annotation)
+        row = self._manifest.put_annotation(summary)
+        self._stats.replace_annotation_row(previous, row)
+        if self._feed is not None:
+            self._feed.append(ANNOTATION_SAVED, {
+                "document_id": annotation["_id"],
+                "version": annotation["version"],
+                "created": previous is None and not archived,
+                "needs_human_review": summary["needs_human_review"],
+                "human_reviewed": summary["human_reviewed"],
+                "model_name": summary["model_name"]
+            })
+        self._statistics_changed()
+        self._cache_annotation(annotation)
+        if self._search_loaded:
+            self._search_stale.add(annotation["_id"])
         self.last_processed_id = annotation["_id"]
-        
         return annotation["_id"]
     
+    def save_annotations(self, annotations: List[Dict[str, Any]]) -> List[str]:
+        """Save a batch of annotations under one lock acquisition"""
+        with self._lock:
+            self.refresh()
+            document_ids = [self._save_locked(annotation) for annotation in annotations]
+        if self._writer is None:
+            self._maybe_snapshot()
+        return document_ids
+    
     def find_by_review_status(self, needs_review: bool = True, limit: int = 10) -> List[Dict]:
         """Find annotations by review status with prioritization for recent documents."""
-        import copy
-        
-        matching_annotations = []
+        self._maybe_refresh()
+        flag = "1" if needs_review else "0"
         
-        # Step 1: Collect all annotations matching the review status
-        for annotation_id, annotation in self._annotations_cache.items():
-            if annotation.get("needs_human_review", False) == needs_review:
-                # Create a deep copy to avoid modifying cache directly
-                annotation_copy = copy.deepcopy(annotation)
-                matching_annotations.append(annotation_copy)
-        
-        # Step 2: Sort annotations by timestamp (newest first)
-        matching_annotations.sort(
-            key=lambda x: x.get("timestamp", ""), 
-            reverse=True  # Most recent first
+        # Step 1: Select the newest matching documents from the index
+        rows = heapq.nlargest(
+            limit,
+            (row for row in self._manifest.annotations.values() if row[A_NEEDS_REVIEW] == flag),
+            key=lambda row: float(row[A_TIMESTAMP])
         )
         
-        # Step 3: Apply limit after sorting
-        results = matching_annotations[:limit]
+        # Step 2: Load only the selected bodies, copied so callers can't modify the cache
+        results = []
+        for row in rows:
+            annotation = self.find_by_id(row[A_ID])
+            if annotation:
+                results.append(copy.deepcopy(annotation))
         
-        # Step 4: Check for original states (before human correction)
+        # Step 3: Check for original states (before human correction)
         for annotation in results:
             document_id = annotation.get("_id")
             if document_id:
@@ -103,72 +606,534 @@ class FileStore:
 
     def _get_original_annotation(self, document_id: str) -> Optional[Dict]:
         """Get the original document state before corrections."""
-        for correction_id, correction in self._corrections_cache.items():
-            if correction.get("document_id") == document_id:
-                return correction
-        return None
+        correction_id = self._correction_index.first(document_id)
+        if correction_id is None:
+            return None
+        self._flush_history()
+        return self._read_correction(correction_id)
+    
+    def get_corrections_for_document(self, document_id: str) -> List[Dict]:
+        """All corrections of a document, in the order they were made"""
+        self._maybe_refresh()
+        self._flush_history()
+        corrections = []
+        for correction_id in self._correction_index.correction_ids(document_id):
+            correction = self._read_correction(correction_id)
+            if correction is not None:
+                corrections.append(correction)
+        return corrections
         
+    def current_version(self, document_id: str) -> Optional[int]:
+        """Version of a hot annotation as of the last refresh; None if archived or unknown"""
+        self._maybe_refresh()
+        row = self._manifest.annotations.get(document_id)
+        return int(row[A_VERSION]) if row is not None else None
+
     def find_by_id(self, document_id: str) -> Optional[Dict]:
         """Find an annotation by ID"""
-        return self._annotations_cache.get(document_id)
+        self._maybe_refresh()
+        annotation = self._annotation_lru.get(document_id)
+        if annotation is not None:
+            self._annotation_lru.move_to_end(document_id)
+            return annotation
+        
+        if document_id in self._manifest.annotations:
+            annotation = self._read_json(self.annotations_dir, document_id)
+        else:
+            # Only the archive catalog is consulted for IDs that aren't hot
+            annotation = self._archive.get(document_id)
+        if annotation is not None:
+            self._cache_annotation(self._load_document(annotation))
+        return annotation
     
-    def update_after_review(self, document_id: str, corrected_entities: List[Dict]) -> Dict:
-        """Update annotation after human review"""
-        # Find original annotation
-        original = self.find_by_id(document_id)
-        if not original:
-            raise ValueError(f"Document with ID {document_id} not found")
-        
-        # Store correction record for active learning
-        correction_id = str(uuid.uuid4())
-        correction_record = {
-            "_id": correction_id,
-            "document_id": document_id,
-            "original_entities": original.get("entities", []),
-            "corrected_entities": corrected_entities,
-            "correction_timestamp": datetime.now().isoformat(),
-            "original_confidence": original.get("confidence_score", 0)
-        }
+    def iter_summaries(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the routing fields of every stored annotation"""
+        self._maybe_refresh()
+        return self._manifest.iter_annotations()
+    
+    def iter_annotations(self, after: Optional[str] = None, batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Every annotation in the hot tier and the archive in ID order, optionally only
+        those after an ID, for bulk exports. Each is a fresh copy read from disk.
+        """
+        with self._lock:
+            self.refresh()
+            document_ids = set(self._manifest.annotations)
+            document_ids.update(row[A_ID] for row in self._archive.iter_rows())
+        document_ids = sorted(document_id for document_id in document_ids
+                              if after is None or document_id > after)
+        
+        for start in range(0, len(document_ids), batch_size):
+            # Each batch is read under the lock so retention can't move records mid-read
+            with self._lock:
+                self.refresh()
+                records = [self._read_record(document_id) for document_id in document_ids[start:start + batch_size]]
+            for record in records:
+                if record is not None:
+                    yield self._load_document(record)
+    
+    def query(self, filters: Optional[Dict[str, Any]] = None, projection: Optional[List[str]] = None,
+              limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Page through annotations newest first.
+        
+        Args:
+            filters: Any of storage.query.FILTER_KEYS
+            projection: Fields to return; index fields (storage.query.INDEX_FIELDS)
+                are answered without reading annotation files
+            limit: Page size
+            cursor: next_cursor of the previous page
         
-        # Save correction to file
-        correction_path = self.corrections_dir / f"{correction_id}.json"
-        with open(correction_path, "w") as f:
-            json.dump(correction_record, f, indent=2)
+        Returns:
+            {"items": [...], "next_cursor": token, or None on the last page}
+        """
+        self._maybe_refresh()
+        predicate = row_predicate(normalize_filters(filters))
+        rows = (row for row in self._manifest.annotations.values() if predicate(row))
+        if cursor is not None:
+            after = tuple(decode_cursor(cursor))
+            rows = (row for row in rows if (float(row[A_TIMESTAMP]), row[A_ID]) < after)
+        
+        # Keep only this page's rows (plus one to detect more); only they are loaded
+        page = heapq.nlargest(limit + 1, rows, key=lambda row: (float(row[A_TIMESTAMP]), row[A_ID]))
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor([float(page[-1][A_TIMESTAMP]), page[-1][A_ID]])
+        return {"items": self._project_rows(page, projection), "next_cursor": next_cursor}
+    
+    def _project_rows(self, rows: List[List[str]], projection: Optional[List[str]]) -> List[Dict]:
+        """Items for manifest rows, loading annotation bodies only if the projection needs them"""
+        items = []
+        for row in rows:
+            summary = decode_annotation_row(row)
+            if index_only(projection):
+                items.append(project(summary, projection))
+                continue
+            annotation = self.find_by_id(row[A_ID])
+            if annotation is not None:
+                # Copied so callers can't modify the cache; projections copy only their fields
+                items.append(copy.deepcopy(project(annotation, projection, summary)))
+        return items
+    
+    def search(self, query: str, limit: int = 20, projection: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Find annotations by document words and entities.
         
-        # Update cache
-        self._corrections_cache[correction_id] = correction_record
+        Args:
+            query: Words ("metoprolol", "chest pain"), entities (MED:metoprolol,
+                DOCTOR:"Dr. Chen", DOCTOR:* for any) combined with AND, OR, NOT and
+                parentheses; see storage.search_index.SearchIndex.search
+            limit: Maximum number of items, most recently saved first
+            projection: Fields to return, as for query()
         
-        # Update the original annotation
-        original["entities"] = corrected_entities
-        original["human_reviewed"] = True
-        original["review_timestamp"] = datetime.now().isoformat()
+        Returns:
+            {"items": [...], "total": number of matching annotations}
+        """
+        if self._search is None:
+            raise ValueError("This store was opened with search_index=False")
+        self._maybe_refresh()
+        # Re-indexing can take a while, so it never holds the store lock
+        with self._search_lock:
+            self._sync_search_index()
+            # Documents archived since the sync are dropped; fetch more until limit are left
+            fetch = limit
+            while True:
+                document_ids, total = self._search.search(query, fetch)
+                rows = [self._manifest.annotations.get(document_id) for document_id in document_ids]
+                rows = [row for row in rows if row is not None]
+                if len(rows) >= limit or len(document_ids) == total:
+                    break
+                fetch = 2 * fetch + len(document_ids) - len(rows)
+        
+        total -= len(document_ids) - len(rows)
+        return {"items": self._project_rows(rows[:limit], projection), "total": total}
+    
+    def _reconcile_search_index(self):
+        """Drop archived annotations from the search index and mark out-of-date ones stale"""
+        annotations = dict(self._manifest.annotations)
+        for document_id in self._search.document_ids():
+            if document_id not in annotations:
+                self._search.remove(document_id)
+        self._search_stale.update(document_id for document_id, row in annotations.items()
+                                  if self._search.version(document_id) != int(row[A_VERSION]))
+    
+    def _sync_search_index(self):
+        """Load the search index on first use and re-index stale annotations"""
+        if not self._search_loaded:
+            # Saves from here on mark documents stale, so none are missed by the reconcile
+            self._search_loaded = True
+            self._search.load()
+            self._reconcile_search_index()
+        if not self._search_stale:
+            return
+        
+        # Writers keep marking documents stale while this runs; take them one at a time
+        stale = set()
+        while self._search_stale:
+            stale.add(self._search_stale.pop())
+        rows = []
+        for document_id in stale:
+            row = self._manifest.annotations.get(document_id)
+            if row is None:
+                self._search.remove(document_id)
+            elif self._search.version(document_id) != int(row[A_VERSION]):
+                rows.append(row)
+        # Index oldest first so search results come newest first
+        rows.sort(key=lambda row: (float(row[A_TIMESTAMP]), row[A_ID]))
+        for row in rows:
+            annotation = self.find_by_id(row[A_ID])
+            if annotation is not None:
+                self._search.add(row[A_ID], annotation.get("version", 0), annotation.get("document", ""),
+                                 annotation.get("entities", []))
+        # Save a large catch-up right away rather than repeating it after a crash
+        if len(stale) >= 1000:
+            self._search.save()
+    
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Number of annotations matching the filters, counted from the index"""
+        self._maybe_refresh()
+        filters = normalize_filters(filters)
+        # Review-status counts are kept as running statistics
+        if not filters:
+            return self._stats.total_annotations
+        if list(filters) == ["needs_review"]:
+            needs_review = self._stats.needs_review
+            return needs_review if filters["needs_review"] else self._stats.total_annotations - needs_review
+        predicate = row_predicate(filters)
+        return sum(1 for row in self._manifest.annotations.values() if predicate(row))
+    
+    def update_after_review(self, document_id: str, corrected_entities: List[Dict],
+                            expected_version: Optional[int] = None) -> Dict:
+        """Update annotation after human review"""
+        with self._lock:
+            # Check versions against what other processes have written
+            self.refresh()
+            
+            # Find original annotation
+            original = self.find_by_id(document_id)
+            if not original:
+                raise ValueError(f"Document with ID {document_id} not found")
+            
+            # Reject reviews based on a version another process has since replaced
+            if expected_version is not None:
+                current_version = self._read_version(document_id)
+                if current_version != expected_version:
+                    raise VersionConflictError(document_id, expected_version, current_version)
+            
+            # Store correction record for active learning
+            correction_id = str(uuid.uuid4())
+            correction_record = {
+                "_id": correction_id,
+                "document_id": document_id,
+                "original_entities": original.get("entities", []),
+                "corrected_entities": corrected_entities,
+                "correction_timestamp": datetime.now().isoformat(),
+                "original_confidence": original.get("confidence_score", 0)
+            }
+            
+            # Save correction to file; compact stores keep the corrected entities as a delta
+            stored_correction = dict(correction_record)
+            if self.compress_documents:
+                stored_correction = compact_correction(correction_record)
+            if self._history is not None:
+                # The original entities are the version this review replaces, kept in the history
+                stored_correction.pop("original_entities")
+                stored_correction["original_version"] = original.get("version", 0)
+                stored_correction["entities_changed"] = correction_record["original_entities"] != corrected_entities
+            self._write_json(self.corrections_dir, stored_correction)
+            
+            # Update indexes
+            correction_row = self._manifest.put_correction(summarize_correction(correction_record))
+            self._index_correction(correction_row)
+            self._stats.add_correction_row(correction_row)
+            
+            # Update the original annotation
+            original["entities"] = corrected_entities
+            original["human_reviewed"] = True
+            original["review_timestamp"] = datetime.now().isoformat()
+            
+            # Save updated annotation
+            self.save_annotation(original)
+            if self._feed is not None:
+                self._feed.append(REVIEW_COMPLETED, {
+                    "document_id": document_id,
+                    "version": original["version"],
+                    "correction_id": correction_id,
+                    "entities_changed": correction_record["original_entities"] != corrected_entities
+                })
         
-        # Save updated annotation
-        self.save_annotation(original)
+        # Reviewed documents leave the review queue
+        if self.review_queue is not None:
+            self.review_queue.remove(document_id)
         
         return {"status": "success", "document_id": document_id}
     
+    def _flush_history(self):
+        """Make history entries queued by the background writer readable"""
+        # Only committed entries are readable. The writer commits under the store lock,
+        # so waiting for it while holding the lock would never return.
+        if self._history is None or self._writer is None:
+            return
+        if self._lock.held():
+            raise RuntimeError("History reads can't wait for the write-behind writer under the store lock")
+        self._writer.flush()
+    
+    def _current_record(self, document_id: str, flush: bool = True) -> Optional[Dict]:
+        """Stored record of an annotation, which history deltas apply to"""
+        if self._history is None:
+            raise ValueError("This store was opened with keep_history=False")
+        self._maybe_refresh()
+        if flush:
+            self._flush_history()
+        return self._read_record(document_id)
+    
+    def _read_record(self, document_id: str) -> Optional[Dict]:
+        """Stored record of an annotation from whichever tier holds it"""
+        if document_id in self._manifest.annotations:
+            return self._read_json(self.annotations_dir, document_id, quiet=True)
+        return self._archive.get(document_id)
+    
+    def get_version(self, document_id: str, version: int) -> Optional[Dict]:
+        """An annotation as it was at a version, or None if that version isn't kept"""
+        return self._get_version(document_id, version, flush=True)
+    
+    def _get_version(self, document_id: str, version: int, flush: bool = False) -> Optional[Dict]:
+        current = self._current_record(document_id, flush)
+        if current is None:
+            return None
+        record = self._history.get(current, version)
+        return self._load_document(record) if record is not None else None
+    
+    def as_of(self, document_id: str, timestamp: Any) -> Optional[Dict]:
+        """
+        An annotation as it was at a time (datetime, ISO string or epoch seconds).
+        
+        None if the annotation didn't exist yet; the oldest kept version if the
+        history before the time was compacted away.
+        """
+        current = self._current_record(document_id)
+        if current is None:
+            return None
+        epoch = timestamp_to_epoch(timestamp)
+        record = self._history.as_of(current, epoch)
+        if epoch < timestamp_to_epoch(record.get("timestamp")):
+            return None
+        return self._load_document(record)
+    
+    def get_history(self, document_id: str) -> List[Dict[str, Any]]:
+        """Kept versions of an annotation, newest first, with when each was superseded"""
+        current = self._current_record(document_id)
+        if current is None:
+            return []
+        entries = self._history.entries(document_id)
+        history = [{"version": current.get("version", 0), "superseded": None}]
+        versions = self._history.iter_versions(current, entries)
+        next(versions)
+        for entry, record in zip(reversed(entries), versions):
+            history.append({"version": record.get("version", 0), "superseded": entry["superseded"]})
+        return history
+    
+    def compact_history(self, keep_versions: Optional[int] = None, before: Any = None,
+                        document_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Drop old versions from the history of one or every annotation.
+        
+        Args:
+            keep_versions: Most earlier versions to keep per annotation
+            before: Drop versions superseded before this time
+            document_id: Only compact this annotation's history
+        
+        Returns:
+            {"documents": histories compacted, "versions_dropped": versions removed}
+        """
+        if self._history is None:
+            raise ValueError("This store was opened with keep_history=False")
+        before = timestamp_to_epoch(before) if before is not None else None
+        if self._writer is not None:
+            self._writer.flush()
+        
+        documents = dropped = 0
+        with self._lock:
+            self.refresh()
+            document_ids = [document_id] if document_id is not None else list(self._history.document_ids())
+            for document_id in document_ids:
+                current = self._read_record(document_id)
+                if current is None:
+                    continue
+                entries = self._history.entries(document_id)
+                versions = self._history.iter_versions(current, entries)
+                next(versions)
+                # (entry, the version it restores) newest first, up to any break in the chain
+                chain = list(zip(reversed(entries), versions))
+                
+                kept = 0
+                for entry, _ in chain:
+                    if keep_versions is not None and kept >= keep_versions:
+                        break
+                    if before is not None and entry["superseded"] < before:
+                        break
+                    kept += 1
+                if kept == len(entries):
+                    continue
+                
+                # Corrections referring to dropped versions get their original entities back inline
+                dropped_versions = {record.get("version", 0): record for _, record in chain[kept:]}
+                for correction_id in self._correction_index.correction_ids(document_id):
+                    correction = self._read_json(self.corrections_dir, correction_id, quiet=True)
+                    if correction is None or "original_entities" in correction:
+                        continue
+                    original = dropped_versions.get(correction.get("original_version"))
+                    if original is not None:
+                        correction["original_entities"] = original.get("entities", [])
+                        del correction["original_version"], correction["entities_changed"]
+                        self._write_json(self.corrections_dir, correction)
+                
+                self._history.truncate(document_id, entries, kept)
+                documents += 1
+                dropped += len(entries) - kept
+        return {"documents": documents, "versions_dropped": dropped}
+    
+    def apply_retention(self, policy: RetentionPolicy, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Move the annotations a retention policy selects to the archive tier.
+        
+        Archived annotations leave the manifest, statistics, caches and search index
+        of every process; find_by_id() still returns them, read from compressed
+        archive segments, and saving one brings it back to the hot tier. Each batch
+        becomes one segment and is moved under one lock acquisition.
+        
+        Returns:
+            {"archived": annotations moved, "segments": segments written, "hot": annotations left,
+             "segments_deleted": segment files no longer referenced that were deleted}
+        """
+        if self._writer is not None:
+            self._writer.flush()
+        with self._lock:
+            self.refresh()
+            document_ids = policy.select(self._manifest.annotations.values())
+        
+        archived = segments = 0
+        for start in range(0, len(document_ids), batch_size):
+            with self._lock:
+                self.refresh()
+                records, rows = [], []
+                for document_id in document_ids[start:start + batch_size]:
+                    row = self._manifest.annotations.get(document_id)
+                    record = self._read_json(self.annotations_dir, document_id, quiet=True) if row else None
+                    # Skip annotations saved again since they were selected
+                    if record is not None and record.get("version", 0) == int(row[A_VERSION]):
+                        records.append(record)
+                        rows.append(row)
+                if not records:
+                    continue
+                
+                # The segment and its catalog entries are durable before the manifest drops the rows
+                self._archive.add(records, rows)
+                for row in rows:
+                    self._manifest.archive_annotation(row[A_ID])
+                    if self._feed is not None:
+                        self._feed.append(ANNOTATION_ARCHIVED, {"document_id": row[A_ID],
+                                                                "version": int(row[A_VERSION])})
+                    self._stats.add_annotation_row(row, -1)
+                    self._annotation_lru.pop(row[A_ID], None)
+                    if self._search_loaded:
+                        self._search_stale.add(row[A_ID])
+                self._statistics_changed()
+            
+            # Hot files are deleted once no process can still find them in the manifest
+            if self._writer is not None:
+                self._writer.flush()
+            with self._lock:
+                self.refresh()
+                for row in rows:
+                    if row[A_ID] not in self._manifest.annotations:
+                        for file_path in self._layout.candidate_paths(self.annotations_dir, row[A_ID]):
+                            file_path.unlink(missing_ok=True)
+            archived += len(rows)
+            segments += 1
+        
+        with self._lock:
+            # Segments emptied by saves are deleted as they empty; this catches crash leftovers
+            segments_deleted = self._archive.collect_garbage()
+        if archived:
+            with self._lock:
+                if self._manifest.needs_compaction():
+                    self._manifest.compact()
+                self.flush_statistics()
+            # Later opens load the smaller index instead of replaying the archived rows
+            if self.snapshot_interval is not None:
+                self.write_snapshot()
+        return {"archived": archived, "segments": segments, "hot": len(self._manifest.annotations),
+                "segments_deleted": segments_deleted}
+    
+    def read_changes(self, after: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Up to `limit` change events with sequence numbers above `after`, oldest first"""
+        if self._feed is None:
+            raise ValueError("This store was opened with change_feed=False")
+        return self._feed.read(after, limit)
+    
+    def last_change_sequence(self) -> int:
+        """Sequence number of the newest change event"""
+        if self._feed is None:
+            raise ValueError("This store was opened with change_feed=False")
+        return self._feed.last_sequence()
+    
+    def change_consumer(self, name: str) -> FeedConsumer:
+        """Reader of the change feed that resumes from its last committed checkpoint"""
+        if self._feed is None:
+            raise ValueError("This store was opened with change_feed=False")
+        return FeedConsumer(self._feed, name)
+    
+    def _read_version(self, document_id: str) -> int:
+        """Read the current version from disk, which other processes may have updated"""
+        annotation = self._read_json(self.annotations_dir, document_id, quiet=True)
+        if annotation is not None:
+            return annotation.get("version", 0)
+        row = self._manifest.annotations.get(document_id)
+        if row:
+            return int(row[A_VERSION])
+        return self._archive.version(document_id) or 0
+    
     def get_corrections(self, limit: int = 100) -> List[Dict]:
         """Retrieve correction records for active learning"""
-        return list(self._corrections_cache.values())[:limit]
+        self._maybe_refresh()
+        self._flush_history()
+        corrections = []
+        for correction_id in self._manifest.corrections:
+            if len(corrections) >= limit:
+                break
+            correction = self._read_correction(correction_id)
+            if correction is not None:
+                corrections.append(correction)
+        return corrections
         
     def get_statistics(self) -> Dict[str, Any]:
         """Get statistics about the annotation storage"""
-        total_annotations = len(self._annotations_cache)
-        total_corrections = len(self._corrections_cache)
-        
-        needs_review = sum(1 for a in self._annotations_cache.values() 
-                          if a.get("needs_human_review", False))
-        auto_approved = total_annotations - needs_review
+        self._maybe_refresh()
+        statistics = self._stats.to_dict()
+        # The other statistics describe the hot tier
+        statistics["archived_annotations"] = self._archive.count()
+        return statistics
+
+    def train_document_dictionary(self, samples: List[str], dict_size: int = 112640) -> int:
+        """Train a zstd dictionary on sample documents so short notes compress better"""
+        return self._blob_store().train_dictionary(samples, dict_size)
+    
+    def get_storage_footprint(self) -> Dict[str, int]:
+        """Bytes on disk used by annotation, correction and document blob files"""
+        def directory_bytes(paths):
+            return sum(path.stat().st_size for path in paths)
         
         return {
-            "total_annotations": total_annotations,
-            "total_corrections": total_corrections,
-            "needs_review": needs_review,
-            "auto_approved": auto_approved,
-            "auto_approval_rate": auto_approved / total_annotations if total_annotations > 0 else 0
+            "annotation_bytes": directory_bytes(StoreLayout.iter_record_files(self.annotations_dir)),
+            "correction_bytes": directory_bytes(StoreLayout.iter_record_files(self.corrections_dir)),
+            "blob_bytes": self._blob_store().footprint()["bytes"] if (self.data_dir / "blobs").exists() else 0,
+            "history_bytes": directory_bytes((self.data_dir / "history").glob("*/*.jsonl")),
+            "archive_bytes": sum(self._archive.footprint().values()),
+            "manifest_bytes": self._manifest.path.stat().st_size if self._manifest.path.exists() else 0
         }
-
+    
     def clear_document_cache(self):
         """Clear any cached annotation data when processing a new document."""
         self._current_document_cache = None
@@ -0,0 +1,79 @@
+# storage/layout.py
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Iterator
+
+FLAT = "flat"
+MIGRATING = "migrating"
+SHARDED = "sharded"
+LAYOUTS = (FLAT, MIGRATING, SHARDED)
+
+def shard_of(record_id: str, shard_chars: int = 2) -> str:
+    """Hash prefix directory for a record; hashing spreads IDs with common prefixes (e.g. ObjectIds)"""
+    return hashlib.md5(str(record_id).encode("utf-8")).hexdigest()[:shard_chars]
+
+class StoreLayout:
+    """How record files are arranged under a store's annotations/ and corrections/ directories"""
+
+    def __init__(self, data_dir: Path):
+        self.path = Path(data_dir) / "layout.json"
+        self.mode = None
+        self.shard_chars = 2
+        self._mtime = None
+
+    def load(self, default: str = SHARDED):
+        """Read the layout marker, creating it with the default layout if missing"""
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+            self.mode = state["layout"]
+            self.shard_chars = state.get("shard_chars", 2)
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self.save(default)
+
+    def save(self, mode: str):
+        """Switch layout; readers in other processes notice on their next check()"""
+        if mode not in LAYOUTS:
+            raise ValueError(f"Unknown layout '{mode}', expected one of {LAYOUTS}")
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"layout": mode, "shard_chars": self.shard_chars}, f)
+        tmp_path.replace(self.path)
+        self.mode = mode
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def check(self):
+        """Reload the marker if another process changed it"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            self.load()
+
+    def flat_path(self, directory: Path, record_id: str) -> Path:
+        return directory / f"{record_id}.json"
+
+    def sharded_path(self, directory: Path, record_id: str) -> Path:
+        return directory / shard_of(record_id, self.shard_chars) / f"{record_id}.json"
+
+    def record_path(self, directory: Path, record_id: str) -> Path:
+        """Where a record is written under the current layout"""
+        if self.mode == FLAT:
+            return self.flat_path(directory, record_id)
+        return self.sharded_path(directory, record_id)
+
+    def candidate_paths(self, directory: Path, record_id: str) -> List[Path]:
+        """Where a record may be found, preferred location first"""
+        flat = self.flat_path(directory, record_id)
+        sharded = self.sharded_path(directory, record_id)
+        return [flat, sharded] if self.mode == FLAT else [sharded, flat]
+
+    @staticmethod
+    def iter_record_files(directory: Path) -> Iterator[Path]:
+        """Every record file in either layout"""
+        yield from directory.glob("*.json")
+        yield from directory.glob("*/*.json")
@@ -0,0 +1,306 @@
+# storage/manifest.py
+import gc
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator
+
+# One tab-separated line per write; later lines for the same ID supersede earlier ones.
+# Rows are kept as lists of strings and only converted when a summary is requested,
+# which keeps opening a large store down to a single split per line.
+ANNOTATION_TAG = "A"
+CORRECTION_TAG = "C"
+# Moved to the archive tier: drops the annotation up to the given version from the index
+ARCHIVED_TAG = "X"
+
+ANNOTATION_COLUMNS = ("_id", "timestamp", "needs_human_review", "human_reviewed", "confidence_score",
+                      "validation_score", "invalid_entities", "entity_count", "entity_types",
+                      "model_name", "version")
+CORRECTION_COLUMNS = ("_id", "document_id", "timestamp", "original_confidence", "entities_changed")
+
+# Column positions in stored rows (position 0 holds the row tag)
+A_ID, A_TIMESTAMP, A_NEEDS_REVIEW, A_REVIEWED, A_CONFIDENCE, A_VALIDATION, A_INVALID, \
+    A_ENTITY_COUNT, A_ENTITY_TYPES, A_MODEL, A_VERSION = range(1, len(ANNOTATION_COLUMNS) + 1)
+C_ID, C_DOCUMENT_ID, C_TIMESTAMP, C_CONFIDENCE, C_CHANGED = range(1, len(CORRECTION_COLUMNS) + 1)
+
+@contextmanager
+def paused_gc(freeze: bool = False):
+    """Suspend cyclic GC while building large indexes; millions of small lists
+    otherwise trigger repeated full passes over everything already loaded.
+    With freeze, everything allocated so far is moved out of the collector's
+    reach afterwards, so the first collection doesn't traverse the new index."""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_was_enabled:
+            if freeze:
+                gc.freeze()
+            gc.enable()
+
+def _clean(value: Any) -> str:
+    """Render a value as a single tab-free manifest field"""
+    return str(value).replace("\t", " ").replace("\n", " ")
+
+def _encode_entity_types(entity_types: Dict[str, List[int]]) -> str:
+    """Encode {type: [total, invalid]} as TYPE:total:invalid,..."""
+    return ",".join(f"{_clean(t).replace(',', ' ').replace(':', ' ')}:{total}:{invalid}"
+                    for t, (total, invalid) in sorted(entity_types.items()))
+
+def decode_entity_types(field: str) -> Dict[str, List[int]]:
+    """Decode an entity_types field back to {type: [total, invalid]}"""
+    entity_types = {}
+    for item in field.split(","):
+        if item:
+            entity_type, total, invalid = item.rsplit(":", 2)
+            entity_types[entity_type] = [int(total), int(invalid)]
+    return entity_types
+
+def encode_annotation_row(summary: Dict[str, Any]) -> List[str]:
+    """Turn an annotation summary into a manifest row"""
+    return [
+        ANNOTATION_TAG,
+        _clean(summary["_id"]),
+        repr(summary["timestamp"]),
+        "1" if summary["needs_human_review"] else "0",
+        "1" if summary["human_reviewed"] else "0",
+        repr(summary["confidence_score"]),
+        repr(summary["validation_score"]),
+        str(summary["invalid_entities"]),
+        str(summary["entity_count"]),
+        _encode_entity_types(summary["entity_types"]),
+        _clean(summary["model_name"]),
+        str(summary["version"])
+    ]
+
+def decode_annotation_row(row: List[str]) -> Dict[str, Any]:
+    """Turn a manifest row back into an annotation summary"""
+    return {
+        "_id": row[A_ID],
+        "timestamp": float(row[A_TIMESTAMP]),
+        "needs_human_review": row[A_NEEDS_REVIEW] == "1",
+        "human_reviewed": row[A_REVIEWED] == "1",
+        "confidence_score": float(row[A_CONFIDENCE]),
+        "validation_score": float(row[A_VALIDATION]),
+        "invalid_entities": int(row[A_INVALID]),
+        "entity_count": int(row[A_ENTITY_COUNT]),
+        "entity_types": decode_entity_types(row[A_ENTITY_TYPES]),
+        "model_name": row[A_MODEL],
+        "version": int(row[A_VERSION])
+    }
+
+def encode_correction_row(summary: Dict[str, Any]) -> List[str]:
+    """Turn a correction summary into a manifest row"""
+    return [
+        CORRECTION_TAG,
+        _clean(summary["_id"]),
+        _clean(summary["document_id"]),
+        repr(summary["timestamp"]),
+        repr(summary["original_confidence"]),
+        "1" if summary["entities_changed"] else "0"
+    ]
+
+def decode_correction_row(row: List[str]) -> Dict[str, Any]:
+    """Turn a manifest row back into a correction summary"""
+    return {
+        "_id": row[C_ID],
+        "document_id": row[C_DOCUMENT_ID],
+        "timestamp": float(row[C_TIMESTAMP]),
+        "original_confidence": float(row[C_CONFIDENCE]),
+        "entities_changed": row[C_CHANGED] == "1"
+    }
+
+class Manifest:
+    """Append-only index of annotation and correction summaries"""
+
+    def __init__(self, path: Path, writer=None):
+        self.path = Path(path)
+        # Optional WriteBehindWriter that appends rows after the files they describe
+        self.writer = writer
+        self.annotations = {}
+        self.corrections = {}
+        self.line_count = 0
+        # Bytes read so far and the file they were read from, for tailing other writers
+        self.offset = 0
+        self.inode = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self):
+        """Read every manifest line into the in-memory index"""
+        annotation_width = len(ANNOTATION_COLUMNS) + 1
+        correction_width = len(CORRECTION_COLUMNS) + 1
+
+        with paused_gc():
+            with open(self.path, "rb") as f:
+                data = f.read()
+                self.inode = os.fstat(f.fileno()).st_ino
+            # A trailing partial line is still being written; pick it up on refresh
+            self.offset = data.rfind(b"\n") + 1
+            rows = [line.split("\t") for line in data[:self.offset].decode("utf-8").splitlines()]
+
+            # Rows of the wrong width come from torn writes and are skipped
+            self.annotations = {row[A_ID]: row for row in rows
+                                if row[0] == ANNOTATION_TAG and len(row) == annotation_width}
+            self.corrections = {row[C_ID]: row for row in rows
+                                if row[0] == CORRECTION_TAG and len(row) == correction_width}
+            for row in rows:
+                if row[0] == ARCHIVED_TAG and len(row) == 3:
+                    self._drop_archived(row)
+
+        self.line_count = len(rows)
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        """The loaded index and the journal position it reflects"""
+        return {
+            "inode": self.inode,
+            "offset": self.offset,
+            "line_count": self.line_count,
+            # Rows are replaced rather than modified, so a shallow copy is a stable view
+            "annotations": list(self.annotations.values()),
+            "corrections": list(self.corrections.values())
+        }
+
+    def restore(self, state: Dict[str, Any]) -> bool:
+        """Load the index from a snapshot; False if the manifest it was taken from is gone"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        # Compaction replaces the file, invalidating offsets into the old one
+        if stat.st_ino != state["inode"] or stat.st_size < state["offset"]:
+            return False
+
+        with paused_gc():
+            self.annotations = {row[A_ID]: row for row in state["annotations"]}
+            self.corrections = {row[C_ID]: row for row in state["corrections"]}
+        self.inode = state["inode"]
+        self.offset = state["offset"]
+        self.line_count = state["line_count"]
+        return True
+
+    def needs_compaction(self) -> bool:
+        """Whether superseded lines outnumber live entries"""
+        live = len(self.annotations) + len(self.corrections)
+        return self.line_count > 2 * live + 10000
+
+    def compact(self):
+        """Rewrite the manifest with only the latest row per ID"""
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            for row in self.annotations.values():
+                f.write("\t".join(row) + "\n")
+            for row in self.corrections.values():
+                f.write("\t".join(row) + "\n")
+        tmp_path.replace(self.path)
+        self.line_count = len(self.annotations) + len(self.corrections)
+        self.mark_read()
+
+    def mark_read(self):
+        """Treat everything currently in the file as already loaded"""
+        stat = os.stat(self.path)
+        self.offset = stat.st_size
+        self.inode = stat.st_ino
+
+    def refresh(self) -> Optional[List[tuple]]:
+        """
+        Apply lines appended by other processes since the last read.
+
+        Returns:
+            (tag, previous row, new row) for every change applied, or None if the
+            file was replaced (compacted elsewhere) and had to be reloaded in full
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.load()
+            return None
+        if stat.st_size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+
+        annotation_width = len(ANNOTATION_COLUMNS) + 1
+        correction_width = len(CORRECTION_COLUMNS) + 1
+        changes = []
+        # Our own appends are read back too; versions and IDs make replaying them a no-op.
+        # Different rows of the same version (saves racing on a write-behind queue) are
+        # applied in manifest order, so every process ends up with the last one written.
+        for line in data[:end].decode("utf-8").splitlines():
+            row = line.split("\t")
+            if row[0] == ANNOTATION_TAG and len(row) == annotation_width:
+                current = self.annotations.get(row[A_ID])
+                if current is None or int(row[A_VERSION]) > int(current[A_VERSION]) or \
+                        (row[A_VERSION] == current[A_VERSION] and row != current):
+                    self.annotations[row[A_ID]] = row
+                    changes.append((ANNOTATION_TAG, current, row))
+            elif row[0] == CORRECTION_TAG and len(row) == correction_width:
+                if row[C_ID] not in self.corrections:
+                    self.corrections[row[C_ID]] = row
+                    changes.append((CORRECTION_TAG, None, row))
+            elif row[0] == ARCHIVED_TAG and len(row) == 3:
+                current = self._drop_archived(row)
+                if current is not None:
+                    changes.append((ARCHIVED_TAG, current, None))
+
+        self.line_count += len(changes)
+        return changes
+
+    def _append(self, row: List[str]):
+        line = "\t".join(row) + "\n"
+        if self.writer is not None:
+            self.writer.append_line(self.path, line)
+        else:
+            with open(self.path, "a") as f:
+                f.write(line)
+        self.line_count += 1
+
+    def _drop_archived(self, row: List[str]) -> Optional[List[str]]:
+        """Remove an archived annotation unless a newer version was saved since; returns the removed row"""
+        current = self.annotations.get(row[1])
+        if current is not None and int(current[A_VERSION]) <= int(row[2]):
+            return self.annotations.pop(row[1])
+        return None
+
+    def archive_annotation(self, document_id: str) -> Optional[List[str]]:
+        """Record that an annotation moved to the archive; returns its removed row"""
+        current = self.annotations.get(document_id)
+        if current is None:
+            return None
+        self._append([ARCHIVED_TAG, document_id, current[A_VERSION]])
+        return self.annotations.pop(document_id)
+
+    def put_annotation(self, summary: Dict[str, Any]) -> List[str]:
+        """Record the latest summary of an annotation"""
+        row = encode_annotation_row(summary)
+        self._append(row)
+        self.annotations[row[A_ID]] = row
+        return row
+
+    def put_correction(self, summary: Dict[str, Any]) -> List[str]:
+        """Record a correction summary"""
+        row = encode_correction_row(summary)
+        self._append(row)
+        self.corrections[row[C_ID]] = row
+        return row
+
+    def get_annotation(self, document_id: str) -> Optional[Dict[str, Any]]:
+        row = self.annotations.get(document_id)
+        return decode_annotation_row(row) if row else None
+
+    def iter_annotations(self) -> Iterator[Dict[str, Any]]:
+        for row in self.annotations.values():
+            yield decode_annotation_row(row)
+
+    def iter_corrections(self) -> Iterator[Dict[str, Any]]:
+        for row in self.corrections.values():
+            yield decode_correction_row(row)
@@ -1,123 +1,211 @@
+# storage/memory_store.py
+import copy
 import json
-import os
-import time
-from datetime import datetime
-from typing import List, Dict, Any, Optional
-from pathlib import Path
-import uuid
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterator
+
+from .file_store import FileStore
 
 class MemoryStore:
-    """File-based storage for annotations with human review tracking"""
-    
-    def __init__(self, data_dir: str = "data"):
-        """Initialize file-based storage system"""
-        self.data_dir = Path(data_dir)
-        self.annotations_dir = self.data_dir / "annotations"
-        self.corrections_dir = self.data_dir / "corrections"
-        
-        # Create directories if they don't exist
-        self.annotations_dir.mkdir(parents=True, exist_ok=True)
-        self.corrections_dir.mkdir(parents=True, exist_ok=True)
-        
-        # In-memory caches for faster access
-        self._annotations_cache = {}
-        self._corrections_cache = {}
-        
-        # Load existing data into cache
-        self._load_cache()
-    
-    def _load_cache(self):
-        """Load existing annotations and corrections into memory"""
-        # Load annotations
-        for file_path in self.annotations_dir.glob("*.json"):
-            try:
-                with open(file_path, "r") as f:
-                    annotation = json.load(f)
-                    self._annotations_cache[file_path.stem] = annotation
-            except Exception as e:
-                print(f"Error loading annotation {file_path}: {e}")
-        
-        # Load corrections
-        for file_path in self.corrections_dir.glob("*.json"):
-            try:
-                with open(file_path, "r") as f:
-                    correction = json.load(f)
-                    self._corrections_cache[file_path.stem] = correction
-            except Exception as e:
-                print(f"Error loading correction {file_path}: {e}")
-    
+    """
+    Bounded in-memory LRU cache tier in front of a persistent annotation store.
+
+    Reads and writes of whole annotations go through the cache; every other
+    method and attribute is the backing store's.
+    """
+
+    def __init__(self, data_dir: str = "data", review_queue=None, backing_store=None,
+                 max_entries: int = 10000, max_bytes: Optional[int] = None):
+        """
+        Initialize the cache tier
+
+        Args:
+            data_dir: Data directory of the default FileStore backing store
+            review_queue: Review queue for the default backing store
+            backing_store: Store that every write goes through to (FileStore, SegmentStore, ...);
+                cached copies are checked against its current_version() when it has one
+            max_entries: Most annotations kept in memory
+            max_bytes: Optional cap on the approximate serialized size of cached annotations
+        """
+        # The default backing store leaves caching to this tier rather than holding a second copy
+        self.backing_store = backing_store or FileStore(data_dir, review_queue=review_queue, cache_size=0)
+        self.review_queue = getattr(self.backing_store, "review_queue", review_queue)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # document_id -> (annotation, approximate size in bytes)
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getattr__(self, name: str):
+        """Methods and attributes the cache tier doesn't override come from the backing store"""
+        backing_store = self.__dict__.get("backing_store")
+        if backing_store is None or name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(backing_store, name)
+
+    def _size_of(self, annotation: Dict[str, Any]) -> int:
+        """Approximate memory footprint, only measured when a byte budget is set"""
+        if self.max_bytes is None:
+            return 0
+        return len(json.dumps(annotation, default=str))
+
+    def _put(self, annotation: Dict[str, Any]):
+        """Cache an annotation and evict least recently used entries over budget"""
+        size = self._size_of(annotation)
+        with self._lock:
+            self._discard(annotation["_id"])
+            self._cache[annotation["_id"]] = (annotation, size)
+            self._cached_bytes += size
+
+            while self._cache and (len(self._cache) > self.max_entries or
+                                   (self.max_bytes is not None and self._cached_bytes > self.max_bytes)):
+                _, (_, evicted_size) = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted_size
+                self.evictions += 1
+
+    def _discard(self, document_id: str):
+        entry = self._cache.pop(document_id, None)
+        if entry is not None:
+            self._cached_bytes -= entry[1]
+
     def save_annotation(self, annotation: Dict[str, Any]) -> str:
-        """Save an annotation to the file system"""
-        # Generate ID if not provided
-        if "_id" not in annotation:
-            annotation["_id"] = str(uuid.uuid4())
-        
-        # Add timestamp if not present
-        if "timestamp" not in annotation:
-            annotation["timestamp"] = datetime.now().isoformat()
-        
-        # Save to file
-        file_path = self.annotations_dir / f"{annotation['_id']}.json"
-        with open(file_path, "w") as f:
-            json.dump(annotation, f, indent=2)
-        
-        # Update cache
-        self._annotations_cache[annotation["_id"]] = annotation
-        
-        return annotation["_id"]
-    
-    def find_by_review_status(self, needs_review: bool = True, limit: int = 10) -> List[Dict]:
-        """Find annotations by review status"""
-        results = []
-        
-        for annotation_id, annotation in self._annotations_cache.items():
-            if annotation.get("needs_human_review", False) == needs_review:
-                results.append(annotation)
-                if len(results) >= limit:
-                    break
-        
-        return results
-    
+        """Write an annotation through to the backing store and cache it"""
+        document_id = self.backing_store.save_annotation(annotation)
+        self._put(copy.deepcopy(annotation))
+        return document_id
+
+    def save_annotations(self, annotations: List[Dict[str, Any]]) -> List[str]:
+        """Write a batch through to the backing store and cache it"""
+        if hasattr(self.backing_store, "save_annotations"):
+            document_ids = self.backing_store.save_annotations(annotations)
+        else:
+            document_ids = [self.backing_store.save_annotation(annotation) for annotation in annotations]
+        for annotation in annotations:
+            self._put(copy.deepcopy(annotation))
+        return document_ids
+
     def find_by_id(self, document_id: str) -> Optional[Dict]:
-        """Find an annotation by ID"""
-        return self._annotations_cache.get(document_id)
-    
-    def update_after_review(self, document_id: str, corrected_entities: List[Dict]) -> Dict:
+        """Find an annotation by ID, loading it into the cache on a miss"""
+        # The backing store's view, refreshed with writes made by other processes
+        current_version = getattr(self.backing_store, "current_version", None)
+        hot_version = current_version(document_id) if current_version is not None else None
+
+        with self._lock:
+            entry = self._cache.get(document_id)
+            if entry is not None and (current_version is None or entry[0].get("version") == hot_version):
+                self._cache.move_to_end(document_id)
+                self.hits += 1
+                # Copied so callers can't modify the cache
+                return copy.deepcopy(entry[0])
+            # Saved again or archived since it was cached
+            self._discard(document_id)
+            self.misses += 1
+
+        annotation = self.backing_store.find_by_id(document_id)
+        if annotation is None:
+            return None
+        # The backing store may hand out its own cached object; keep a private copy
+        annotation = copy.deepcopy(annotation)
+        # Archived annotations are read from the archive tier rather than kept in memory
+        if current_version is None or hot_version is not None:
+            self._put(annotation)
+        return copy.deepcopy(annotation)
+
+    def iter_annotations(self, after: Optional[str] = None, batch_size: int = 1000) -> Iterator[Dict]:
+        """Every annotation in ID order, for bulk exports; read past the cache so it isn't flushed"""
+        if hasattr(self.backing_store, "iter_annotations"):
+            return self.backing_store.iter_annotations(after, batch_size)
+        document_ids = sorted(str(summary["_id"]) for summary in self.backing_store.iter_summaries())
+        annotations = (self.backing_store.find_by_id(document_id) for document_id in document_ids
+                       if after is None or document_id > after)
+        return (copy.deepcopy(annotation) for annotation in annotations if annotation is not None)
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, projection: Optional[List[str]] = None,
+              limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Page through annotations newest first; full documents come from the cache"""
+        if projection is not None:
+            return self.backing_store.query(filters, projection, limit, cursor)
+
+        page = self.backing_store.query(filters, ["_id"], limit, cursor)
+        items = []
+        for item in page["items"]:
+            annotation = self.find_by_id(str(item["_id"]))
+            if annotation is not None:
+                items.append(annotation)
+        return {"items": items, "next_cursor": page["next_cursor"]}
+
+    def search(self, query: str, limit: int = 20, projection: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Find annotations by document words and entities; full documents come from the cache"""
+        if projection is not None:
+            return self.backing_store.search(query, limit, projection)
+
+        results = self.backing_store.search(query, limit, ["_id"])
+        items = []
+        for item in results["items"]:
+            annotation = self.find_by_id(str(item["_id"]))
+            if annotation is not None:
+                items.append(annotation)
+        return {"items": items, "total": results["total"]}
+
+    def update_after_review(self, document_id: str, corrected_entities: List[Dict],
+                            expected_version: Optional[int] = None) -> Dict:
         """Update annotation after human review"""
-        # Find original annotation
-        original = self.find_by_id(document_id)
-        if not original:
-            raise ValueError(f"Document with ID {document_id} not found")
-        
-        # Store correction record for active learning
-        correction_id = str(uuid.uuid4())
-        correction_record = {
-            "_id": correction_id,
-            "document_id": document_id,
-            "original_entities": original.get("entities", []),
-            "corrected_entities": corrected_entities,
-            "correction_timestamp": datetime.now().isoformat(),
-            "original_confidence": original.get("confidence_score", 0)
-        }
-        
-        # Save correction to file
-        correction_path = self.corrections_dir / f"{correction_id}.json"
-        with open(correction_path, "w") as f:
-            json.dump(correction_record, f, indent=2)
-        
-        # Update cache
-        self._corrections_cache[correction_id] = correction_record
-        
-        # Update the original annotation
-        original["entities"] = corrected_entities
-        original["human_reviewed"] = True
-        original["review_timestamp"] = datetime.now().isoformat()
-        
-        # Save updated annotation
-        self.save_annotation(original)
-        
-        return {"status": "success", "document_id": document_id}
-    
-    def get_corrections(self, limit: int = 100) -> List[Dict]:
-        """Retrieve correction records for active learning"""
-        return list(self._corrections_cache.values())[:limit]
\ No newline at end of file
+        # Drop the cached copy before and after: a read during the update can cache the
+        # old version again, and a failed update may still have changed the stored one
+        with self._lock:
+            self._discard(document_id)
+        try:
+            return self.backing_store.update_after_review(document_id, corrected_entities,
+                                                          expected_version=expected_version)
+        finally:
+            with self._lock:
+                self._discard(document_id)
+
+    def apply_retention(self, policy, batch_size: int = 1000) -> Dict[str, int]:
+        """Move old annotations of the backing store to its archive tier and drop their cached copies"""
+        result = self.backing_store.apply_retention(policy, batch_size)
+        current_version = getattr(self.backing_store, "current_version", None)
+        if current_version is not None:
+            with self._lock:
+                for document_id in [document_id for document_id in self._cache
+                                    if current_version(document_id) is None]:
+                    self._discard(document_id)
+        return result
+
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counts and current cache size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "bytes": self._cached_bytes if self.max_bytes is not None else None,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0,
+                "evictions": self.evictions
+            }
+
+    def clear(self):
+        """Drop every cached annotation"""
+        with self._lock:
+            self._cache.clear()
+            self._cached_bytes = 0
+
+    def flush(self):
+        """Flush the backing store if it buffers writes"""
+        if hasattr(self.backing_store, "flush"):
+            self.backing_store.flush()
+
+    def close(self):
+        """Close the backing store"""
+        if hasattr(self.backing_store, "close"):
+            self.backing_store.close()
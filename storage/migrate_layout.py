@@ -0,0 +1,134 @@
+# storage/migrate_layout.py
+import json
+import os
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .file_lock import FileLock
+from .file_store import namespace_dir, list_namespaces
+from .layout import StoreLayout, FLAT, MIGRATING, SHARDED
+
+def _record_version(file_path: Path) -> int:
+    try:
+        with open(file_path, "r") as f:
+            return json.load(f).get("version", 0)
+    except (OSError, json.JSONDecodeError):
+        return -1
+
+def _move_batch(directory: Path, pattern: str, target_path: Callable[[Path], Path], batch_size: int) -> int:
+    """Move up to batch_size record files matching pattern to their target paths; returns files moved"""
+    moved = 0
+    for file_path in directory.glob(pattern):
+        if moved >= batch_size:
+            break
+        target = target_path(file_path)
+        target.parent.mkdir(exist_ok=True)
+        # A writer may already have saved a newer copy at the target
+        if target.exists() and _record_version(target) >= _record_version(file_path):
+            file_path.unlink()
+        else:
+            os.replace(file_path, target)
+        moved += 1
+    return moved
+
+def _move_all(directories: List[Path], pattern: str, target_path: Callable[[Path, Path], Path],
+              batch_size: int, lock: Optional[FileLock]) -> int:
+    """Move every matching record file, taking the lock (if given) for each batch"""
+    moved = 0
+    for directory in directories:
+        if not directory.exists():
+            continue
+        while True:
+            with lock if lock is not None else nullcontext():
+                count = _move_batch(directory, pattern, lambda path: target_path(directory, path), batch_size)
+            moved += count
+            if count < batch_size:
+                break
+    return moved
+
+def migrate_to_sharded(data_dir: str = "data", namespace: Optional[str] = None,
+                       batch_size: int = 500) -> Dict[str, int]:
+    """
+    Convert a flat FileStore directory to the sharded layout while it stays in use.
+
+    Stores opened on the directory see the MIGRATING marker on their next write or
+    refresh and start writing to shards, reading either location. Files are moved in
+    batches under the store lock, so writers are only paused for one batch at a time.
+
+    Args:
+        data_dir: The FileStore data directory
+        namespace: Migrate one namespace instead of the default store
+        batch_size: Files moved per lock acquisition
+    """
+    root = namespace_dir(data_dir, namespace)
+    lock = FileLock(root / ".lock")
+    layout = StoreLayout(root)
+    directories = [root / "annotations", root / "corrections"]
+    moved = 0
+
+    try:
+        with lock:
+            layout.load(default=FLAT)
+            if layout.mode == SHARDED:
+                return {"moved": 0}
+            layout.save(MIGRATING)
+
+        shard = lambda directory, path: layout.sharded_path(directory, path.stem)
+        moved += _move_all(directories, "*.json", shard, batch_size, lock)
+
+        with lock:
+            layout.save(SHARDED)
+            # Sweep files written flat by stores that had not seen the marker yet
+            moved += _move_all(directories, "*.json", shard, batch_size, None)
+    finally:
+        lock.close()
+
+    return {"moved": moved}
+
+def migrate_to_flat(data_dir: str = "data", namespace: Optional[str] = None,
+                    batch_size: int = 500) -> Dict[str, int]:
+    """
+    Move a sharded FileStore directory back to the flat layout, e.g. to roll back to a
+    release that predates sharding. Stores opened on the directory see the FLAT marker
+    on their next write or refresh and write flat files, still reading both locations.
+    Emptied shard directories are left in place.
+    """
+    root = namespace_dir(data_dir, namespace)
+    lock = FileLock(root / ".lock")
+    layout = StoreLayout(root)
+    directories = [root / "annotations", root / "corrections"]
+
+    try:
+        with lock:
+            layout.load(default=FLAT)
+            layout.save(FLAT)
+        moved = _move_all(directories, "*/*.json",
+                          lambda directory, path: layout.flat_path(directory, path.stem), batch_size, lock)
+    finally:
+        lock.close()
+
+    return {"moved": moved}
+
+if __name__ == "__main__":
+    # Run as: python -m storage.migrate_layout --data-dir data [--namespace NAME | --all-namespaces]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move FileStore records into hash-prefix shards, or back")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--namespace", help="Migrate a single namespace")
+    parser.add_argument("--all-namespaces", action="store_true",
+                        help="Migrate the default store and every namespace")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--to-flat", action="store_true",
+                        help="Move sharded records back to the flat layout")
+    args = parser.parse_args()
+
+    if args.all_namespaces:
+        namespaces = [None] + list_namespaces(args.data_dir)
+    else:
+        namespaces = [args.namespace]
+    for name in namespaces:
+        migrate = migrate_to_flat if args.to_flat else migrate_to_sharded
+        result = migrate(args.data_dir, name, args.batch_size)
+        print(f"{name or 'default'}: moved {result['moved']} files")
@@ -0,0 +1,116 @@
+# storage/motor_store.py
+import pymongo
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorClient
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+from config.settings import MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE
+from .annotation_store import (SUMMARY_PROJECTION, REVIEW_PROJECTION, ANNOTATION_INDEXES, CORRECTION_INDEXES,
+                               id_match, replace_filter, bulk_save_requests, review_query, review_update,
+                               correction_record)
+from .errors import VersionConflictError
+from .summary import summarize_annotation
+
+class MotorAnnotationStore:
+    """Asyncio-native MongoDB storage with the same layout as AnnotationStore"""
+
+    def __init__(self, connection_string: str = "mongodb://localhost:27017/",
+                 db_name: str = "annotation_db", max_pool_size: int = MONGO_MAX_POOL_SIZE,
+                 min_pool_size: int = MONGO_MIN_POOL_SIZE, client=None):
+        """Initialize the Motor client; call ensure_indexes() once on startup"""
+        self.client = client or AsyncIOMotorClient(connection_string, maxPoolSize=max_pool_size,
+                                                   minPoolSize=min_pool_size)
+        self.db = self.client[db_name]
+        self.annotations = self.db.annotations
+        self.corrections = self.db.corrections
+
+    async def ensure_indexes(self):
+        """Create the same indexes as AnnotationStore"""
+        for keys in ANNOTATION_INDEXES:
+            await self.annotations.create_index(keys)
+        for keys in CORRECTION_INDEXES:
+            await self.corrections.create_index(keys)
+
+    async def asave_annotation(self, annotation: Dict[str, Any]) -> str:
+        """Save an annotation to the database, one version past the stored one"""
+        if "_id" not in annotation:
+            annotation["version"] = annotation.get("version", 0) + 1
+            result = await self.annotations.insert_one(annotation)
+            return str(result.inserted_id)
+
+        while True:
+            current = await self.annotations.find_one({"_id": annotation["_id"]}, {"version": 1})
+            try:
+                await self.annotations.replace_one(replace_filter(annotation, current), annotation, upsert=True)
+            except DuplicateKeyError:
+                # Another save replaced or inserted it first; bump past that one
+                continue
+            return str(annotation["_id"])
+
+    async def asave_annotations(self, annotations: List[Dict[str, Any]]) -> List[str]:
+        """Save many annotations in one unordered bulk write"""
+        requests = bulk_save_requests(annotations)
+        if requests:
+            await self.annotations.bulk_write(requests, ordered=False)
+        return [str(annotation["_id"]) for annotation in annotations]
+
+    async def afind_by_id(self, document_id: str, projection: Optional[Dict[str, int]] = None) -> Optional[Dict]:
+        """Find an annotation by ID"""
+        return await self.annotations.find_one({"_id": id_match(document_id)}, projection)
+
+    async def afind_by_review_status(self, needs_review: bool = True, limit: int = 10,
+                                     projection: Optional[Dict[str, int]] = None) -> List[Dict]:
+        """Find annotations by review status, newest first"""
+        cursor = self.annotations.find({"needs_human_review": needs_review}, projection) \
+            .sort("timestamp", pymongo.DESCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def aupdate_after_review(self, document_id: str, corrected_entities: List[Dict],
+                                   expected_version: Optional[int] = None) -> Dict:
+        """Update annotation after human review"""
+        original = await self.annotations.find_one_and_update(
+            review_query(document_id, expected_version),
+            review_update(corrected_entities),
+            projection=REVIEW_PROJECTION,
+            return_document=ReturnDocument.BEFORE
+        )
+
+        if original is None:
+            current = await self.afind_by_id(document_id, {"version": 1})
+            if not current:
+                raise ValueError(f"Document with ID {document_id} not found")
+            raise VersionConflictError(document_id, expected_version, current.get("version", 0))
+
+        # Store correction record for active learning
+        await self.corrections.insert_one(correction_record(original, corrected_entities))
+
+        return {"status": "success", "document_id": document_id}
+
+    async def aget_corrections(self, limit: int = 100) -> List[Dict]:
+        """Retrieve correction records for active learning"""
+        return await self.corrections.find({}).limit(limit).to_list(length=limit)
+
+    async def aget_statistics(self) -> Dict[str, Any]:
+        """Get statistics about the annotation storage"""
+        total_annotations = await self.annotations.count_documents({})
+        needs_review = await self.annotations.count_documents({"needs_human_review": True})
+        total_corrections = await self.corrections.count_documents({})
+        auto_approved = total_annotations - needs_review
+
+        return {
+            "total_annotations": total_annotations,
+            "total_corrections": total_corrections,
+            "needs_review": needs_review,
+            "auto_approved": auto_approved,
+            "auto_approval_rate": auto_approved / total_annotations if total_annotations > 0 else 0
+        }
+
+    async def aiter_summaries(self, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over the routing fields of every stored annotation"""
+        async for annotation in self.annotations.find({}, SUMMARY_PROJECTION, batch_size=batch_size):
+            annotation["_id"] = str(annotation["_id"])
+            yield summarize_annotation(annotation)
+
+    async def aflush(self):
+        """Writes are acknowledged by the server, so there is nothing to flush"""
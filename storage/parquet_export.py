@@ -0,0 +1,245 @@
+# storage/parquet_export.py
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for analytics exports
+    pa = ds = pq = None
+
+from .summary import timestamp_to_epoch
+
+# One row per annotation version
+DOCUMENT_SCHEMA_FIELDS = [
+    ("document_id", "string"), ("version", "int64"), ("timestamp", "float64"),
+    ("model_name", "string"), ("confidence_score", "float64"), ("validation_score", "float64"),
+    ("needs_human_review", "bool_"), ("human_reviewed", "bool_"), ("entity_count", "int32"),
+    ("invalid_entities", "int32"), ("document_length", "int32"), ("review_reason", "string")
+]
+
+# One row per entity of an annotation version
+ENTITY_SCHEMA_FIELDS = [
+    ("document_id", "string"), ("version", "int64"), ("entity_index", "int32"),
+    ("type", "string"), ("text", "string"), ("start", "int32"), ("end", "int32"),
+    ("valid", "bool_"), ("issue_count", "int32"), ("confidence_score", "float64"),
+    ("model_name", "string"), ("human_reviewed", "bool_")
+]
+
+def _schema(fields) -> "pa.Schema":
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in fields])
+
+def _partition_date(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y-%m-%d")
+
+def flatten_annotation(annotation: Dict[str, Any]) -> tuple:
+    """Split an annotation into one document row and one row per entity"""
+    document_id = str(annotation.get("_id"))
+    version = int(annotation.get("version", 0) or 0)
+    entities = annotation.get("entities", [])
+    model_name = annotation.get("model_name", "") or ""
+    human_reviewed = bool(annotation.get("human_reviewed", False))
+
+    entity_rows = []
+    invalid_entities = 0
+    for index, entity in enumerate(entities):
+        validation = entity.get("validation", {})
+        valid = bool(validation.get("valid", True))
+        invalid_entities += not valid
+        entity_rows.append({
+            "document_id": document_id,
+            "version": version,
+            "entity_index": index,
+            "type": entity.get("type", ""),
+            "text": entity.get("text", ""),
+            "start": entity.get("start", 0),
+            "end": entity.get("end", 0),
+            "valid": valid,
+            "issue_count": len(validation.get("issues", [])),
+            "confidence_score": float(annotation.get("confidence_score", 0) or 0),
+            "model_name": model_name,
+            "human_reviewed": human_reviewed
+        })
+
+    document_row = {
+        "document_id": document_id,
+        "version": version,
+        "timestamp": timestamp_to_epoch(annotation.get("timestamp")),
+        "model_name": model_name,
+        "confidence_score": float(annotation.get("confidence_score", 0) or 0),
+        "validation_score": float(annotation.get("validation_score", 0) or 0),
+        "needs_human_review": bool(annotation.get("needs_human_review", False)),
+        "human_reviewed": human_reviewed,
+        "entity_count": len(entities),
+        "invalid_entities": invalid_entities,
+        "document_length": len(annotation.get("document", "") or ""),
+        "review_reason": annotation.get("review_reason", "") or ""
+    }
+    return document_row, entity_rows
+
+class ParquetExporter:
+    """Incrementally exports annotations to date-partitioned Parquet datasets"""
+
+    def __init__(self, annotation_store, output_dir: str = "data/parquet", batch_size: int = 10000):
+        """
+        Initialize the exporter
+
+        Args:
+            annotation_store: Any store with iter_summaries() and find_by_id()
+            output_dir: Root of the documents/ and entities/ datasets
+            batch_size: Annotations flattened per Parquet file
+        """
+        if pa is None:
+            raise ImportError("ParquetExporter requires pyarrow (pip install pyarrow)")
+
+        self.store = annotation_store
+        self.output_dir = Path(output_dir)
+        self.documents_dir = self.output_dir / "documents"
+        self.entities_dir = self.output_dir / "entities"
+        self.batch_size = batch_size
+        self.documents_schema = _schema(DOCUMENT_SCHEMA_FIELDS)
+        self.entities_schema = _schema(ENTITY_SCHEMA_FIELDS)
+
+        # Watermark: the last exported version of every document, appended as id<TAB>version
+        self.watermark_path = self.output_dir / "_exported.tsv"
+        self.exported_versions = self._load_watermark()
+
+    def _load_watermark(self) -> Dict[str, int]:
+        exported = {}
+        if self.watermark_path.exists():
+            with open(self.watermark_path, "r") as f:
+                for line in f:
+                    fields = line.rstrip("\n").split("\t")
+                    if len(fields) == 2:
+                        exported[fields[0]] = int(fields[1])
+        return exported
+
+    def pending_ids(self) -> List[str]:
+        """IDs of annotations created or changed since the last export"""
+        return [str(summary["_id"]) for summary in self.store.iter_summaries()
+                if self.exported_versions.get(str(summary["_id"]), -1) < summary["version"]]
+
+    def export(self) -> Dict[str, int]:
+        """Append new and changed annotations to the Parquet datasets"""
+        pending = self.pending_ids()
+        documents = entities = 0
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = []
+            for document_id in pending[start:start + self.batch_size]:
+                annotation = self.store.find_by_id(document_id)
+                if annotation is not None:
+                    batch.append(annotation)
+
+            document_count, entity_count = self._write_batch(batch)
+            documents += document_count
+            entities += entity_count
+
+        return {"documents": documents, "entities": entities, "pending": len(pending)}
+
+    def _write_batch(self, annotations: List[Dict[str, Any]]) -> tuple:
+        """Write one batch of annotations, one file per date partition, then advance the watermark"""
+        document_rows = defaultdict(list)
+        entity_rows = defaultdict(list)
+        for annotation in annotations:
+            document_row, rows = flatten_annotation(annotation)
+            date = _partition_date(document_row["timestamp"])
+            document_rows[date].append(document_row)
+            entity_rows[date].extend(rows)
+
+        # Unique file names so repeated exports append rather than overwrite
+        part = f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}.parquet"
+        for date, rows in document_rows.items():
+            self._write_partition(self.documents_dir, date, part, rows, self.documents_schema)
+        for date, rows in entity_rows.items():
+            if rows:
+                self._write_partition(self.entities_dir, date, part, rows, self.entities_schema)
+
+        # Only record what is now on disk, so an interrupted export is redone
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.watermark_path, "a") as f:
+            for annotation in annotations:
+                document_id = str(annotation.get("_id"))
+                version = int(annotation.get("version", 0) or 0)
+                self.exported_versions[document_id] = version
+                f.write(f"{document_id}\t{version}\n")
+
+        return sum(len(rows) for rows in document_rows.values()), \
+            sum(len(rows) for rows in entity_rows.values())
+
+    def _write_partition(self, dataset_dir: Path, date: str, part: str, rows: List[Dict], schema):
+        partition_dir = dataset_dir / f"date={date}"
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pylist(rows, schema=schema)
+        tmp_path = partition_dir / f".{part}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        tmp_path.replace(partition_dir / part)
+
+    def run(self, interval: float = 60.0):
+        """Export continuously as new annotations land"""
+        while True:
+            result = self.export()
+            if result["documents"]:
+                print(f"Exported {result['documents']} documents and {result['entities']} entities")
+            time.sleep(interval)
+
+def read_dataset(path: str, columns: Optional[List[str]] = None, filter=None,
+                 latest_only: bool = True, versions_path: Optional[str] = None) -> "pa.Table":
+    """
+    Read an exported dataset with column projection and predicate pushdown.
+
+    Args:
+        path: The documents/ or entities/ dataset directory
+        columns: Columns to read
+        filter: pyarrow.dataset expression, e.g. ds.field("date") >= "2024-01-01"
+        latest_only: Drop rows of superseded annotation versions
+        versions_path: Dataset with a row for every exported version, which decides the
+            latest version of each document; defaults to the documents/ dataset next to
+            path, as versions without entities write no entity rows
+    """
+    if pa is None:
+        raise ImportError("read_dataset requires pyarrow (pip install pyarrow)")
+
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    read_columns = columns
+    if latest_only and columns is not None:
+        read_columns = list(dict.fromkeys(columns + ["document_id", "version"]))
+    table = dataset.to_table(columns=read_columns, filter=filter)
+
+    if latest_only and table.num_rows:
+        # The latest version is decided before filtering, so an older version that
+        # matches the filter never stands in for a newer one that doesn't
+        if versions_path is None:
+            documents_path = Path(path).parent / "documents"
+            versions_path = documents_path if documents_path.is_dir() else path
+        versions = ds.dataset(versions_path, format="parquet", partitioning="hive") \
+            .to_table(columns=["document_id", "version"])
+        latest = versions.group_by("document_id").aggregate([("version", "max")]) \
+            .rename_columns(["document_id", "version"])
+        table = table.join(latest, keys=["document_id", "version"], join_type="inner")
+        if columns is not None:
+            table = table.select(columns)
+
+    return table
+
+if __name__ == "__main__":
+    # Run as: python -m storage.parquet_export [--watch SECONDS]
+    import argparse
+    from .file_store import FileStore
+
+    parser = argparse.ArgumentParser(description="Export annotations to Parquet")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--output-dir", default="data/parquet")
+    parser.add_argument("--watch", type=float, help="Keep exporting every N seconds")
+    args = parser.parse_args()
+
+    exporter = ParquetExporter(FileStore(args.data_dir), args.output_dir)
+    if args.watch:
+        exporter.run(args.watch)
+    else:
+        print(exporter.export())
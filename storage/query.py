@@ -0,0 +1,88 @@
+# storage/query.py
+import base64
+import json
+from typing import List, Dict, Any, Optional, Callable
+
+from .manifest import (A_TIMESTAMP, A_NEEDS_REVIEW, A_REVIEWED, A_CONFIDENCE, A_MODEL,
+                       A_ENTITY_TYPES, decode_entity_types)
+from .summary import timestamp_to_epoch
+
+# Filters accepted by store.query() and store.count()
+FILTER_KEYS = ("needs_review", "human_reviewed", "model_name", "min_confidence", "max_confidence",
+               "entity_type", "start", "end")
+
+# Fields a store can return from its index without loading annotation bodies;
+# entity_count, invalid_entities and entity_types are derived from the entities
+INDEX_FIELDS = ("_id", "needs_human_review", "human_reviewed", "confidence_score",
+                "validation_score", "model_name", "version", "entity_count",
+                "invalid_entities", "entity_types")
+DERIVED_FIELDS = ("entity_count", "invalid_entities", "entity_types")
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate filter names and convert start/end to epoch seconds"""
+    filters = {key: value for key, value in (filters or {}).items() if value is not None}
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown query filters {sorted(unknown)}, expected some of {FILTER_KEYS}")
+    for key in ("start", "end"):
+        if key in filters:
+            filters[key] = timestamp_to_epoch(filters[key])
+    return filters
+
+def encode_cursor(position: List[Any]) -> str:
+    """Opaque token for the sort position of the last item of a page"""
+    return base64.urlsafe_b64encode(json.dumps(position, default=str).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid query cursor: {e}")
+
+def index_only(projection: Optional[List[str]]) -> bool:
+    """Whether a projection can be answered without loading annotation bodies"""
+    return projection is not None and all(field in INDEX_FIELDS for field in projection)
+
+def row_predicate(filters: Dict[str, Any]) -> Callable[[List[str]], bool]:
+    """Build a test for manifest annotation rows from normalized filters"""
+    checks = []
+    if "needs_review" in filters:
+        flag = "1" if filters["needs_review"] else "0"
+        checks.append(lambda row: row[A_NEEDS_REVIEW] == flag)
+    if "human_reviewed" in filters:
+        reviewed = "1" if filters["human_reviewed"] else "0"
+        checks.append(lambda row: row[A_REVIEWED] == reviewed)
+    if "model_name" in filters:
+        model_name = filters["model_name"]
+        checks.append(lambda row: row[A_MODEL] == model_name)
+    if "min_confidence" in filters:
+        min_confidence = filters["min_confidence"]
+        checks.append(lambda row: float(row[A_CONFIDENCE]) >= min_confidence)
+    if "max_confidence" in filters:
+        max_confidence = filters["max_confidence"]
+        checks.append(lambda row: float(row[A_CONFIDENCE]) <= max_confidence)
+    if "start" in filters:
+        start = filters["start"]
+        checks.append(lambda row: float(row[A_TIMESTAMP]) >= start)
+    if "end" in filters:
+        end = filters["end"]
+        checks.append(lambda row: float(row[A_TIMESTAMP]) < end)
+    if "entity_type" in filters:
+        entity_type = filters["entity_type"]
+        # Cheap substring test first; decode only rows that might match
+        checks.append(lambda row: entity_type in row[A_ENTITY_TYPES] and
+                      entity_type in decode_entity_types(row[A_ENTITY_TYPES]))
+    return lambda row: all(check(row) for check in checks)
+
+def project(annotation: Dict[str, Any], projection: Optional[List[str]],
+            summary: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Pick projected fields, taking derived fields from the annotation's summary"""
+    if projection is None:
+        return annotation
+    result = {"_id": annotation.get("_id")}
+    for field in projection:
+        if field in DERIVED_FIELDS and summary is not None:
+            result[field] = summary[field]
+        elif field in annotation:
+            result[field] = annotation[field]
+    return result
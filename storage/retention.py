@@ -0,0 +1,98 @@
+# storage/retention.py
+import time
+from pathlib import Path
+from typing import List, Dict, Iterable, Optional
+
+from .manifest import A_ID, A_TIMESTAMP, A_NEEDS_REVIEW, A_REVIEWED, A_VERSION
+
+class RetentionPolicy:
+    """Which annotations leave the hot tier of a FileStore for its archive"""
+
+    def __init__(self, max_age_days: Optional[float] = None, exported_dir: Optional[str] = None,
+                 max_hot_annotations: Optional[int] = None, keep_pending_review: bool = True):
+        """
+        Initialize the policy; an annotation is archived if any rule selects it
+
+        Args:
+            max_age_days: Archive annotations created longer ago than this
+            exported_dir: Output directory of a ParquetExporter; archive annotations
+                whose current version it has exported
+            max_hot_annotations: Archive the oldest annotations beyond this many
+            keep_pending_review: Never archive annotations still waiting for review
+        """
+        if max_age_days is None and exported_dir is None and max_hot_annotations is None:
+            raise ValueError("A retention policy needs max_age_days, exported_dir or max_hot_annotations")
+        self.max_age_days = max_age_days
+        self.exported_dir = Path(exported_dir) if exported_dir is not None else None
+        self.max_hot_annotations = max_hot_annotations
+        self.keep_pending_review = keep_pending_review
+
+    def _exported_versions(self) -> Dict[str, int]:
+        """The exporter's watermark: last exported version of every document"""
+        exported = {}
+        if self.exported_dir is None:
+            return exported
+        try:
+            with open(self.exported_dir / "_exported.tsv", "r") as f:
+                for line in f:
+                    fields = line.rstrip("\n").split("\t")
+                    if len(fields) == 2:
+                        exported[fields[0]] = int(fields[1])
+        except FileNotFoundError:
+            pass
+        return exported
+
+    def select(self, rows: Iterable[List[str]], now: Optional[float] = None) -> List[str]:
+        """IDs of the manifest rows to archive, oldest first"""
+        now = time.time() if now is None else now
+        cutoff = now - self.max_age_days * 86400 if self.max_age_days is not None else None
+        exported = self._exported_versions()
+
+        rows = sorted(rows, key=lambda row: (float(row[A_TIMESTAMP]), row[A_ID]))
+        # Archiving the oldest rows first brings the hot tier under the cap
+        over_cap = max(0, len(rows) - self.max_hot_annotations) if self.max_hot_annotations is not None else 0
+
+        selected = []
+        for row in rows:
+            if self.keep_pending_review and row[A_NEEDS_REVIEW] == "1" and row[A_REVIEWED] == "0":
+                continue
+            if len(selected) < over_cap or \
+                    (cutoff is not None and float(row[A_TIMESTAMP]) < cutoff) or \
+                    exported.get(row[A_ID], -1) >= int(row[A_VERSION]):
+                selected.append(row[A_ID])
+        return selected
+
+if __name__ == "__main__":
+    # Run as: python -m storage.retention --data-dir data --max-age-days 90 [--exported-dir data/parquet]
+    import argparse
+
+    from .file_store import FileStore, list_namespaces
+
+    parser = argparse.ArgumentParser(description="Move old or exported annotations to the archive tier")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--namespace", help="Apply to a single namespace")
+    parser.add_argument("--all-namespaces", action="store_true",
+                        help="Apply to the default store and every namespace")
+    parser.add_argument("--max-age-days", type=float)
+    parser.add_argument("--exported-dir", help="ParquetExporter output directory")
+    parser.add_argument("--max-hot", type=int, help="Most annotations kept in the hot tier")
+    parser.add_argument("--archive-pending-review", action="store_true",
+                        help="Also archive annotations still waiting for review")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    policy = RetentionPolicy(args.max_age_days, args.exported_dir, args.max_hot,
+                             keep_pending_review=not args.archive_pending_review)
+    if args.all_namespaces:
+        namespaces = [None] + list_namespaces(args.data_dir)
+    else:
+        namespaces = [args.namespace]
+    for name in namespaces:
+        store = FileStore(args.data_dir, namespace=name)
+        try:
+            result = store.apply_retention(policy, args.batch_size)
+        finally:
+            store.close()
+        print(f"{name or 'default'}: archived {result['archived']} annotations "
+              f"in {result['segments']} segments, {result['hot']} left hot, "
+              f"{result['segments_deleted']} unreferenced segment files deleted")
@@ -0,0 +1,151 @@
+# storage/review_leases.py
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+
+from .errors import LeaseError
+
+class ReviewLeaseManager:
+    """SQLite-backed review leases shared by every reviewer process on a host"""
+
+    def __init__(self, data_dir: str = "data", default_ttl: float = 900.0):
+        """Initialize the lease database"""
+        self.db_path = Path(data_dir) / "review_leases.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30.0,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                document_id TEXT PRIMARY KEY,
+                reviewer_id TEXT NOT NULL,
+                lease_token TEXT NOT NULL UNIQUE,
+                document_version INTEGER,
+                acquired_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leases_expires ON leases (expires_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leases_reviewer ON leases (reviewer_id)")
+
+    def checkout(self, reviewer_id: str, candidate_ids: Iterable[str], limit: int = 10,
+                 ttl: Optional[float] = None, versions: Optional[Dict[str, int]] = None) -> List[Dict]:
+        """Lease up to `limit` of the candidate documents that nobody else holds"""
+        with self._lock:
+            ttl = ttl or self.default_ttl
+            versions = versions or {}
+            now = time.time()
+            leases = []
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+
+                for document_id in candidate_ids:
+                    if len(leases) >= limit:
+                        break
+
+                    row = self._conn.execute(
+                        "SELECT * FROM leases WHERE document_id = ?", (document_id,)).fetchone()
+                    if row is not None:
+                        # Renew leases this reviewer already holds, skip everyone else's
+                        if row["reviewer_id"] == reviewer_id:
+                            self._conn.execute(
+                                "UPDATE leases SET expires_at = ? WHERE document_id = ?",
+                                (now + ttl, document_id))
+                            leases.append({**dict(row), "expires_at": now + ttl})
+                        continue
+
+                    lease = {
+                        "document_id": document_id,
+                        "reviewer_id": reviewer_id,
+                        "lease_token": str(uuid.uuid4()),
+                        "document_version": versions.get(document_id),
+                        "acquired_at": now,
+                        "expires_at": now + ttl
+                    }
+                    self._conn.execute(
+                        "INSERT INTO leases (document_id, reviewer_id, lease_token, document_version, "
+                        "acquired_at, expires_at) VALUES (:document_id, :reviewer_id, :lease_token, "
+                        ":document_version, :acquired_at, :expires_at)", lease)
+                    leases.append(lease)
+
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            return leases
+
+    def available(self, reviewer_id: str, candidate_ids: Iterable[str]) -> List[str]:
+        """The candidates, in order, that no other reviewer holds an unexpired lease on"""
+        candidate_ids = list(candidate_ids)
+        held = set()
+        with self._lock:
+            now = time.time()
+            # Chunked to stay under SQLite's limit on bound parameters
+            for start in range(0, len(candidate_ids), 500):
+                chunk = candidate_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT document_id FROM leases WHERE expires_at > ? AND reviewer_id != ? "
+                    f"AND document_id IN ({', '.join('?' * len(chunk))})", (now, reviewer_id, *chunk))
+                held.update(row["document_id"] for row in rows)
+        return [document_id for document_id in candidate_ids if document_id not in held]
+
+    def heartbeat(self, lease_token: str, ttl: Optional[float] = None) -> bool:
+        """Extend an unexpired lease; returns False if it has already lapsed"""
+        with self._lock:
+            now = time.time()
+            cursor = self._conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE lease_token = ? AND expires_at > ?",
+                (now + (ttl or self.default_ttl), lease_token, now))
+            return cursor.rowcount == 1
+
+    def validate(self, document_id: str, lease_token: str) -> Dict[str, Any]:
+        """Return the lease for a document if the token still holds it"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM leases WHERE document_id = ? AND lease_token = ?",
+                (document_id, lease_token)).fetchone()
+
+            if row is None:
+                raise LeaseError(f"No lease on document {document_id} for this token")
+            if row["expires_at"] <= time.time():
+                raise LeaseError(f"Lease on document {document_id} has expired")
+
+            return dict(row)
+
+    def release(self, lease_token: str) -> bool:
+        """Give up a lease, e.g. after submitting or abandoning a review"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM leases WHERE lease_token = ?", (lease_token,))
+            return cursor.rowcount == 1
+
+    def get_lease(self, document_id: str) -> Optional[Dict]:
+        """Get the active lease on a document, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM leases WHERE document_id = ? AND expires_at > ?",
+                (document_id, time.time())).fetchone()
+            return dict(row) if row else None
+
+    def active_count(self) -> int:
+        """Number of unexpired leases across all reviewers"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM leases WHERE expires_at > ?", (time.time(),)).fetchone()
+            return row[0]
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
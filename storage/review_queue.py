@@ -0,0 +1,192 @@
+# storage/review_queue.py
+import heapq
+import itertools
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from .summary import summarize_annotation
+
+# Priority key functions: smaller keys are reviewed first
+PRIORITY_KEYS = {
+    "confidence": lambda s: (s["confidence_score"], s["timestamp"]),
+    "issues": lambda s: (-s["invalid_entities"], s["confidence_score"], s["timestamp"]),
+    "oldest": lambda s: (s["timestamp"],)
+}
+
+# Fields persisted per queued document so priorities can be recomputed on load
+QUEUE_FIELDS = ("confidence_score", "validation_score", "invalid_entities", "timestamp")
+
+class ReviewQueue:
+    """Persistent priority queue of documents awaiting human review"""
+
+    def __init__(self, data_dir: str = "data", priority: str = "confidence"):
+        """Initialize the queue and replay its journal from disk"""
+        if priority not in PRIORITY_KEYS:
+            raise ValueError(f"Unknown review priority '{priority}', expected one of {sorted(PRIORITY_KEYS)}")
+
+        self.priority = priority
+        self._priority_key = PRIORITY_KEYS[priority]
+        self.journal_path = Path(data_dir) / "review_queue.jsonl"
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Heap entries are [priority, sequence, document_id]; removed entries
+        # keep their slot with document_id set to None and are skipped lazily
+        self._heap = []
+        self._entries = {}
+        self._fields = {}
+        self._counter = itertools.count()
+
+        self._journal_lines = self._load_journal()
+        if self._journal_lines > 2 * len(self._entries) + 1000:
+            self._compact_journal()
+
+    def _load_journal(self) -> int:
+        """Replay push/remove operations from the journal"""
+        if not self.journal_path.exists():
+            return 0
+
+        line_count = 0
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write is ignored
+                    continue
+
+                line_count += 1
+                if record.get("op") == "push":
+                    self._push_entry(record["id"], {k: record[k] for k in QUEUE_FIELDS})
+                elif record.get("op") == "remove":
+                    self._remove_entry(record["id"])
+
+        return line_count
+
+    def _compact_journal(self):
+        """Rewrite the journal with only the live entries"""
+        tmp_path = self.journal_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            for document_id, fields in self._fields.items():
+                f.write(json.dumps({"op": "push", "id": document_id, **fields}) + "\n")
+        tmp_path.replace(self.journal_path)
+        self._journal_lines = len(self._fields)
+
+    def _append_journal(self, *records: Dict[str, Any]):
+        """Append operations to the journal in a single write"""
+        with open(self.journal_path, "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+        self._journal_lines += len(records)
+
+    def _push_entry(self, document_id: str, fields: Dict[str, Any]):
+        """Add or reprioritize an entry in memory"""
+        self._remove_entry(document_id)
+        entry = [self._priority_key(fields), next(self._counter), document_id]
+        self._entries[document_id] = entry
+        self._fields[document_id] = fields
+        heapq.heappush(self._heap, entry)
+
+    def _remove_entry(self, document_id: str) -> bool:
+        """Mark an entry as removed without restructuring the heap"""
+        entry = self._entries.pop(document_id, None)
+        if entry is None:
+            return False
+        entry[-1] = None
+        self._fields.pop(document_id, None)
+        return True
+
+    def _discard_removed(self):
+        """Drop removed entries sitting on top of the heap"""
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+
+    def push(self, annotation: Dict[str, Any]) -> str:
+        """Queue an annotation for review, replacing any previous entry for it"""
+        document_id = annotation.get("_id")
+        if not document_id:
+            raise ValueError("Annotation must have an _id before it can be queued")
+
+        summary = summarize_annotation(annotation)
+        fields = {k: summary[k] for k in QUEUE_FIELDS}
+        self._push_entry(document_id, fields)
+        self._append_journal({"op": "push", "id": document_id, **fields})
+
+        return document_id
+
+    def update_many(self, push: List[Dict[str, Any]] = (), remove: List[str] = ()) -> int:
+        """Queue and remove many documents with one journal write; returns the operations applied"""
+        records = []
+        for annotation in push:
+            document_id = annotation.get("_id")
+            if not document_id:
+                raise ValueError("Annotation must have an _id before it can be queued")
+            summary = summarize_annotation(annotation)
+            fields = {k: summary[k] for k in QUEUE_FIELDS}
+            self._push_entry(document_id, fields)
+            records.append({"op": "push", "id": document_id, **fields})
+        for document_id in remove:
+            if self._remove_entry(document_id):
+                records.append({"op": "remove", "id": document_id})
+
+        if records:
+            self._append_journal(*records)
+        self._bound_heap()
+        return len(records)
+
+    def pop(self) -> Optional[str]:
+        """Remove and return the highest-priority document ID"""
+        self._discard_removed()
+        if not self._heap:
+            return None
+
+        _, _, document_id = heapq.heappop(self._heap)
+        del self._entries[document_id]
+        del self._fields[document_id]
+        self._append_journal({"op": "remove", "id": document_id})
+
+        return document_id
+
+    def peek(self) -> Optional[str]:
+        """Return the highest-priority document ID without removing it"""
+        self._discard_removed()
+        return self._heap[0][-1] if self._heap else None
+
+    def peek_many(self, limit: int = 10) -> List[str]:
+        """Return up to `limit` document IDs in priority order without removing them"""
+        popped = []
+        while self._heap and len(popped) < limit:
+            entry = heapq.heappop(self._heap)
+            if entry[-1] is not None:
+                popped.append(entry)
+
+        # Reinsert with the original sequence numbers so ordering is unchanged
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+
+        return [entry[-1] for entry in popped]
+
+    def remove(self, document_id: str) -> bool:
+        """Remove a document from the queue, e.g. once it has been reviewed"""
+        removed = self._remove_entry(document_id)
+        if removed:
+            self._append_journal({"op": "remove", "id": document_id})
+
+        self._bound_heap()
+        return removed
+
+    def _bound_heap(self):
+        """Keep dead heap slots bounded relative to live entries"""
+        if len(self._heap) > 2 * len(self._entries) + 1000:
+            self._heap = [entry for entry in self._heap if entry[-1] is not None]
+            heapq.heapify(self._heap)
+
+    def get_priority(self, document_id: str) -> Optional[Tuple]:
+        """Get the priority key of a queued document"""
+        entry = self._entries.get(document_id)
+        return entry[0] if entry else None
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
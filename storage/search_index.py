@@ -0,0 +1,288 @@
+# storage/search_index.py
+import re
+from array import array
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .manifest import paused_gc
+from .snapshot import encode_snapshot, read_snapshot, snapshots_supported
+from .write_behind import atomic_write
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Parentheses, entity terms (TYPE:"text" or TYPE:word), quoted phrases and bare words
+QUERY_TOKEN_PATTERN = re.compile(r'\(|\)|[A-Za-z_]+:"[^"]*"|"[^"]*"|[^\s()"]+')
+ENTITY_TERM_PATTERN = re.compile(r'([A-Za-z_]+):(.+)')
+OPERATORS = ("AND", "OR", "NOT")
+
+# Postings are kept as growable sorted arrays of document numbers and queried
+# as numpy views of them, so boolean operations on millions of documents are vectorized
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens of a text"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+def normalize_entity_text(text: str) -> str:
+    """Entity text as matched by search: "Dr. Chen" and "dr chen" are the same"""
+    return " ".join(tokenize(text))
+
+def entity_key(entity_type: str, text: str) -> str:
+    return f"{entity_type.upper()}\x1f{normalize_entity_text(text)}"
+
+def _member_mask(numbers: np.ndarray, postings: np.ndarray) -> np.ndarray:
+    """Which of the numbers are in the sorted postings"""
+    if not len(postings):
+        return np.zeros(len(numbers), dtype=bool)
+    positions = np.minimum(np.searchsorted(postings, numbers), len(postings) - 1)
+    return postings[positions] == numbers
+
+def _intersect(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    # Probe the larger side with the smaller one
+    if len(left) > len(right):
+        left, right = right, left
+    return left[_member_mask(left, right)]
+
+def _subtract(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    return left[~_member_mask(left, right)]
+
+class SearchIndex:
+    """Inverted index over document tokens and (entity type, normalized entity text)"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path = self.directory / "search.snapshot"
+        # Each indexed version of a document gets the next number; superseded numbers
+        # stay in the postings but map to None and are dropped from results
+        self._document_ids = []
+        self._alive = bytearray()
+        self._versions = array("q")
+        self._numbers = {}
+        self._terms = {}
+        self._entities = {}
+        self._dead = 0
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def version(self, document_id: str) -> Optional[int]:
+        """Indexed version of a document, or None if it isn't indexed"""
+        number = self._numbers.get(document_id)
+        return self._versions[number] if number is not None else None
+
+    def add(self, document_id: str, version: int, text: str, entities: List[Dict[str, Any]]):
+        """Index a document version, replacing the previously indexed one"""
+        previous = self._numbers.get(document_id)
+        if previous is not None:
+            self._document_ids[previous] = None
+            self._alive[previous] = 0
+            self._dead += 1
+
+        number = len(self._document_ids)
+        self._document_ids.append(document_id)
+        self._alive.append(1)
+        self._versions.append(version)
+        self._numbers[document_id] = number
+
+        for token in set(tokenize(text)):
+            self._terms.setdefault(token, array("I")).append(number)
+        keys = set()
+        for entity in entities:
+            # Type and text may be present but None, e.g. on entities added during review
+            entity_type = entity.get("type") or ""
+            keys.add(entity_key(entity_type, entity.get("text") or ""))
+            # TYPE:* matches any entity of the type
+            keys.add(f"{entity_type.upper()}\x1f*")
+        for key in keys:
+            self._entities.setdefault(key, array("I")).append(number)
+        self._dirty = True
+
+        if self._dead > 10000 and self._dead > len(self._numbers):
+            self.compact()
+
+    def remove(self, document_id: str):
+        """Drop a document from search results"""
+        number = self._numbers.pop(document_id, None)
+        if number is None:
+            return
+        self._document_ids[number] = None
+        self._alive[number] = 0
+        self._dead += 1
+        self._dirty = True
+
+    def document_ids(self) -> List[str]:
+        """IDs of every indexed document"""
+        return list(self._numbers)
+
+    def compact(self):
+        """Renumber live documents, dropping superseded versions from the postings"""
+        renumbered = array("I", [0]) * len(self._document_ids)
+        document_ids, versions = [], array("q")
+        for number, document_id in enumerate(self._document_ids):
+            if document_id is not None:
+                renumbered[number] = len(document_ids)
+                document_ids.append(document_id)
+                versions.append(self._versions[number])
+
+        def remap(postings: Dict[str, array]) -> Dict[str, array]:
+            remapped = {}
+            for key, numbers in postings.items():
+                live = array("I", (renumbered[n] for n in numbers if self._document_ids[n] is not None))
+                if live:
+                    remapped[key] = live
+            return remapped
+
+        with paused_gc():
+            self._terms = remap(self._terms)
+            self._entities = remap(self._entities)
+        self._document_ids = document_ids
+        self._alive = bytearray(b"\x01") * len(document_ids)
+        self._versions = versions
+        self._numbers = {document_id: number for number, document_id in enumerate(document_ids)}
+        self._dead = 0
+        self._dirty = True
+
+    def save(self):
+        """Persist the index if it changed since it was loaded or saved"""
+        if not self._dirty or not snapshots_supported():
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        state = {
+            "document_ids": self._document_ids,
+            "versions": self._versions.tobytes(),
+            "terms": {key: numbers.tobytes() for key, numbers in self._terms.items()},
+            "entities": {key: numbers.tobytes() for key, numbers in self._entities.items()}
+        }
+        atomic_write(self.path, encode_snapshot(state))
+        self._dirty = False
+
+    def load(self) -> bool:
+        """Load the persisted index; False if there is none"""
+        state = read_snapshot(self.path)
+        if state is None:
+            return False
+
+        def postings(encoded: Dict[str, bytes]) -> Dict[str, array]:
+            decoded = {}
+            for key, data in encoded.items():
+                numbers = array("I")
+                numbers.frombytes(data)
+                decoded[key] = numbers
+            return decoded
+
+        with paused_gc():
+            self._document_ids = state["document_ids"]
+            self._alive = bytearray(document_id is not None for document_id in self._document_ids)
+            self._versions = array("q")
+            self._versions.frombytes(state["versions"])
+            self._numbers = {document_id: number for number, document_id in enumerate(self._document_ids)
+                             if document_id is not None}
+            self._terms = postings(state["terms"])
+            self._entities = postings(state["entities"])
+        self._dead = len(self._document_ids) - len(self._numbers)
+        self._dirty = False
+        return True
+
+    def search(self, query: str, limit: Optional[int] = 50) -> Tuple[List[str], int]:
+        """
+        Run a boolean query; returns (document IDs, most recently indexed first, total matches).
+
+        Syntax: words and "quoted words" match documents containing all of the words;
+        TYPE:"entity text" and TYPE:word match entities (TYPE:* any entity of the type);
+        terms combine with AND (implicit), OR, NOT and parentheses.
+        """
+        tokens = QUERY_TOKEN_PATTERN.findall(query)
+        if not tokens:
+            return [], 0
+        result = _QueryParser(tokens, self).parse()
+
+        # Results are sorted by document number, which grows with each indexed version
+        live = result[np.frombuffer(self._alive, dtype=bool)[result]][::-1]
+        matches = live if limit is None else live[:limit]
+        return [self._document_ids[number] for number in matches.tolist()], len(live)
+
+    def _postings(self, postings: Optional[array]) -> np.ndarray:
+        # Copied out of the array so later appends can resize it
+        if postings is None:
+            return np.empty(0, dtype=np.uint32)
+        return np.frombuffer(postings, dtype=np.uint32).copy()
+
+    def _term_postings(self, words: List[str]) -> np.ndarray:
+        """Documents containing every word"""
+        result = None
+        for word in words:
+            numbers = self._postings(self._terms.get(word))
+            result = numbers if result is None else _intersect(result, numbers)
+        return result if result is not None else self._postings(None)
+
+    def _entity_postings(self, entity_type: str, text: str) -> np.ndarray:
+        key = f"{entity_type.upper()}\x1f*" if text == "*" else entity_key(entity_type, text)
+        return self._postings(self._entities.get(key))
+
+    def _all_postings(self) -> np.ndarray:
+        return np.flatnonzero(np.frombuffer(self._alive, dtype=bool)).astype(np.uint32)
+
+class _QueryParser:
+    """Recursive descent parser evaluating a query as it goes"""
+
+    def __init__(self, tokens: List[str], index: SearchIndex):
+        self.tokens = tokens
+        self.position = 0
+        self.index = index
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Unexpected end of search query")
+        self.position += 1
+        return token
+
+    def parse(self) -> np.ndarray:
+        result = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected '{self._peek()}' in search query")
+        return result
+
+    def _or(self) -> np.ndarray:
+        result = self._and()
+        while self._peek() == "OR":
+            self._next()
+            result = np.union1d(result, self._and())
+        return result
+
+    def _and(self) -> np.ndarray:
+        result = self._not()
+        while self._peek() not in (None, "OR", ")"):
+            if self._peek() == "AND":
+                self._next()
+            if self._peek() == "NOT":
+                self._next()
+                result = _subtract(result, self._not())
+            else:
+                result = _intersect(result, self._not())
+        return result
+
+    def _not(self) -> np.ndarray:
+        if self._peek() == "NOT":
+            self._next()
+            return _subtract(self.index._all_postings(), self._not())
+        return self._atom()
+
+    def _atom(self) -> np.ndarray:
+        token = self._next()
+        if token == "(":
+            result = self._or()
+            if self._next() != ")":
+                raise ValueError("Missing ')' in search query")
+            return result
+        if token in OPERATORS or token == ")":
+            raise ValueError(f"Unexpected '{token}' in search query")
+        entity_term = ENTITY_TERM_PATTERN.fullmatch(token)
+        if entity_term:
+            entity_type, text = entity_term.groups()
+            return self.index._entity_postings(entity_type, text.strip('"'))
+        return self.index._term_postings(tokenize(token.strip('"')))
@@ -0,0 +1,370 @@
+# storage/segment_store.py
+import heapq
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator
+
+from .correction_index import CorrectionIndex
+from .errors import VersionConflictError
+from .manifest import (ANNOTATION_TAG, CORRECTION_TAG, ANNOTATION_COLUMNS, CORRECTION_COLUMNS,
+                       encode_annotation_row, encode_correction_row, decode_annotation_row,
+                       A_ID, A_TIMESTAMP, A_NEEDS_REVIEW, A_VERSION, C_ID, C_DOCUMENT_ID, C_TIMESTAMP)
+from .store_stats import StoreStatistics
+from .summary import summarize_annotation, summarize_correction
+
+class SegmentStore:
+    """Append-only segmented log storage for annotations with human review tracking"""
+
+    # Every public method takes the store lock
+    thread_safe = True
+
+    def __init__(self, data_dir: str = "data", review_queue=None,
+                 max_segment_bytes: int = 64 * 1024 * 1024, fsync: bool = False,
+                 compaction_interval: Optional[float] = None, compaction_threshold: float = 0.5):
+        """Initialize the segment log and rebuild the offset index"""
+        self.data_dir = Path(data_dir)
+        self.segments_dir = self.data_dir / "segments"
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        self.review_queue = review_queue
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+        self.compaction_threshold = compaction_threshold
+
+        # Index entries are [manifest row, segment number, offset, length]
+        self._annotations = {}
+        self._corrections = {}
+        self._correction_index = CorrectionIndex()
+        self._stats = StoreStatistics()
+        self._dead_bytes = {}
+        self._segment_sizes = {}
+        self._read_fds = {}
+        self._lock = threading.RLock()
+
+        self._load_segments()
+        self._open_active_segment()
+
+        # Optional background compaction of superseded records
+        self._stop_event = threading.Event()
+        self._compactor = None
+        if compaction_interval:
+            self._compactor = threading.Thread(
+                target=self._compaction_loop, args=(compaction_interval,), daemon=True)
+            self._compactor.start()
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.segments_dir / f"segment-{segment:06d}.log"
+
+    def _load_segments(self):
+        """Rebuild the in-memory offset index by scanning record headers"""
+        annotation_width = len(ANNOTATION_COLUMNS) + 1
+        correction_width = len(CORRECTION_COLUMNS) + 1
+
+        for path in sorted(self.segments_dir.glob("segment-*.log")):
+            segment = int(path.stem.split("-")[1])
+            self._dead_bytes[segment] = 0
+            offset = 0
+
+            with open(path, "rb") as f:
+                for raw_line in f:
+                    length = len(raw_line)
+                    # A record without its newline is a torn write at the end of the log
+                    if not raw_line.endswith(b"\n"):
+                        break
+                    tag = raw_line[:1].decode()
+                    width = annotation_width if tag == ANNOTATION_TAG else correction_width
+                    # Only the header columns are decoded; bodies stay on disk
+                    row = [field.decode("utf-8") for field in raw_line.split(b"\t", width)[:width]]
+
+                    if tag == ANNOTATION_TAG and len(row) == width:
+                        self._index_annotation([row, segment, offset, length])
+                    elif tag == CORRECTION_TAG and len(row) == width:
+                        self._index_correction([row, segment, offset, length])
+                    offset += length
+
+            # Appends continue from the last whole record, not after the torn one
+            if path.stat().st_size > offset:
+                os.truncate(path, offset)
+            self._segment_sizes[segment] = offset
+
+    def _index_record(self, index: Dict, record_id: str, entry: List) -> Optional[List]:
+        """Point the index at a new record, counting the superseded one as dead"""
+        previous = index.get(record_id)
+        if previous is not None:
+            self._dead_bytes[previous[1]] = self._dead_bytes.get(previous[1], 0) + previous[3]
+        index[record_id] = entry
+        return previous
+
+    def _index_annotation(self, entry: List):
+        """Index an annotation record and update the running statistics"""
+        row = entry[0]
+        previous = self._index_record(self._annotations, row[A_ID], entry)
+        self._stats.replace_annotation_row(previous[0] if previous else None, row)
+
+    def _index_correction(self, entry: List):
+        """Index a correction record by ID and by document"""
+        row = entry[0]
+        if self._index_record(self._corrections, row[C_ID], entry) is None:
+            self._stats.add_correction_row(row)
+        self._correction_index.add(row[C_DOCUMENT_ID], row[C_ID], float(row[C_TIMESTAMP]))
+
+    def _open_active_segment(self):
+        """Open the newest segment for appending, starting a new one if it is full"""
+        segment = max(self._segment_sizes, default=1)
+        if self._segment_sizes.get(segment, 0) >= self.max_segment_bytes:
+            segment += 1
+        self._active_segment = segment
+        self._segment_sizes.setdefault(segment, 0)
+        self._dead_bytes.setdefault(segment, 0)
+        self._active_file = open(self._segment_path(segment), "ab")
+
+    def _roll_segment(self):
+        """Seal the active segment and start the next one"""
+        self._active_file.close()
+        self._active_segment += 1
+        self._segment_sizes[self._active_segment] = 0
+        self._dead_bytes[self._active_segment] = 0
+        self._active_file = open(self._segment_path(self._active_segment), "ab")
+
+    def _append_records(self, records: List[tuple]) -> List[List]:
+        """Append (row, body) records in one write and return their index entries"""
+        entries = []
+        chunks = []
+        for row, body in records:
+            if self._segment_sizes[self._active_segment] >= self.max_segment_bytes:
+                self._flush_chunks(chunks)
+                chunks = []
+                self._roll_segment()
+
+            line = ("\t".join(row) + "\t" + body + "\n").encode("utf-8")
+            offset = self._segment_sizes[self._active_segment]
+            entries.append([row, self._active_segment, offset, len(line)])
+            chunks.append(line)
+            self._segment_sizes[self._active_segment] = offset + len(line)
+
+        self._flush_chunks(chunks)
+        return entries
+
+    def _flush_chunks(self, chunks: List[bytes]):
+        """Write buffered records to the active segment"""
+        if not chunks:
+            return
+        self._active_file.write(b"".join(chunks))
+        self._active_file.flush()
+        if self.fsync:
+            os.fsync(self._active_file.fileno())
+
+    def _read_fd(self, segment: int) -> int:
+        """File descriptor for positional reads from a segment"""
+        fd = self._read_fds.get(segment)
+        if fd is None:
+            fd = os.open(self._segment_path(segment), os.O_RDONLY)
+            self._read_fds[segment] = fd
+        return fd
+
+    def _read_body(self, entry: List) -> str:
+        """Read the JSON body of an indexed record"""
+        row, segment, offset, length = entry
+        line = os.pread(self._read_fd(segment), length, offset).decode("utf-8")
+        return line.split("\t", len(row))[len(row)].rstrip("\n")
+
+    def _read_record(self, entry: List) -> Dict:
+        """Read and decode the body of an indexed record"""
+        return json.loads(self._read_body(entry))
+
+    def _prepare_annotation(self, annotation: Dict[str, Any],
+                            batch_versions: Optional[Dict[str, int]] = None) -> tuple:
+        """Assign ID, timestamp and version and render the log record"""
+        if "_id" not in annotation:
+            annotation["_id"] = str(uuid.uuid4())
+        if "timestamp" not in annotation:
+            annotation["timestamp"] = datetime.now().isoformat()
+
+        # Bump past the stored version so saves of a stale copy never share or lower it;
+        # batch_versions holds versions assigned earlier in the same, not yet indexed, batch
+        entry = self._annotations.get(annotation["_id"])
+        stored_version = int(entry[0][A_VERSION]) if entry else 0
+        if batch_versions is not None:
+            stored_version = max(stored_version, batch_versions.get(annotation["_id"], 0))
+        annotation["version"] = max(annotation.get("version", 0), stored_version) + 1
+        if batch_versions is not None:
+            batch_versions[annotation["_id"]] = annotation["version"]
+
+        row = encode_annotation_row(summarize_annotation(annotation))
+        return row, json.dumps(annotation, separators=(",", ":"))
+
+    def save_annotation(self, annotation: Dict[str, Any]) -> str:
+        """Append an annotation to the log"""
+        return self.save_annotations([annotation])[0]
+
+    def save_annotations(self, annotations: List[Dict[str, Any]]) -> List[str]:
+        """Append a batch of annotations to the log with a single write"""
+        with self._lock:
+            batch_versions = {}
+            records = [self._prepare_annotation(annotation, batch_versions) for annotation in annotations]
+            for entry in self._append_records(records):
+                self._index_annotation(entry)
+
+        return [annotation["_id"] for annotation in annotations]
+
+    def find_by_id(self, document_id: str) -> Optional[Dict]:
+        """Find an annotation by ID"""
+        with self._lock:
+            entry = self._annotations.get(document_id)
+            return self._read_record(entry) if entry else None
+
+    def find_by_review_status(self, needs_review: bool = True, limit: int = 10) -> List[Dict]:
+        """Find annotations by review status with prioritization for recent documents."""
+        flag = "1" if needs_review else "0"
+
+        with self._lock:
+            entries = heapq.nlargest(
+                limit,
+                (entry for entry in self._annotations.values() if entry[0][A_NEEDS_REVIEW] == flag),
+                key=lambda entry: float(entry[0][A_TIMESTAMP])
+            )
+            results = [self._read_record(entry) for entry in entries]
+
+        # Show reviewers the entities as they were before any human correction
+        for annotation in results:
+            original = self._get_original_annotation(annotation["_id"])
+            if original:
+                annotation["entities"] = original["original_entities"]
+
+        return results
+
+    def _get_original_annotation(self, document_id: str) -> Optional[Dict]:
+        """Get the original document state before corrections."""
+        with self._lock:
+            correction_id = self._correction_index.first(document_id)
+            return self._read_record(self._corrections[correction_id]) if correction_id else None
+
+    def get_corrections_for_document(self, document_id: str) -> List[Dict]:
+        """All corrections of a document, in the order they were made"""
+        with self._lock:
+            return [self._read_record(self._corrections[correction_id])
+                    for correction_id in self._correction_index.correction_ids(document_id)]
+
+    def iter_summaries(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the routing fields of every stored annotation"""
+        with self._lock:
+            rows = [entry[0] for entry in self._annotations.values()]
+        for row in rows:
+            yield decode_annotation_row(row)
+
+    def update_after_review(self, document_id: str, corrected_entities: List[Dict],
+                            expected_version: Optional[int] = None) -> Dict:
+        """Update annotation after human review"""
+        with self._lock:
+            original = self.find_by_id(document_id)
+            if not original:
+                raise ValueError(f"Document with ID {document_id} not found")
+
+            current_version = original.get("version", 0)
+            if expected_version is not None and current_version != expected_version:
+                raise VersionConflictError(document_id, expected_version, current_version)
+
+            # Store correction record for active learning
+            correction_record = {
+                "_id": str(uuid.uuid4()),
+                "document_id": document_id,
+                "original_entities": original.get("entities", []),
+                "corrected_entities": corrected_entities,
+                "correction_timestamp": datetime.now().isoformat(),
+                "original_confidence": original.get("confidence_score", 0)
+            }
+            correction_row = encode_correction_row(summarize_correction(correction_record))
+
+            # Update the original annotation
+            original["entities"] = corrected_entities
+            original["human_reviewed"] = True
+            original["review_timestamp"] = datetime.now().isoformat()
+
+            # Append the correction and the new annotation version together
+            correction_entry, annotation_entry = self._append_records([
+                (correction_row, json.dumps(correction_record, separators=(",", ":"))),
+                self._prepare_annotation(original)
+            ])
+            self._index_correction(correction_entry)
+            self._index_annotation(annotation_entry)
+
+        # Reviewed documents leave the review queue
+        if self.review_queue is not None:
+            self.review_queue.remove(document_id)
+
+        return {"status": "success", "document_id": document_id}
+
+    def get_corrections(self, limit: int = 100) -> List[Dict]:
+        """Retrieve correction records for active learning"""
+        with self._lock:
+            entries = list(self._corrections.values())[:limit]
+            return [self._read_record(entry) for entry in entries]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get statistics about the annotation storage"""
+        with self._lock:
+            stats = self._stats.to_dict()
+            stats.update({
+                "segments": len(self._segment_sizes),
+                "segment_bytes": sum(self._segment_sizes.values()),
+                "dead_bytes": sum(self._dead_bytes.values())
+            })
+        return stats
+
+    def compact(self) -> int:
+        """Rewrite sealed segments dominated by superseded records; returns segments removed"""
+        with self._lock:
+            candidates = [segment for segment, size in self._segment_sizes.items()
+                          if segment != self._active_segment and size > 0
+                          and self._dead_bytes.get(segment, 0) / size >= self.compaction_threshold]
+
+        removed = 0
+        for segment in candidates:
+            self._compact_segment(segment)
+            removed += 1
+        return removed
+
+    def _compact_segment(self, segment: int):
+        """Copy the live records of one sealed segment forward and delete it"""
+        with self._lock:
+            live = [(index, record_id, entry)
+                    for index in (self._annotations, self._corrections)
+                    for record_id, entry in index.items() if entry[1] == segment]
+            live.sort(key=lambda item: item[2][2])
+
+            records = [(entry[0], self._read_body(entry)) for _, _, entry in live]
+
+            # Copied records are already durable elsewhere before the old segment goes away
+            for (index, record_id, _), new_entry in zip(live, self._append_records(records)):
+                index[record_id] = new_entry
+            if not self.fsync:
+                os.fsync(self._active_file.fileno())
+
+            fd = self._read_fds.pop(segment, None)
+            if fd is not None:
+                os.close(fd)
+            self._segment_path(segment).unlink()
+            del self._segment_sizes[segment]
+            self._dead_bytes.pop(segment, None)
+
+    def _compaction_loop(self, interval: float):
+        """Background thread that compacts periodically until the store is closed"""
+        while not self._stop_event.wait(interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Error compacting segments: {e}")
+
+    def close(self):
+        """Stop background compaction and close segment files"""
+        self._stop_event.set()
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._active_file.close()
+            for fd in self._read_fds.values():
+                os.close(fd)
+            self._read_fds.clear()
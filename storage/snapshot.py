@@ -0,0 +1,53 @@
+# storage/snapshot.py
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+try:
+    import msgpack
+except ImportError:  # snapshots are disabled; indexes are rebuilt from the manifest
+    msgpack = None
+
+from .manifest import paused_gc
+
+SNAPSHOT_VERSION = 1
+
+# The first bytes of a snapshot name its encoding. Snapshots in any other encoding,
+# such as the pickle snapshots of earlier releases, are never decoded: loading one
+# could run arbitrary code from a file in the data directory.
+MSGPACK_MAGIC = b"ASNAPM1\n"
+
+def snapshots_supported() -> bool:
+    """Whether snapshots can be written and read (msgpack is installed)"""
+    return msgpack is not None
+
+def encode_snapshot(state: Dict[str, Any]) -> Optional[bytes]:
+    """Serialize an index snapshot, or None if msgpack isn't installed"""
+    if msgpack is None:
+        return None
+    state = dict(state, snapshot_version=SNAPSHOT_VERSION)
+    return MSGPACK_MAGIC + msgpack.packb(state, use_bin_type=True)
+
+def decode_snapshot(data: bytes) -> Optional[Dict[str, Any]]:
+    """Deserialize a snapshot, or None if it is unreadable, in another encoding or from another version"""
+    magic, payload = data[:len(MSGPACK_MAGIC)], data[len(MSGPACK_MAGIC):]
+    if magic != MSGPACK_MAGIC or msgpack is None:
+        return None
+    try:
+        with paused_gc():
+            state = msgpack.unpackb(payload, raw=False)
+    except Exception as e:
+        print(f"Error reading index snapshot: {e}")
+        return None
+
+    if not isinstance(state, dict) or state.get("snapshot_version") != SNAPSHOT_VERSION:
+        return None
+    return state
+
+def read_snapshot(path: Path) -> Optional[Dict[str, Any]]:
+    """Load the snapshot file, or None if there isn't a usable one"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return decode_snapshot(data)
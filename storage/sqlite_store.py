@@ -0,0 +1,392 @@
+# storage/sqlite_store.py
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator
+
+from .errors import VersionConflictError
+from .query import normalize_filters, encode_cursor, decode_cursor, index_only, project, DERIVED_FIELDS
+from .summary import summarize_annotation, summarize_correction, timestamp_to_epoch
+
+# Routing fields are real columns so they can be indexed; the full record
+# (including entities) is kept as JSON so nothing the pipeline adds is lost.
+ANNOTATION_COLUMNS = ("_id", "timestamp", "needs_human_review", "human_reviewed", "confidence_score",
+                      "validation_score", "invalid_entities", "entity_count", "model_name", "version",
+                      "entities", "body")
+CORRECTION_COLUMNS = ("_id", "document_id", "timestamp", "original_confidence", "entities_changed", "body")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS annotations (
+        _id TEXT PRIMARY KEY,
+        timestamp REAL NOT NULL,
+        needs_human_review INTEGER NOT NULL,
+        human_reviewed INTEGER NOT NULL,
+        confidence_score REAL NOT NULL,
+        validation_score REAL NOT NULL,
+        invalid_entities INTEGER NOT NULL,
+        entity_count INTEGER NOT NULL,
+        model_name TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        entities TEXT NOT NULL,
+        body TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_annotations_review ON annotations (needs_human_review, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_annotations_model ON annotations (model_name, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_annotations_timestamp ON annotations (timestamp);
+    CREATE INDEX IF NOT EXISTS idx_annotations_confidence ON annotations (confidence_score);
+
+    CREATE TABLE IF NOT EXISTS corrections (
+        _id TEXT PRIMARY KEY,
+        document_id TEXT NOT NULL,
+        timestamp REAL NOT NULL,
+        original_confidence REAL NOT NULL,
+        entities_changed INTEGER NOT NULL,
+        body TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_corrections_document ON corrections (document_id, timestamp);
+"""
+
+class SQLiteStore:
+    """Embedded SQLite storage for annotations with human review tracking"""
+
+    # Every query runs under the connection lock
+    thread_safe = True
+
+    def __init__(self, data_dir: str = "data", review_queue=None, batch_size: int = 500):
+        """Initialize the database and create tables and indexes"""
+        self.db_path = Path(data_dir) / "annotations.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.review_queue = review_queue
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+
+        # Autocommit mode; writes open explicit transactions
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30.0,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # WAL lets dashboard processes read while the pipeline writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _annotation_row(self, annotation: Dict[str, Any]) -> tuple:
+        """Flatten an annotation into column values"""
+        summary = summarize_annotation(annotation)
+        body = {key: value for key, value in annotation.items() if key != "entities"}
+        return (
+            summary["_id"],
+            summary["timestamp"],
+            int(summary["needs_human_review"]),
+            int(summary["human_reviewed"]),
+            summary["confidence_score"],
+            summary["validation_score"],
+            summary["invalid_entities"],
+            summary["entity_count"],
+            summary["model_name"],
+            summary["version"],
+            json.dumps(annotation.get("entities", [])),
+            json.dumps(body, default=str)
+        )
+
+    def _correction_row(self, correction: Dict[str, Any]) -> tuple:
+        """Flatten a correction record into column values"""
+        summary = summarize_correction(correction)
+        return (
+            summary["_id"],
+            summary["document_id"],
+            summary["timestamp"],
+            summary["original_confidence"],
+            int(summary["entities_changed"]),
+            json.dumps(correction, default=str)
+        )
+
+    def _to_annotation(self, row: sqlite3.Row) -> Dict[str, Any]:
+        annotation = json.loads(row["body"])
+        annotation["entities"] = json.loads(row["entities"])
+        return annotation
+
+    def _to_summary(self, row: sqlite3.Row) -> Dict[str, Any]:
+        summary = {column: row[column] for column in ANNOTATION_COLUMNS[:-2]}
+        summary["needs_human_review"] = bool(summary["needs_human_review"])
+        summary["human_reviewed"] = bool(summary["human_reviewed"])
+        return summary
+
+    def _prepare_annotation(self, annotation: Dict[str, Any]):
+        """Assign ID and timestamp in place"""
+        if "_id" not in annotation:
+            annotation["_id"] = str(uuid.uuid4())
+        if "timestamp" not in annotation:
+            annotation["timestamp"] = datetime.now().isoformat()
+
+    def _insert_annotations(self, annotations: List[Dict[str, Any]]):
+        """Write annotations with versions bumped past the stored ones; call inside a write transaction"""
+        # Saves of a stale copy, or from two processes, never share or lower a version
+        document_ids = list({annotation["_id"] for annotation in annotations})
+        versions = dict(self._conn.execute(
+            f"SELECT _id, version FROM annotations WHERE _id IN ({', '.join('?' * len(document_ids))})",
+            document_ids).fetchall())
+        for annotation in annotations:
+            version = max(annotation.get("version", 0), versions.get(annotation["_id"], 0)) + 1
+            annotation["version"] = versions[annotation["_id"]] = version
+
+        placeholders = ", ".join("?" for _ in ANNOTATION_COLUMNS)
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO annotations ({', '.join(ANNOTATION_COLUMNS)}) VALUES ({placeholders})",
+            [self._annotation_row(annotation) for annotation in annotations])
+
+    def save_annotation(self, annotation: Dict[str, Any]) -> str:
+        """Save an annotation to the database"""
+        return self.save_annotations([annotation])[0]
+
+    def save_annotations(self, annotations: List[Dict[str, Any]]) -> List[str]:
+        """Save many annotations, committing once per batch"""
+        for annotation in annotations:
+            self._prepare_annotation(annotation)
+
+        with self._lock:
+            for start in range(0, len(annotations), self.batch_size):
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._insert_annotations(annotations[start:start + self.batch_size])
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+        if annotations:
+            self.last_processed_id = annotations[-1]["_id"]
+        return [annotation["_id"] for annotation in annotations]
+
+    def _query_annotations(self, where: str, params: tuple, limit: int) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT entities, body FROM annotations WHERE {where} "
+                f"ORDER BY timestamp DESC LIMIT ?", params + (limit,)).fetchall()
+        return [self._to_annotation(row) for row in rows]
+
+    def find_by_review_status(self, needs_review: bool = True, limit: int = 10) -> List[Dict]:
+        """Find annotations by review status with prioritization for recent documents."""
+        results = self._query_annotations("needs_human_review = ?", (int(needs_review),), limit)
+
+        # Show reviewers the entities as they were before any human correction
+        for annotation in results:
+            original = self._get_original_annotation(annotation["_id"])
+            if original:
+                annotation["entities"] = original["original_entities"]
+
+        return results
+
+    def _get_original_annotation(self, document_id: str) -> Optional[Dict]:
+        """Get the original document state before corrections."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM corrections WHERE document_id = ? "
+                "ORDER BY timestamp, rowid LIMIT 1", (document_id,)).fetchone()
+        return json.loads(row["body"]) if row else None
+
+    def find_by_id(self, document_id: str) -> Optional[Dict]:
+        """Find an annotation by ID"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entities, body FROM annotations WHERE _id = ?", (document_id,)).fetchone()
+        return self._to_annotation(row) if row else None
+
+    def find_by_model(self, model_name: str, limit: int = 100) -> List[Dict]:
+        """Find the most recent annotations produced by a model"""
+        return self._query_annotations("model_name = ?", (model_name,), limit)
+
+    def find_by_date_range(self, start: Any, end: Any, limit: int = 100) -> List[Dict]:
+        """Find annotations with start <= timestamp < end (epoch seconds or ISO strings)"""
+        return self._query_annotations("timestamp >= ? AND timestamp < ?",
+                                       (timestamp_to_epoch(start), timestamp_to_epoch(end)), limit)
+
+    def find_by_confidence(self, min_confidence: float = 0.0, max_confidence: float = 1.0,
+                           limit: int = 100) -> List[Dict]:
+        """Find annotations with min_confidence <= confidence_score <= max_confidence"""
+        return self._query_annotations("confidence_score BETWEEN ? AND ?",
+                                       (min_confidence, max_confidence), limit)
+
+    def get_corrections_for_document(self, document_id: str) -> List[Dict]:
+        """All corrections of a document, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM corrections WHERE document_id = ? ORDER BY timestamp, rowid",
+                (document_id,)).fetchall()
+        return [json.loads(row["body"]) for row in rows]
+
+    def iter_summaries(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the routing fields of every stored annotation"""
+        columns = ", ".join(ANNOTATION_COLUMNS[:-2])
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {columns} FROM annotations").fetchall()
+        for row in rows:
+            yield self._to_summary(row)
+
+    def _filter_clauses(self, filters: Optional[Dict[str, Any]]) -> tuple:
+        """Translate query filters into a WHERE clause over the indexed columns"""
+        filters = normalize_filters(filters)
+        clauses, params = [], []
+        if "needs_review" in filters:
+            clauses.append("needs_human_review = ?")
+            params.append(int(bool(filters["needs_review"])))
+        if "human_reviewed" in filters:
+            clauses.append("human_reviewed = ?")
+            params.append(int(bool(filters["human_reviewed"])))
+        if "model_name" in filters:
+            clauses.append("model_name = ?")
+            params.append(filters["model_name"])
+        if "min_confidence" in filters:
+            clauses.append("confidence_score >= ?")
+            params.append(filters["min_confidence"])
+        if "max_confidence" in filters:
+            clauses.append("confidence_score <= ?")
+            params.append(filters["max_confidence"])
+        if "start" in filters:
+            clauses.append("timestamp >= ?")
+            params.append(filters["start"])
+        if "end" in filters:
+            clauses.append("timestamp < ?")
+            params.append(filters["end"])
+        if "entity_type" in filters:
+            clauses.append("EXISTS (SELECT 1 FROM json_each(annotations.entities) "
+                           "WHERE json_extract(value, '$.type') = ?)")
+            params.append(filters["entity_type"])
+        return clauses, params
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, projection: Optional[List[str]] = None,
+              limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Page through annotations newest first; see FileStore.query"""
+        clauses, params = self._filter_clauses(filters)
+        if cursor is not None:
+            timestamp, last_id = decode_cursor(cursor)
+            clauses.append("(timestamp < ? OR (timestamp = ? AND _id < ?))")
+            params.extend([timestamp, timestamp, last_id])
+        where = " AND ".join(clauses) or "1"
+
+        # Index fields come straight from the columns; everything else needs the JSON body
+        from_columns = index_only(projection) and "entity_types" not in projection
+        columns = ", ".join(ANNOTATION_COLUMNS[:-2]) if from_columns else "_id, timestamp, entities, body"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM annotations WHERE {where} "
+                f"ORDER BY timestamp DESC, _id DESC LIMIT ?", params + [limit + 1]).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]["timestamp"], rows[-1]["_id"]])
+
+        items = []
+        for row in rows:
+            if from_columns:
+                items.append(project(self._to_summary(row), projection))
+                continue
+            annotation = self._to_annotation(row)
+            derived = projection is not None and any(field in DERIVED_FIELDS for field in projection)
+            items.append(project(annotation, projection, summarize_annotation(annotation) if derived else None))
+        return {"items": items, "next_cursor": next_cursor}
+
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Number of annotations matching the filters, counted from the indexes"""
+        clauses, params = self._filter_clauses(filters)
+        where = " AND ".join(clauses) or "1"
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM annotations WHERE {where}", params).fetchone()[0]
+
+    def update_after_review(self, document_id: str, corrected_entities: List[Dict],
+                            expected_version: Optional[int] = None) -> Dict:
+        """Update annotation after human review"""
+        with self._lock:
+            # Read and write in one transaction so concurrent reviewers can't interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT entities, body FROM annotations WHERE _id = ?", (document_id,)).fetchone()
+                if row is None:
+                    raise ValueError(f"Document with ID {document_id} not found")
+                original = self._to_annotation(row)
+
+                current_version = original.get("version", 0)
+                if expected_version is not None and current_version != expected_version:
+                    raise VersionConflictError(document_id, expected_version, current_version)
+
+                # Store correction record for active learning
+                correction_record = {
+                    "_id": str(uuid.uuid4()),
+                    "document_id": document_id,
+                    "original_entities": original.get("entities", []),
+                    "corrected_entities": corrected_entities,
+                    "correction_timestamp": datetime.now().isoformat(),
+                    "original_confidence": original.get("confidence_score", 0)
+                }
+                placeholders = ", ".join("?" for _ in CORRECTION_COLUMNS)
+                self._conn.execute(
+                    f"INSERT INTO corrections ({', '.join(CORRECTION_COLUMNS)}) VALUES ({placeholders})",
+                    self._correction_row(correction_record))
+
+                # Update the original annotation
+                original["entities"] = corrected_entities
+                original["human_reviewed"] = True
+                original["review_timestamp"] = datetime.now().isoformat()
+                self._prepare_annotation(original)
+                self._insert_annotations([original])
+
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        # Reviewed documents leave the review queue
+        if self.review_queue is not None:
+            self.review_queue.remove(document_id)
+
+        return {"status": "success", "document_id": document_id}
+
+    def get_corrections(self, limit: int = 100) -> List[Dict]:
+        """Retrieve correction records for active learning"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM corrections ORDER BY rowid LIMIT ?", (limit,)).fetchall()
+        return [json.loads(row["body"]) for row in rows]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get statistics about the annotation storage, in the same shape as FileStore's"""
+        with self._lock:
+            total_annotations, needs_review, human_reviewed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(needs_human_review), 0), COALESCE(SUM(human_reviewed), 0) "
+                "FROM annotations").fetchone()
+            total_corrections, corrections_with_changes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(entities_changed), 0) FROM corrections").fetchone()
+            models = self._conn.execute(
+                "SELECT model_name, COUNT(*), SUM(needs_human_review) FROM annotations "
+                "GROUP BY model_name").fetchall()
+            # Entity validity is stored as JSON true/false, which json_extract returns as 1/0
+            entity_types = self._conn.execute(
+                "SELECT COALESCE(json_extract(value, '$.type'), ''), COUNT(*), "
+                "COALESCE(SUM(json_extract(value, '$.validation.valid') = 0), 0) "
+                "FROM annotations, json_each(annotations.entities) GROUP BY 1").fetchall()
+
+        auto_approved = total_annotations - needs_review
+
+        return {
+            "total_annotations": total_annotations,
+            "total_corrections": total_corrections,
+            "needs_review": needs_review,
+            "auto_approved": auto_approved,
+            "auto_approval_rate": auto_approved / total_annotations if total_annotations > 0 else 0,
+            "human_reviewed": human_reviewed,
+            "corrections_with_changes": corrections_with_changes,
+            "models": {model: {"annotations": total, "needs_review": pending}
+                       for model, total, pending in models},
+            "entity_types": {entity_type: [total, invalid] for entity_type, total, invalid in entity_types},
+            # SQLite has no archive tier
+            "archived_annotations": 0
+        }
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,140 @@
+# storage/store_stats.py
+import json
+from collections import Counter
+from operator import itemgetter
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+
+from .manifest import (A_NEEDS_REVIEW, A_REVIEWED, A_ENTITY_TYPES, A_MODEL, C_CHANGED,
+                       decode_entity_types)
+
+class StoreStatistics:
+    """Running aggregates over manifest rows, updated as rows are added and superseded"""
+
+    def __init__(self):
+        self.total_annotations = 0
+        self.needs_review = 0
+        self.human_reviewed = 0
+        self.total_corrections = 0
+        self.corrections_with_changes = 0
+        # model -> [annotations, needs review]
+        self.models = {}
+        # entity type -> [total, invalid]
+        self.entity_types = {}
+
+    def add_annotation_row(self, row: List[str], sign: int = 1):
+        """Count an annotation row; sign=-1 removes a superseded row"""
+        self.total_annotations += sign
+        needs_review = sign if row[A_NEEDS_REVIEW] == "1" else 0
+        self.needs_review += needs_review
+        if row[A_REVIEWED] == "1":
+            self.human_reviewed += sign
+
+        model = self.models.setdefault(row[A_MODEL], [0, 0])
+        model[0] += sign
+        model[1] += needs_review
+        if model[0] == 0:
+            del self.models[row[A_MODEL]]
+
+        for entity_type, (total, invalid) in decode_entity_types(row[A_ENTITY_TYPES]).items():
+            counts = self.entity_types.setdefault(entity_type, [0, 0])
+            counts[0] += sign * total
+            counts[1] += sign * invalid
+            if counts[0] == 0:
+                del self.entity_types[entity_type]
+
+    @classmethod
+    def count_rows(cls, annotation_rows: Iterable[List[str]],
+                   correction_rows: Iterable[List[str]]) -> "StoreStatistics":
+        """Counters over whole manifest indexes, e.g. when opening a store without saved ones"""
+        stats = cls()
+        # Rows share few distinct field values, so each distinct value is decoded once
+        annotation_rows = list(annotation_rows)
+        for (model, needs_review, reviewed), count in \
+                Counter(map(itemgetter(A_MODEL, A_NEEDS_REVIEW, A_REVIEWED), annotation_rows)).items():
+            stats.total_annotations += count
+            model_counts = stats.models.setdefault(model, [0, 0])
+            model_counts[0] += count
+            if needs_review == "1":
+                stats.needs_review += count
+                model_counts[1] += count
+            if reviewed == "1":
+                stats.human_reviewed += count
+        for field, count in Counter(map(itemgetter(A_ENTITY_TYPES), annotation_rows)).items():
+            for entity_type, (total, invalid) in decode_entity_types(field).items():
+                counts = stats.entity_types.setdefault(entity_type, [0, 0])
+                counts[0] += count * total
+                counts[1] += count * invalid
+        stats.entity_types = {entity_type: counts for entity_type, counts in stats.entity_types.items() if counts[0]}
+
+        changed = Counter(map(itemgetter(C_CHANGED), correction_rows))
+        stats.total_corrections = sum(changed.values())
+        stats.corrections_with_changes = changed["1"]
+        return stats
+
+    def replace_annotation_row(self, previous: Optional[List[str]], row: List[str]):
+        """Count a new annotation version in place of the previous one"""
+        if previous is not None:
+            self.add_annotation_row(previous, -1)
+        self.add_annotation_row(row)
+
+    def add_correction_row(self, row: List[str]):
+        self.total_corrections += 1
+        if row[C_CHANGED] == "1":
+            self.corrections_with_changes += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Statistics in the shape returned by get_statistics"""
+        auto_approved = self.total_annotations - self.needs_review
+        return {
+            "total_annotations": self.total_annotations,
+            "total_corrections": self.total_corrections,
+            "needs_review": self.needs_review,
+            "auto_approved": auto_approved,
+            "auto_approval_rate": auto_approved / self.total_annotations if self.total_annotations > 0 else 0,
+            "human_reviewed": self.human_reviewed,
+            "corrections_with_changes": self.corrections_with_changes,
+            "models": {model: {"annotations": total, "needs_review": needs_review}
+                       for model, (total, needs_review) in self.models.items()},
+            "entity_types": {entity_type: list(counts) for entity_type, counts in self.entity_types.items()}
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """Copy of the counters, safe to serialize while updates continue"""
+        state = dict(vars(self))
+        state["models"] = {model: list(counts) for model, counts in self.models.items()}
+        state["entity_types"] = {entity_type: list(counts) for entity_type, counts in self.entity_types.items()}
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> Optional["StoreStatistics"]:
+        """Counters from to_state(), or None if fields are missing"""
+        stats = cls()
+        for key in vars(stats):
+            if key not in state:
+                return None
+            setattr(stats, key, state[key])
+        return stats
+
+    def save(self, path: Path, manifest_lines: int):
+        """Persist the counters with the manifest length they describe"""
+        state = self.to_state()
+        state["manifest_lines"] = manifest_lines
+        tmp_path = Path(path).with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, manifest_lines: int) -> Optional["StoreStatistics"]:
+        """Load saved counters, or None if they don't match the current manifest"""
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        # Counters saved before later manifest writes are stale
+        if state.pop("manifest_lines", None) != manifest_lines:
+            return None
+        return cls.from_state(state)
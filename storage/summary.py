@@ -0,0 +1,57 @@
+# storage/summary.py
+from typing import Dict, Any
+from datetime import datetime
+
+from .entity_delta import expand_correction
+
+def timestamp_to_epoch(value: Any) -> float:
+    """Convert a stored timestamp (epoch float, ISO string or datetime) to epoch seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return 0.0
+    return 0.0
+
+def summarize_annotation(annotation: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the small set of routing fields used for ordering and indexing."""
+    entities = annotation.get("entities", [])
+    invalid_entities = 0
+    entity_types = {}
+    for entity in entities:
+        counts = entity_types.setdefault(entity.get("type", ""), [0, 0])
+        counts[0] += 1
+        if not entity.get("validation", {}).get("valid", True):
+            counts[1] += 1
+            invalid_entities += 1
+
+    return {
+        "_id": annotation.get("_id"),
+        "timestamp": timestamp_to_epoch(annotation.get("timestamp")),
+        "needs_human_review": bool(annotation.get("needs_human_review", False)),
+        "human_reviewed": bool(annotation.get("human_reviewed", False)),
+        "confidence_score": float(annotation.get("confidence_score", 0) or 0),
+        "validation_score": float(annotation.get("validation_score", 0) or 0),
+        "invalid_entities": invalid_entities,
+        "entity_count": len(entities),
+        "entity_types": entity_types,
+        "model_name": annotation.get("model_name", "") or "",
+        "version": int(annotation.get("version", 0) or 0)
+    }
+
+def summarize_correction(correction: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the fields of a correction record needed for indexing"""
+    correction = expand_correction(correction)
+    return {
+        "_id": correction.get("_id"),
+        "document_id": str(correction.get("document_id")),
+        "timestamp": timestamp_to_epoch(correction.get("correction_timestamp")),
+        "original_confidence": float(correction.get("original_confidence", 0) or 0),
+        # Corrections whose original entities live in the version history record the flag
+        "entities_changed": correction["entities_changed"] if "entities_changed" in correction else
+                            correction.get("original_entities", []) != correction.get("corrected_entities", [])
+    }
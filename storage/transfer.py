@@ -0,0 +1,556 @@
+# storage/transfer.py
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Callable
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for Parquet files
+    pa = pq = None
+
+from .write_behind import atomic_write
+
+# Stores assign versions on save, so they are left out of checksums; any other
+# difference between a source record and what the destination holds is a mismatch
+VOLATILE_FIELDS = ("version",)
+CHECKSUM_MODULUS = 1 << 128
+
+# Parquet transfer files keep each record whole as JSON, next to a few columns for filtering
+PARQUET_FIELDS = [("_id", "string"), ("timestamp", "string"), ("version", "int64"), ("record", "string")]
+
+def default_workers() -> int:
+    """One worker per CPU besides the one the main process reads and writes on"""
+    return max((os.cpu_count() or 1) - 1, 0)
+
+def record_checksum(record: Dict[str, Any]) -> Tuple[int, int]:
+    """(128-bit checksum, JSON size) of a record's content, independent of key order"""
+    content = {key: value for key, value in record.items() if key not in VOLATILE_FIELDS}
+    data = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=16).digest(), "big"), len(data)
+
+def prepare_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Give a record the ID and timestamp a store would otherwise assign on save,
+    so a resumed import saves it under the same ID and its checksum holds
+    """
+    if "_id" not in record:
+        record["_id"] = str(uuid.uuid4())
+    if "timestamp" not in record:
+        record["timestamp"] = datetime.now().isoformat()
+    return record
+
+# Batch steps run in worker processes; they are module functions so they can be pickled
+
+def decode_json_lines(lines: List[Any]) -> List[Dict[str, Any]]:
+    return [prepare_record(json.loads(line)) for line in lines if line.strip()]
+
+def decode_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [prepare_record(record) for record in records]
+
+def encode_json_lines(records: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(record, separators=(",", ":"), default=str) + "\n"
+                   for record in records).encode("utf-8")
+
+def encode_parquet_columns(records: List[Dict[str, Any]]) -> Dict[str, list]:
+    return {
+        "_id": [str(record["_id"]) for record in records],
+        "timestamp": [str(record["timestamp"]) for record in records],
+        "version": [int(record.get("version", 0) or 0) for record in records],
+        "record": [json.dumps(record, separators=(",", ":"), default=str) for record in records]
+    }
+
+def process_batch(payload: Any, decode: Callable, encode: Optional[Callable],
+                  keep_records: bool) -> Dict[str, Any]:
+    """Decode a source batch, checksum its records and encode them for the sink"""
+    records = decode(payload)
+    checksum = size = 0
+    for record in records:
+        record_sum, record_size = record_checksum(record)
+        checksum += record_sum
+        size += record_size
+    return {
+        "count": len(records),
+        "checksum": checksum % CHECKSUM_MODULUS,
+        "bytes": size,
+        "records": records if keep_records else None,
+        "encoded": encode(records) if encode is not None else None
+    }
+
+def process_batches(source, position: Optional[Dict[str, Any]], encode: Optional[Callable],
+                    keep_records: bool, pool=None, window: int = 2) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """(processed batch, source position after it) in source order, with up to `window` batches in the pool"""
+    pending = deque()
+    for payload, batch_position in source.batches(position):
+        arguments = (payload, source.decode, encode, keep_records)
+        if pool is None:
+            yield process_batch(*arguments), batch_position
+            continue
+        # Reading stays only a few batches ahead of writing, so memory use is bounded
+        pending.append((pool.apply_async(process_batch, arguments), batch_position))
+        if len(pending) >= window:
+            job, job_position = pending.popleft()
+            yield job.get(), job_position
+    while pending:
+        job, job_position = pending.popleft()
+        yield job.get(), job_position
+
+class JSONLSource:
+    """Annotations from a JSON lines file (optionally gzipped), one record per line"""
+
+    decode = staticmethod(decode_json_lines)
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        self.path = Path(path)
+        self.batch_size = batch_size
+
+    def _open(self):
+        return gzip.open(self.path, "rb") if self.path.suffix == ".gz" else open(self.path, "rb")
+
+    def batches(self, position: Optional[Dict[str, Any]]) -> Iterator[Tuple[List[bytes], Dict[str, Any]]]:
+        """(raw lines, position after them); resumes at a byte offset"""
+        offset = position["offset"] if position else 0
+        with self._open() as f:
+            f.seek(offset)
+            lines = []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # A partial last line, e.g. from an export still being written
+                lines.append(line)
+                offset += len(line)
+                if len(lines) >= self.batch_size:
+                    yield lines, {"offset": offset}
+                    lines = []
+            if lines:
+                yield lines, {"offset": offset}
+
+    def close(self):
+        pass
+
+class ParquetSource:
+    """
+    Annotations from a Parquet file or a directory of them: either transfer files
+    with a JSON "record" column, or tables whose rows are the annotations
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        if pq is None:
+            raise ImportError("Reading Parquet requires pyarrow (pip install pyarrow)")
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.files = sorted(self.path.glob("*.parquet")) if self.path.is_dir() else [self.path]
+        self.decode = decode_records
+
+    def batches(self, position: Optional[Dict[str, Any]]) -> Iterator[Tuple[List[Any], Dict[str, Any]]]:
+        """(rows, position after them); resumes at a (file, row) position"""
+        start_file, start_row = (position["file"], position["row"]) if position else (0, 0)
+        for file_number, path in enumerate(self.files[start_file:], start_file):
+            parquet_file = pq.ParquetFile(path)
+            has_record = "record" in parquet_file.schema_arrow.names
+            columns = ["record"] if has_record else None
+            row = 0
+            for batch in parquet_file.iter_batches(batch_size=self.batch_size, columns=columns):
+                row += batch.num_rows
+                if file_number == start_file and row <= start_row:
+                    continue
+                self.decode = decode_json_lines if has_record else decode_records
+                payload = batch.column("record").to_pylist() if has_record else batch.to_pylist()
+                yield payload, {"file": file_number, "row": row}
+
+    def close(self):
+        pass
+
+class StoreSource:
+    """
+    Annotations from any store, in ID order so a transfer can resume after an ID.
+    Only current annotations are read; corrections and version history stay behind.
+    """
+
+    decode = staticmethod(decode_records)
+
+    def __init__(self, store, batch_size: int = 1000):
+        self.store = store
+        self.batch_size = batch_size
+
+    def batches(self, position: Optional[Dict[str, Any]]) -> Iterator[Tuple[List[Dict], Dict[str, Any]]]:
+        after = position["after"] if position else None
+        # Stores that can stream annotations in ID order do so; the rest are read by ID
+        if hasattr(self.store, "iter_annotations"):
+            annotations = self.store.iter_annotations(after, self.batch_size)
+        else:
+            # iter_summaries may only cover a store's hot tier
+            document_ids = sorted(str(summary["_id"]) for summary in self.store.iter_summaries())
+            annotations = (self.store.find_by_id(document_id) for document_id in document_ids
+                           if after is None or document_id > after)
+
+        batch = []
+        for annotation in annotations:
+            if annotation is None:
+                continue
+            batch.append(annotation)
+            if len(batch) >= self.batch_size:
+                yield batch, {"after": str(batch[-1]["_id"])}
+                batch = []
+        if batch:
+            yield batch, {"after": str(batch[-1]["_id"])}
+
+    def close(self):
+        if hasattr(self.store, "close"):
+            self.store.close()
+
+class JSONLSink:
+    """Appends records to a JSON lines file"""
+
+    encode = staticmethod(encode_json_lines)
+    keep_records = False
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        if self.path.suffix == ".gz":
+            raise ValueError("Gzipped JSON lines can be read but not written; use a .jsonl destination")
+        self._file = None
+
+    def open(self, position: Optional[Dict[str, Any]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+        # Lines written after the last checkpoint are written again
+        self._file.truncate(position["offset"] if position else 0)
+        self._file.seek(0, os.SEEK_END)
+
+    def write(self, result: Dict[str, Any]):
+        self._file.write(result["encoded"])
+
+    def commit(self) -> Dict[str, Any]:
+        """Make everything written durable; returns the position to resume from"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"offset": self._file.tell()}
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+class ParquetSink:
+    """Writes each batch as one Parquet transfer file in a directory"""
+
+    encode = staticmethod(encode_parquet_columns)
+    keep_records = False
+
+    def __init__(self, path: str):
+        if pa is None:
+            raise ImportError("Writing Parquet requires pyarrow (pip install pyarrow)")
+        self.directory = Path(path)
+        self.schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in PARQUET_FIELDS])
+        self.part = 0
+
+    def open(self, position: Optional[Dict[str, Any]]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.part = position["part"] if position else 0
+        # Parts written after the last checkpoint are written again
+        for path in self.directory.glob("part-*.parquet"):
+            if int(path.stem.split("-")[1]) >= self.part:
+                path.unlink()
+
+    def write(self, result: Dict[str, Any]):
+        table = pa.Table.from_pydict(result["encoded"], schema=self.schema)
+        tmp_path = self.directory / f".part-{self.part:08d}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        tmp_path.replace(self.directory / f"part-{self.part:08d}.parquet")
+        self.part += 1
+
+    def commit(self) -> Dict[str, Any]:
+        return {"part": self.part}
+
+    def close(self):
+        pass
+
+class StoreSink:
+    """Saves records into any store, in batches where the store supports it"""
+
+    encode = None
+    keep_records = True
+
+    def __init__(self, store, sync: bool = False, object_ids: bool = False):
+        """
+        Args:
+            store: Destination store
+            sync: Make files durable with one sync per checkpoint, for stores opened without fsync
+            object_ids: Save IDs that are valid ObjectId strings as ObjectIds, as MongoDB
+                stores assign them; otherwise every ID is saved as a string
+        """
+        self.store = store
+        self.sync = sync
+        self.object_ids = object_ids
+
+    def open(self, position: Optional[Dict[str, Any]]):
+        pass
+
+    def _convert_id(self, record: Dict[str, Any]):
+        document_id = record["_id"]
+        if self.object_ids:
+            from bson import ObjectId
+            if isinstance(document_id, str) and ObjectId.is_valid(document_id):
+                record["_id"] = ObjectId(document_id)
+        elif not isinstance(document_id, str):
+            record["_id"] = str(document_id)
+
+    def write(self, result: Dict[str, Any]):
+        for record in result["records"]:
+            self._convert_id(record)
+        # Saving again after an interruption replaces the records under the same IDs
+        if hasattr(self.store, "save_annotations"):
+            self.store.save_annotations(result["records"])
+        else:
+            for record in result["records"]:
+                self.store.save_annotation(record)
+
+    def commit(self) -> Dict[str, Any]:
+        if hasattr(self.store, "flush"):
+            self.store.flush()
+        if self.sync:
+            os.sync()
+        return {}
+
+    def close(self):
+        if hasattr(self.store, "close"):
+            self.store.close()
+
+def open_store(location: str, destination: bool = False):
+    """
+    Store for a location: filestore:DIR, memory:DIR, sqlite:DIR, segments:DIR or
+    mongodb://host:port/database
+    """
+    if location.startswith("mongodb://") or location.startswith("mongodb+srv://"):
+        from .annotation_store import AnnotationStore
+        database = location.rsplit("/", 1)[1].split("?")[0] if location.count("/") > 2 else ""
+        return AnnotationStore(location, db_name=database or "annotation_db")
+
+    kind, _, directory = location.partition(":")
+    if kind == "filestore":
+        from .file_store import FileStore
+        # Bulk loads commit writes in groups on a background thread and sync once per checkpoint
+        return FileStore(directory, write_behind=destination, fsync=not destination)
+    if kind == "memory":
+        from .file_store import FileStore
+        from .memory_store import MemoryStore
+        return MemoryStore(backing_store=FileStore(directory, write_behind=destination, fsync=not destination))
+    if kind == "sqlite":
+        from .sqlite_store import SQLiteStore
+        return SQLiteStore(directory)
+    if kind == "segments":
+        from .segment_store import SegmentStore
+        return SegmentStore(directory)
+    return None
+
+def open_source(location: str, batch_size: int = 1000):
+    """Source for a store location, a .jsonl[.gz] file or a .parquet file or directory"""
+    store = open_store(location)
+    if store is not None:
+        return StoreSource(store, batch_size)
+    if location.endswith(".jsonl") or location.endswith(".jsonl.gz"):
+        return JSONLSource(location, batch_size)
+    if location.endswith(".parquet") or Path(location).is_dir():
+        return ParquetSource(location, batch_size)
+    raise ValueError(f"Unknown source '{location}': expected a store location, .jsonl[.gz] or .parquet")
+
+def open_sink(location: str):
+    """Sink for a store location, a .jsonl file or a .parquet directory"""
+    store = open_store(location, destination=True)
+    if store is not None:
+        mongodb = location.startswith("mongodb")
+        return StoreSink(store, sync=not mongodb, object_ids=mongodb)
+    if location.endswith(".jsonl") or location.endswith(".jsonl.gz"):
+        return JSONLSink(location)
+    if location.endswith(".parquet"):
+        return ParquetSink(location)
+    raise ValueError(f"Unknown destination '{location}': expected a store location, .jsonl or .parquet")
+
+class BulkTransfer:
+    """
+    Streams annotations from a source to a sink in batches.
+
+    Batches are decoded, checksummed and encoded in a pool of worker processes
+    while the main process reads the next batches and writes finished ones in
+    order. A checkpoint file records how far the sink is durable, so an
+    interrupted transfer resumes from there; batches after the checkpoint
+    are written again.
+    """
+
+    def __init__(self, source, sink, checkpoint_path: str, workers: Optional[int] = None,
+                 checkpoint_interval: int = 10, report_interval: Optional[float] = 10.0,
+                 source_name: str = "", destination_name: str = ""):
+        """
+        Initialize the transfer
+
+        Args:
+            source: JSONLSource, ParquetSource or StoreSource
+            sink: JSONLSink, ParquetSink or StoreSink
+            checkpoint_path: Where progress is recorded for resuming
+            workers: Worker processes (default: default_workers(); 0 processes batches inline)
+            checkpoint_interval: Batches written between checkpoints
+            report_interval: Seconds between progress lines (None for quiet)
+        """
+        self.source = source
+        self.sink = sink
+        self.checkpoint_path = Path(checkpoint_path)
+        self.workers = default_workers() if workers is None else workers
+        self.checkpoint_interval = checkpoint_interval
+        self.report_interval = report_interval
+        self.source_name = source_name
+        self.destination_name = destination_name
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return {"source": self.source_name, "destination": self.destination_name, "records": 0,
+                    "bytes": 0, "checksum": "0", "source_position": None, "sink_position": None,
+                    "finished": False}
+        if (checkpoint["source"], checkpoint["destination"]) != (self.source_name, self.destination_name):
+            raise ValueError(f"Checkpoint {self.checkpoint_path} is for a transfer from {checkpoint['source']} "
+                             f"to {checkpoint['destination']}; remove it or use another checkpoint path")
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        checkpoint["sink_position"] = self.sink.commit()
+        atomic_write(self.checkpoint_path, json.dumps(checkpoint), fsync=True)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Transfer everything not yet transferred
+
+        Returns:
+            {"records", "bytes", "checksum", "seconds", "records_per_second",
+             "resumed_from"} with records, bytes and checksum covering the whole transfer
+        """
+        checkpoint = self._load_checkpoint()
+        resumed_from = checkpoint["records"]
+        if checkpoint["finished"]:
+            return self._result(checkpoint, resumed_from, 0.0)
+
+        self.sink.open(checkpoint["sink_position"])
+        resumed = (checkpoint["records"], checkpoint["bytes"])
+        checksum = int(checkpoint["checksum"], 16)
+        start = last_report = time.perf_counter()
+        pool = multiprocessing.Pool(self.workers) if self.workers > 0 else None
+        unsaved = 0
+
+        try:
+            # Two batches per worker keep every worker busy while the previous ones are written
+            for result, position in process_batches(self.source, checkpoint["source_position"], self.sink.encode,
+                                                    self.sink.keep_records, pool, 2 * self.workers):
+                if result["count"]:
+                    self.sink.write(result)
+                checksum = (checksum + result["checksum"]) % CHECKSUM_MODULUS
+                checkpoint["records"] += result["count"]
+                checkpoint["bytes"] += result["bytes"]
+                checkpoint["checksum"] = format(checksum, "x")
+                checkpoint["source_position"] = position
+                unsaved += 1
+                if unsaved >= self.checkpoint_interval:
+                    self._save_checkpoint(checkpoint)
+                    unsaved = 0
+                now = time.perf_counter()
+                if self.report_interval is not None and now - last_report >= self.report_interval:
+                    self._report(checkpoint, resumed, now - start)
+                    last_report = now
+
+            checkpoint["finished"] = True
+            self._save_checkpoint(checkpoint)
+        finally:
+            if pool is not None:
+                pool.terminate()
+            self.sink.close()
+            self.source.close()
+
+        result = self._result(checkpoint, resumed_from, time.perf_counter() - start)
+        if self.report_interval is not None:
+            self._report(checkpoint, resumed, result["seconds"])
+        return result
+
+    def _result(self, checkpoint: Dict[str, Any], resumed_from: int, seconds: float) -> Dict[str, Any]:
+        transferred = checkpoint["records"] - resumed_from
+        return {
+            "records": checkpoint["records"],
+            "bytes": checkpoint["bytes"],
+            "checksum": checkpoint["checksum"],
+            "seconds": seconds,
+            "records_per_second": transferred / seconds if seconds > 0 else 0,
+            "resumed_from": resumed_from
+        }
+
+    def _report(self, checkpoint: Dict[str, Any], resumed: Tuple[int, int], seconds: float):
+        """Progress and throughput since this run started"""
+        seconds = max(seconds, 1e-9)
+        rate = (checkpoint["records"] - resumed[0]) / seconds
+        megabytes = (checkpoint["bytes"] - resumed[1]) / 1e6 / seconds
+        print(f"{checkpoint['records']:,} records, {rate:,.0f} records/s, {megabytes:,.1f} MB/s", file=sys.stderr)
+
+def checksum_location(location: str, batch_size: int = 1000, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Record count and combined checksum of everything at a location, e.g. to verify a transfer"""
+    source = open_source(location, batch_size)
+    workers = default_workers() if workers is None else workers
+    pool = multiprocessing.Pool(workers) if workers > 0 else None
+    records = checksum = 0
+    try:
+        for result, _ in process_batches(source, None, None, False, pool, 2 * workers):
+            records += result["count"]
+            checksum = (checksum + result["checksum"]) % CHECKSUM_MODULUS
+    finally:
+        if pool is not None:
+            pool.terminate()
+        source.close()
+    return {"records": records, "checksum": format(checksum, "x")}
+
+if __name__ == "__main__":
+    # Run as: python -m storage.transfer SOURCE DESTINATION [--verify]
+    # e.g. python -m storage.transfer filestore:data annotations.jsonl
+    #      python -m storage.transfer annotations.jsonl mongodb://localhost:27017/annotation_db
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Copy annotations between stores and JSONL/Parquet files",
+        epilog="Only current annotations are copied, from both the hot tier and the archive of "
+               "a file store. Review corrections and version history are not transferred.")
+    parser.add_argument("source", help="filestore:DIR, memory:DIR, sqlite:DIR, segments:DIR, "
+                                       "mongodb://..., FILE.jsonl[.gz] or PATH.parquet")
+    parser.add_argument("destination", help="a store location, FILE.jsonl or DIR.parquet")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPUs - 1)")
+    parser.add_argument("--checkpoint", help="Progress file for resuming (default: transfer-<hash>.json)")
+    parser.add_argument("--checkpoint-interval", type=int, default=10, help="Batches between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--verify", action="store_true",
+                        help="Re-read the destination and compare its checksum (expects it held nothing else)")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or \
+        f"transfer-{hashlib.md5((args.source + chr(0) + args.destination).encode()).hexdigest()[:12]}.json"
+    if args.restart:
+        Path(checkpoint).unlink(missing_ok=True)
+
+    transfer = BulkTransfer(open_source(args.source, args.batch_size), open_sink(args.destination),
+                            checkpoint, args.workers, args.checkpoint_interval,
+                            source_name=args.source, destination_name=args.destination)
+    result = transfer.run()
+    print(f"Transferred {result['records']:,} records ({result['bytes'] / 1e6:,.1f} MB) "
+          f"in {result['seconds']:.1f}s, {result['records_per_second']:,.0f} records/s, "
+          f"checksum {result['checksum']}")
+
+    if args.verify:
+        verified = checksum_location(args.destination, args.batch_size, args.workers)
+        if (verified["records"], verified["checksum"]) != (result["records"], result["checksum"]):
+            print(f"Verification FAILED: destination has {verified['records']:,} records, "
+                  f"checksum {verified['checksum']}")
+            sys.exit(1)
+        print("Verified: destination checksum matches")
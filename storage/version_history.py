@@ -0,0 +1,120 @@
+# storage/version_history.py
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator
+
+from .entity_delta import diff_entities, apply_entity_delta
+from .layout import shard_of
+from .write_behind import atomic_write
+
+# A history entry restores one earlier version of a document from the version that
+# replaced it ("newer"): "set" and "unset" fields, and an entity delta. The current
+# record stays whole in annotations/, so new documents cost nothing here and each
+# update adds an entry about the size of its edit.
+
+def diff_versions(newer: Dict[str, Any], older: Dict[str, Any]) -> Dict[str, Any]:
+    """Reverse delta turning the newer record into the older one"""
+    delta = {}
+    changed = {key: value for key, value in older.items()
+               if key != "entities" and (key not in newer or newer[key] != value)}
+    removed = [key for key in newer if key not in older]
+    if changed:
+        delta["set"] = changed
+    if removed:
+        delta["unset"] = removed
+    if "entities" in older and newer.get("entities") != older["entities"]:
+        delta["entities"] = diff_entities(newer.get("entities", []), older["entities"])
+    return delta
+
+def apply_version_delta(newer: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the older record from the newer one and a reverse delta"""
+    unset = set(delta.get("unset", ()))
+    older = {key: value for key, value in newer.items() if key not in unset}
+    older.update(delta.get("set", {}))
+    if "entities" in delta:
+        older["entities"] = apply_entity_delta(newer.get("entities", []), delta["entities"])
+    return older
+
+class VersionHistory:
+    """Per-document chains of earlier annotation versions, one JSON line per version"""
+
+    def __init__(self, directory: Path, writer=None):
+        self.directory = Path(directory)
+        self.writer = writer
+        self._shard_dirs = set()
+
+    def path(self, document_id: str) -> Path:
+        return self.directory / shard_of(document_id) / f"{document_id}.jsonl"
+
+    def append(self, previous: Dict[str, Any], record: Dict[str, Any], superseded: float):
+        """Keep the previous record of a document as a delta from the record replacing it"""
+        entry = {"version": previous.get("version", 0), "newer": record.get("version", 0),
+                 "superseded": superseded}
+        entry.update(diff_versions(record, previous))
+
+        path = self.path(record["_id"])
+        if path.parent not in self._shard_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._shard_dirs.add(path.parent)
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        if self.writer is not None:
+            self.writer.append_line(path, line)
+        else:
+            with open(path, "a") as f:
+                f.write(line)
+
+    def entries(self, document_id: str) -> List[Dict[str, Any]]:
+        """History entries of a document, oldest first; flush the writer before reading"""
+        try:
+            with open(self.path(document_id), "r") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def iter_versions(self, current: Dict[str, Any],
+                      entries: Optional[List[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+        """Records of a document from the current one back to the oldest kept version"""
+        if entries is None:
+            entries = self.entries(current["_id"])
+        record = current
+        yield record
+        for entry in reversed(entries):
+            # A save made without history breaks the chain; older versions are lost
+            if entry["newer"] != record.get("version", 0):
+                return
+            record = apply_version_delta(record, entry)
+            yield record
+
+    def get(self, current: Dict[str, Any], version: int) -> Optional[Dict[str, Any]]:
+        """A given version of a document, or None if it isn't kept"""
+        for record in self.iter_versions(current):
+            if record.get("version", 0) == version:
+                return record
+        return None
+
+    def as_of(self, current: Dict[str, Any], timestamp: float) -> Dict[str, Any]:
+        """The oldest kept version not yet superseded at a time (epoch seconds)"""
+        entries = self.entries(current["_id"])
+        versions = self.iter_versions(current, entries)
+        found = next(versions)
+        for entry, record in zip(reversed(entries), versions):
+            if entry["superseded"] <= timestamp:
+                break
+            found = record
+        return found
+
+    def truncate(self, document_id: str, entries: List[Dict[str, Any]], keep: int):
+        """Drop all but the newest `keep` entries of a document"""
+        path = self.path(document_id)
+        if keep <= 0:
+            path.unlink(missing_ok=True)
+            return
+        data = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries[-keep:])
+        atomic_write(path, data)
+
+    def document_ids(self) -> Iterator[str]:
+        """Documents with at least one earlier version kept"""
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob("*/*.jsonl"):
+            yield path.stem
@@ -0,0 +1,197 @@
+# storage/write_behind.py
+import os
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Dict, Optional, Callable
+
+def atomic_write(path: Path, data, fsync: bool = False):
+    """Replace a file with new contents (str or bytes) so readers never see a partial write"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    tmp_path.replace(path)
+
+def _fsync_directory(directory: Path):
+    """Make renames in a directory durable"""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class WriteBehindWriter:
+    """Background thread that group-commits file replacements and log appends"""
+
+    def __init__(self, fsync: bool = True, max_batch: int = 512, max_delay: float = 0.01, lock=None):
+        """
+        Initialize and start the writer thread.
+
+        Args:
+            fsync: Make each batch durable before it is reported as flushed
+            max_batch: Pending file writes that start a batch without waiting out max_delay
+            max_delay: Seconds to wait for more writes before committing a batch
+            lock: Optional lock held while appending log lines (e.g. a FileLock)
+        """
+        self.fsync = fsync
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.lock = lock
+
+        # Latest contents per path; a path rewritten before commit is written once
+        self._pending_files = {}
+        self._pending_appends = defaultdict(list)
+        self._pending_callbacks = []
+        self._submitted = 0
+        self._committed = 0
+        self._error = None
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write_file(self, path: Path, data: str):
+        """Queue a full replacement of a file"""
+        with self._cond:
+            self._check_open()
+            self._pending_files[Path(path)] = data
+            self._submitted += 1
+            self._cond.notify_all()
+
+    def append_line(self, path: Path, line: str):
+        """Queue a line to append to a log file after the batch's file writes"""
+        with self._cond:
+            self._check_open()
+            self._pending_appends[Path(path)].append(line)
+            self._submitted += 1
+            self._cond.notify_all()
+
+    def append_callback(self, callback: Callable[[], None], sync: Optional[Callable[[], None]] = None):
+        """
+        Queue a function to run under the lock once the batch's appends are written.
+
+        sync, e.g. an fsync of the file the callback appends to, runs once per batch
+        after all of its callbacks, if the writer syncs.
+        """
+        with self._cond:
+            self._check_open()
+            self._pending_callbacks.append((callback, sync))
+            self._submitted += 1
+            self._cond.notify_all()
+
+    def pending_file(self, path: Path) -> Optional[str]:
+        """Contents queued for a file that may not be on disk yet"""
+        with self._cond:
+            return self._pending_files.get(Path(path))
+
+    def idle(self) -> bool:
+        """Whether every queued write has been committed"""
+        with self._cond:
+            return self._committed >= self._submitted
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every write queued before this call has been committed"""
+        with self._cond:
+            target = self._submitted
+            self._cond.notify_all()
+            if not self._cond.wait_for(lambda: self._committed >= target or self._error is not None,
+                                       timeout=timeout):
+                raise TimeoutError(f"Write-behind flush timed out with {target - self._committed} writes pending")
+            if self._error is not None:
+                raise self._error
+
+    def close(self):
+        """Commit outstanding writes and stop the writer thread"""
+        if self._closed:
+            return
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _check_open(self):
+        if self._closed:
+            raise ValueError("Write-behind writer is closed")
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._submitted > self._committed or self._closed)
+                if self._closed and self._submitted == self._committed:
+                    return
+
+            # Give concurrent writers a moment to join this batch
+            if self.max_delay:
+                with self._cond:
+                    self._cond.wait_for(lambda: len(self._pending_files) >= self.max_batch,
+                                        timeout=self.max_delay)
+
+            # Everything queued so far goes in this batch, so appended log lines
+            # never reference files from a later batch
+            with self._cond:
+                files = dict(self._pending_files)
+                appends = self._pending_appends
+                self._pending_appends = defaultdict(list)
+                callbacks = self._pending_callbacks
+                self._pending_callbacks = []
+                target = self._submitted
+
+            try:
+                self._commit(files, appends, callbacks)
+            except OSError as e:
+                print(f"Write-behind commit failed: {e}")
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                # Keep entries that were rewritten while this batch was being committed
+                for path, data in files.items():
+                    if self._pending_files.get(path) is data:
+                        del self._pending_files[path]
+                self._committed = target
+                self._cond.notify_all()
+
+    def _commit(self, files: Dict[Path, str], appends: Dict[Path, List[str]],
+                callbacks: List[tuple] = ()):
+        """Write one batch: replace files, make the renames durable, append log lines, run callbacks"""
+        directories = set()
+        for path, data in files.items():
+            atomic_write(path, data, fsync=self.fsync)
+            directories.add(path.parent)
+
+        if self.fsync:
+            for directory in directories:
+                _fsync_directory(directory)
+
+        if not appends and not callbacks:
+            return
+        if self.lock is not None:
+            self.lock.acquire()
+        try:
+            for path, lines in appends.items():
+                with open(path, "a") as f:
+                    f.write("".join(lines))
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            syncs = []
+            for callback, sync in callbacks:
+                callback()
+                if sync is not None and sync not in syncs:
+                    syncs.append(sync)
+            if self.fsync:
+                for sync in syncs:
+                    sync()
+        finally:
+            if self.lock is not None:
+                self.lock.release()
@@ -0,0 +1,19 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Add the repository root to path to import from other modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """In-memory MongoDB client for store tests"""
+    mongomock = pytest.importorskip("mongomock")
+    # Recent pymongo passes sort= to bulk replaces, which mongomock doesn't accept yet
+    add_replace = mongomock.collection.BulkOperationBuilder.add_replace
+    monkeypatch.setattr(mongomock.collection.BulkOperationBuilder, "add_replace",
+                        lambda self, selector, doc, upsert, sort=None, **kwargs:
+                        add_replace(self, selector, doc, upsert, **kwargs))
+    return mongomock.MongoClient()
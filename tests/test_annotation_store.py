@@ -0,0 +1,125 @@
+# tests/test_annotation_store.py
+import pytest
+
+from storage.annotation_store import AnnotationStore
+from storage.errors import VersionConflictError
+
+@pytest.fixture
+def store(mongo_client):
+    return AnnotationStore(client=mongo_client)
+
+def make_annotation(**fields) -> dict:
+    annotation = {
+        "document": "Patient was given metoprolol.",
+        "entities": [{"type": "MED", "text": "metoprolol", "start": 18, "end": 28}],
+        "confidence_score": 0.9,
+        "needs_human_review": False,
+        "model_name": "test-model",
+        "timestamp": 1700000000.0
+    }
+    annotation.update(fields)
+    return annotation
+
+def test_save_annotation_bumps_the_stored_version(store):
+    document_id = store.save_annotation(make_annotation())
+    assert store.find_by_id(document_id)["version"] == 1
+
+    annotation = store.find_by_id(document_id)
+    store.save_annotation(annotation)
+    assert store.find_by_id(document_id)["version"] == 2
+
+    # A stale copy still lands one past what is stored
+    stale = dict(annotation, version=1)
+    store.save_annotation(stale)
+    assert store.find_by_id(document_id)["version"] == 3
+
+def test_review_against_a_resaved_annotation_conflicts(store):
+    document_id = store.save_annotation(make_annotation())
+    checked_out = store.find_by_id(document_id)["version"]
+
+    store.save_annotation(store.find_by_id(document_id))
+
+    with pytest.raises(VersionConflictError):
+        store.update_after_review(document_id, [], expected_version=checked_out)
+
+def test_save_annotation_upserts_documents_with_new_ids(store):
+    document_id = store.save_annotation(make_annotation(_id="imported-1"))
+
+    assert document_id == "imported-1"
+    assert store.find_by_id("imported-1")["version"] == 1
+
+def test_bulk_save_mixes_inserts_and_upserts(store):
+    existing_id = store.save_annotation(make_annotation())
+    existing = store.find_by_id(existing_id)
+    existing["confidence_score"] = 0.5
+
+    document_ids = store.save_annotations([make_annotation(), existing, make_annotation(_id="imported-2")])
+
+    assert document_ids[1:] == [existing_id, "imported-2"]
+    assert store.annotations.count_documents({}) == 3
+    assert store.find_by_id(existing_id)["confidence_score"] == 0.5
+    assert store.find_by_id(existing_id)["version"] == 2
+    assert store.find_by_id(document_ids[0])["version"] == 1
+
+def test_review_is_a_single_round_trip(store, monkeypatch):
+    document_id = store.save_annotation(make_annotation())
+    calls, depth = [], [0]
+    def counted(name, method):
+        def call(*args, **kwargs):
+            # Only count operations the store issues, not mongomock's internal calls
+            if not depth[0]:
+                calls.append(name)
+            depth[0] += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+        return call
+    for name in ("find_one", "find", "update_one", "replace_one", "find_one_and_update"):
+        monkeypatch.setattr(store.annotations, name, counted(name, getattr(store.annotations, name)))
+
+    store.update_after_review(document_id, [], expected_version=1)
+
+    assert calls == ["find_one_and_update"]
+    monkeypatch.undo()
+    reviewed = store.find_by_id(document_id)
+    assert reviewed["human_reviewed"] and reviewed["version"] == 2
+    correction = store.get_corrections_for_document(document_id)[0]
+    assert correction["original_entities"][0]["text"] == "metoprolol"
+    assert correction["corrected_entities"] == []
+
+def test_review_of_a_missing_document_is_not_a_conflict(store):
+    with pytest.raises(ValueError, match="not found"):
+        store.update_after_review("000000000000000000000000", [], expected_version=1)
+
+def test_version_conflict_leaves_the_document_unchanged(store):
+    document_id = store.save_annotation(make_annotation())
+
+    with pytest.raises(VersionConflictError) as conflict:
+        store.update_after_review(document_id, [], expected_version=3)
+
+    assert conflict.value.actual_version == 1
+    assert not store.find_by_id(document_id).get("human_reviewed")
+    assert store.get_corrections_for_document(document_id) == []
+
+def test_string_ids_can_be_found_reviewed_and_corrected(store):
+    # Hex strings that look like ObjectIds, e.g. from a JSONL import
+    store.save_annotations([make_annotation(_id="plain-id"),
+                            make_annotation(_id="65a1f0c2e4b0a1b2c3d4e5f6")])
+
+    for document_id in ("plain-id", "65a1f0c2e4b0a1b2c3d4e5f6"):
+        assert store.find_by_id(document_id)["_id"] == document_id
+        store.update_after_review(document_id, [], expected_version=1)
+        assert len(store.get_corrections_for_document(document_id)) == 1
+
+def test_projections_limit_the_returned_fields(store):
+    document_id = store.save_annotation(make_annotation(needs_human_review=True))
+    store.update_after_review(document_id, [])
+
+    assert set(store.find_by_id(document_id, {"version": 1})) == {"_id", "version"}
+    assert set(store.find_by_review_status(True, projection={"model_name": 1})[0]) == {"_id", "model_name"}
+    assert set(store.get_corrections(projection={"document_id": 1})[0]) == {"_id", "document_id"}
+
+    item = store.query(projection=["confidence_score", "entity_types", "invalid_entities"])["items"][0]
+    assert item == {"_id": item["_id"], "confidence_score": 0.9, "entity_types": {},
+                    "invalid_entities": 0}
@@ -0,0 +1,57 @@
+# tests/test_archive.py
+import pytest
+
+from storage.errors import MissingSegmentError
+from storage.file_store import FileStore
+from storage.retention import RetentionPolicy
+
+ARCHIVE_ALL = RetentionPolicy(max_hot_annotations=0, keep_pending_review=False)
+
+def make_store(path, count: int = 3):
+    store = FileStore(str(path), refresh_interval=None)
+    document_ids = [store.save_annotation({"document": f"Note {i}: aspirin.", "timestamp": 1700000000.0 + i,
+                                           "entities": []}) for i in range(count)]
+    return store, document_ids
+
+def segment_files(store):
+    return sorted(path.name for path in store._archive.segments_dir.iterdir())
+
+def test_segment_is_deleted_once_every_annotation_left_it(tmp_path):
+    store, document_ids = make_store(tmp_path)
+    assert store.apply_retention(ARCHIVE_ALL)["segments"] == 1
+    [segment] = segment_files(store)
+
+    for document_id in document_ids[:-1]:
+        store.save_annotation(store.find_by_id(document_id))
+        assert segment_files(store) == [segment]
+
+    # Saving the last archived annotation back to the hot tier empties the segment
+    store.save_annotation(store.find_by_id(document_ids[-1]))
+    assert segment_files(store) == []
+    assert store.get_statistics()["archived_annotations"] == 0
+    assert all(store.find_by_id(document_id)["version"] == 2 for document_id in document_ids)
+    store.close()
+
+def test_retention_deletes_unreferenced_segment_files(tmp_path):
+    store, _ = make_store(tmp_path)
+    store.apply_retention(ARCHIVE_ALL)
+    [segment] = segment_files(store)
+
+    # Left behind by a crash before the catalog was updated
+    (store._archive.segments_dir / "1700000000-deadbeef.seg.zst").write_bytes(b"orphan")
+    (store._archive.segments_dir / ".1700000000-cafebabe.seg.zst.tmp").write_bytes(b"torn")
+
+    assert store.apply_retention(ARCHIVE_ALL)["segments_deleted"] == 2
+    assert segment_files(store) == [segment]
+    store.close()
+
+def test_missing_segment_raises(tmp_path):
+    store, document_ids = make_store(tmp_path, count=1)
+    store.apply_retention(ARCHIVE_ALL)
+    for path in store._archive.segments_dir.iterdir():
+        path.unlink()
+
+    with pytest.raises(MissingSegmentError) as missing:
+        store.find_by_id(document_ids[0])
+    assert missing.value.document_id == document_ids[0]
+    store.close()
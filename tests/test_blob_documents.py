@@ -0,0 +1,46 @@
+# tests/test_blob_documents.py
+import json
+
+from storage.file_store import FileStore
+
+ASPIRIN = [{"type": "MED", "text": "aspirin", "start": 0, "end": 7}]
+CORRECTED = [{"type": "MEDICATION", "text": "aspirin", "start": 0, "end": 7}]
+
+def stored_record(store, directory, record_id):
+    with open(store._layout.record_path(directory, record_id)) as f:
+        return json.load(f)
+
+def test_records_stay_expanded_by_default(tmp_path):
+    store = FileStore(str(tmp_path), refresh_interval=None)
+    document_id = store.save_annotation({"document": "Aspirin 81 mg daily.", "entities": ASPIRIN})
+    store.update_after_review(document_id, CORRECTED)
+    assert stored_record(store, store.annotations_dir, document_id)["document"] == "Aspirin 81 mg daily."
+    [correction_id] = store._manifest.corrections
+    assert stored_record(store, store.corrections_dir, correction_id)["corrected_entities"] == CORRECTED
+    assert store.get_storage_footprint()["blob_bytes"] == 0
+    store.close()
+    assert not (tmp_path / "blobs").exists()
+
+def test_expand_records_undoes_compact_storage(tmp_path):
+    store = FileStore(str(tmp_path), refresh_interval=None, compress_documents=True, compression="gzip",
+                      keep_history=True)
+    document_ids = [store.save_annotation({"document": f"Note {i}", "entities": ASPIRIN}) for i in range(3)]
+    store.update_after_review(document_ids[0], CORRECTED)
+    assert all("document_ref" in stored_record(store, store.annotations_dir, document_id)
+               for document_id in document_ids)
+    store.close()
+
+    store = FileStore(str(tmp_path), refresh_interval=None)
+    assert store.expand_records(batch_size=2) == {"annotations": 3, "corrections": 1}
+    records = [stored_record(store, store.annotations_dir, document_id) for document_id in document_ids]
+    assert [record["document"] for record in records] == ["Note 0", "Note 1", "Note 2"]
+    assert all("document_ref" not in record for record in records)
+    assert [record["version"] for record in records] == [2, 1, 1]
+
+    [correction_id] = store._manifest.corrections
+    correction = stored_record(store, store.corrections_dir, correction_id)
+    assert "corrected_delta" not in correction and correction["corrected_entities"] == CORRECTED
+    [read_back] = store.get_corrections_for_document(document_ids[0])
+    assert (read_back["original_entities"], read_back["corrected_entities"]) == (ASPIRIN, CORRECTED)
+    assert store.expand_records() == {"annotations": 0, "corrections": 0}
+    store.close()
@@ -0,0 +1,84 @@
+# tests/test_change_feed.py
+import os
+
+import pytest
+
+from storage.change_feed import ANNOTATION_SAVED, ANNOTATION_ARCHIVED
+from storage.file_store import FileStore
+from storage.retention import RetentionPolicy
+
+def test_feed_is_only_written_when_asked_for(tmp_path):
+    store = FileStore(str(tmp_path))
+    store.save_annotation({"document": "Aspirin.", "entities": []})
+    with pytest.raises(ValueError):
+        store.read_changes()
+    store.close()
+    assert not (tmp_path / "feed").exists()
+
+def test_store_with_a_feed_keeps_appending_to_it(tmp_path):
+    store = FileStore(str(tmp_path), change_feed=True)
+    first_id = store.save_annotation({"document": "Aspirin.", "entities": []})
+    store.close()
+
+    # Consumers must not miss saves made by stores opened without the option
+    store = FileStore(str(tmp_path))
+    second_id = store.save_annotation({"document": "Ibuprofen.", "entities": []})
+    assert [event["document_id"] for event in store.read_changes()] == [first_id, second_id]
+    store.close()
+
+def test_archiving_appends_an_event(tmp_path):
+    store = FileStore(str(tmp_path), change_feed=True, write_behind=True)
+    document_id = store.save_annotation({"document": "Aspirin.", "entities": []})
+    store.apply_retention(RetentionPolicy(max_hot_annotations=0, keep_pending_review=False))
+    store.flush()
+    assert [(event["type"], event["document_id"], event["version"]) for event in store.read_changes()] == \
+        [(ANNOTATION_SAVED, document_id, 1), (ANNOTATION_ARCHIVED, document_id, 1)]
+    store.close()
+
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_feed_segments_are_synced(tmp_path, monkeypatch, write_behind):
+    store = FileStore(str(tmp_path), change_feed=True, write_behind=write_behind)
+    synced = []
+    fsync = os.fsync
+    def recording_fsync(fd):
+        if store._feed._handle is not None and fd == store._feed._handle.fileno():
+            synced.append(fd)
+        fsync(fd)
+    monkeypatch.setattr(os, "fsync", recording_fsync)
+
+    store.save_annotations([{"document": f"Note {i}", "entities": []} for i in range(10)])
+    store.flush()
+    # Once per event without the writer, once per batch with it
+    assert 0 < len(synced) < 10 if write_behind else len(synced) == 10
+    assert store.last_change_sequence() == 10
+    store.close()
+
+def test_consumer_resumes_from_its_checkpoint(tmp_path):
+    store = FileStore(str(tmp_path), change_feed=True)
+    document_ids = [store.save_annotation({"document": f"Note {i}", "entities": []}) for i in range(5)]
+
+    consumer = store.change_consumer("exporter")
+    assert [event["document_id"] for event in consumer.poll(2)] == document_ids[:2]
+    consumer.commit()
+    assert len(consumer.poll(2)) == 2
+    assert consumer.lag() == 1
+
+    # Restarted before committing the second batch, the consumer gets it again
+    consumer = store.change_consumer("exporter")
+    assert consumer.position == 2
+    batches = consumer.batches(batch_size=2)
+    assert [event["seq"] for event in next(batches)] == [3, 4]
+    assert [event["seq"] for event in next(batches)] == [5]
+    assert store.change_consumer("exporter").position == 4
+    assert list(batches) == []
+    assert store.change_consumer("exporter").position == 5
+
+    # Consumers keep separate checkpoints, and seek(0) replays the feed
+    other = store.change_consumer("indexer")
+    assert other.lag() == 5
+    other.seek(3)
+    other.commit()
+    assert store.change_consumer("indexer").position == 3
+    with pytest.raises(ValueError):
+        store.change_consumer("../exporter")
+    store.close()
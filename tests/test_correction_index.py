@@ -0,0 +1,45 @@
+# tests/test_correction_index.py
+from storage.correction_index import CorrectionIndex
+from storage.file_store import FileStore
+
+ASPIRIN = [{"type": "MED", "text": "aspirin", "start": 0, "end": 7}]
+CORRECTED = [{"type": "MEDICATION", "text": "aspirin", "start": 0, "end": 7}]
+
+def test_lookups_by_document():
+    index = CorrectionIndex()
+    index.add("doc-1", "c-2", 1700000002.0)
+    index.add("doc-1", "c-1", 1700000001.0)
+    index.add("doc-1", "c-2", 1700000002.0)
+    index.add("doc-2", "c-3", 1700000003.0)
+
+    assert index.correction_ids("doc-1") == ["c-2", "c-1"]
+    # The earliest correction holds the entities from before any review
+    assert index.first("doc-1") == "c-1"
+    assert (index.first("doc-3"), index.correction_ids("doc-3")) == (None, [])
+    assert "doc-2" in index and "doc-3" not in index
+    assert len(index) == 2
+
+def test_index_is_rebuilt_on_open_and_refresh(tmp_path):
+    store = FileStore(str(tmp_path), refresh_interval=None)
+    document_id = store.save_annotation({"document": "Aspirin.", "entities": ASPIRIN, "needs_human_review": True})
+    store.update_after_review(document_id, CORRECTED)
+    store.update_after_review(document_id, [])
+    store.close()
+    (tmp_path / "index.snapshot").unlink(missing_ok=True)
+
+    store = FileStore(str(tmp_path), refresh_interval=None)
+    corrections = store.get_corrections_for_document(document_id)
+    assert [correction["corrected_entities"] for correction in corrections] == [CORRECTED, []]
+    assert store._correction_index.first(document_id) == corrections[0]["_id"]
+
+    # Reviews made by another process are indexed on refresh
+    other_id = store.save_annotation({"document": "Ibuprofen.", "entities": ASPIRIN})
+    other = FileStore(str(tmp_path))
+    other.update_after_review(other_id, CORRECTED)
+    other.close()
+    assert store.get_corrections_for_document(other_id) == []
+    store.refresh()
+    [correction] = store.get_corrections_for_document(other_id)
+    assert correction["original_entities"] == ASPIRIN
+    assert len(store._correction_index) == 2
+    store.close()
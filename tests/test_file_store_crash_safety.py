@@ -0,0 +1,131 @@
+# tests/test_file_store_crash_safety.py
+import threading
+
+import pytest
+
+from storage.file_store import FileStore
+from storage.write_behind import WriteBehindWriter
+
+def make_annotation(**fields) -> dict:
+    annotation = {
+        "document": "Patient was given aspirin 81 mg.",
+        "entities": [{"type": "MED", "text": "aspirin", "start": 18, "end": 25}],
+        "confidence_score": 0.9,
+        "timestamp": 1700000000.0
+    }
+    annotation.update(fields)
+    return annotation
+
+def open_store(path, **options) -> FileStore:
+    # refresh_interval=None: each instance only sees other writers on refresh()
+    return FileStore(str(path), refresh_interval=None, **options)
+
+def record_path(store: FileStore, document_id: str):
+    return store._layout.record_path(store.annotations_dir, document_id)
+
+def test_torn_temp_file_is_ignored(tmp_path):
+    store = open_store(tmp_path)
+    document_id = store.save_annotation(make_annotation())
+    store.close()
+
+    # A crash while writing the replacement leaves a partial temp file next to the record
+    path = record_path(store, document_id)
+    path.with_name(f".{path.name}.tmp").write_text('{"_id": "' + document_id + '", "entit')
+
+    reopened = open_store(tmp_path)
+    assert reopened.find_by_id(document_id)["version"] == 1
+    assert reopened.get_statistics()["total_annotations"] == 1
+    reopened.close()
+
+    # Rebuilding the manifest from the record files skips temp files too
+    (tmp_path / "manifest.tsv").unlink()
+    for snapshot in tmp_path.glob("*.snapshot"):
+        snapshot.unlink()
+    rebuilt = open_store(tmp_path)
+    assert [s["_id"] for s in rebuilt.iter_summaries()] == [document_id]
+    rebuilt.close()
+
+def test_crash_between_rename_and_manifest_append(tmp_path, monkeypatch):
+    store = open_store(tmp_path, write_behind=True, fsync=False)
+    kept_id = store.save_annotation(make_annotation())
+    store.flush()
+
+    # Files of the next batch are renamed into place, then the manifest append fails
+    commit = WriteBehindWriter._commit
+    def crash_after_rename(self, files, appends, callbacks=()):
+        commit(self, files, {}, ())
+        raise OSError("simulated crash before the manifest append")
+    monkeypatch.setattr(WriteBehindWriter, "_commit", crash_after_rename)
+
+    lost_id = store.save_annotation(make_annotation(confidence_score=0.2))
+    with pytest.raises(OSError):
+        store.flush()
+    assert record_path(store, lost_id).exists()
+    monkeypatch.setattr(WriteBehindWriter, "_commit", commit)
+
+    # The manifest never refers to the file of the unacknowledged save
+    reopened = open_store(tmp_path)
+    assert [s["_id"] for s in reopened.iter_summaries()] == [kept_id]
+    assert reopened.find_by_id(kept_id)["confidence_score"] == 0.9
+    assert reopened.get_statistics()["total_annotations"] == 1
+    reopened.close()
+
+def test_flush_is_a_barrier_for_other_processes(tmp_path):
+    writer = open_store(tmp_path, write_behind=True, fsync=False)
+    reader = open_store(tmp_path)
+
+    document_ids = [writer.save_annotation(make_annotation(confidence_score=i / 10)) for i in range(5)]
+    review_id = document_ids[0]
+    writer.update_after_review(review_id, [])
+    writer.flush()
+
+    # Everything queued before flush() is visible to a reader that wasn't told about it
+    reader.refresh()
+    assert sorted(s["_id"] for s in reader.iter_summaries()) == sorted(document_ids)
+    assert reader.find_by_id(review_id)["human_reviewed"]
+    assert len(reader.get_corrections_for_document(review_id)) == 1
+    for document_id in document_ids:
+        assert record_path(writer, document_id).exists()
+
+    writer.close()
+    reader.close()
+
+def test_manifest_rows_without_files_are_skipped(tmp_path):
+    store = open_store(tmp_path)
+    kept_id = store.save_annotation(make_annotation())
+    missing_id = store.save_annotation(make_annotation(confidence_score=0.3))
+    store.close()
+
+    # The manifest row outlived its file (e.g. the file was lost after a crash)
+    record_path(store, missing_id).unlink()
+
+    reopened = open_store(tmp_path)
+    assert reopened.find_by_id(missing_id) is None
+    assert reopened.find_by_id(kept_id) is not None
+    items = reopened.query()["items"]
+    assert [item["_id"] for item in items] == [kept_id]
+    reopened.close()
+
+def test_history_reads_under_the_store_lock_fail_fast(tmp_path):
+    store = open_store(tmp_path, write_behind=True, fsync=False, keep_history=True)
+    document_id = store.save_annotation(make_annotation())
+
+    with store._lock:
+        with pytest.raises(RuntimeError):
+            store.get_history(document_id)
+    assert [entry["version"] for entry in store.get_history(document_id)] == [1]
+    store.close()
+
+def test_version_is_bumped_under_the_lock(tmp_path):
+    store = open_store(tmp_path)
+    annotation = make_annotation()
+
+    with store._lock:
+        # Another writer holds the lock; the version must not change until it lets go
+        thread = threading.Thread(target=store.save_annotation, args=(annotation,))
+        thread.start()
+        thread.join(0.2)
+        assert "version" not in annotation
+    thread.join(5)
+    assert annotation["version"] == 1
+    store.close()
@@ -0,0 +1,41 @@
+# tests/test_file_store_statistics.py
+import threading
+
+from storage.file_store import FileStore
+
+def test_flush_waits_for_the_store_lock(tmp_path):
+    store = FileStore(str(tmp_path), write_behind=False)
+    store.save_annotation({"document": "Aspirin 81 mg.", "entities": [], "timestamp": 1700000000.0})
+
+    flushed = threading.Event()
+    with store._lock:
+        thread = threading.Thread(target=lambda: (store.flush(), flushed.set()))
+        thread.start()
+        # Statistics can't be written while another writer holds the lock
+        assert not flushed.wait(0.2)
+    thread.join(5)
+    assert flushed.is_set()
+
+    reopened = FileStore(str(tmp_path), write_behind=False)
+    assert reopened.get_statistics()["total_annotations"] == 1
+    reopened.close()
+    store.close()
+
+def test_recount_matches_running_statistics(tmp_path):
+    store = FileStore(str(tmp_path), write_behind=False)
+    for i in range(6):
+        store.save_annotation({
+            "document": f"Note {i}", "timestamp": 1700000000.0 + i, "model_name": f"model-{i % 2}",
+            "needs_human_review": i % 3 == 0, "confidence_score": 0.5,
+            "entities": [{"type": "MED", "text": "aspirin", "validation": {"valid": i % 2 == 0}},
+                         {"type": f"TYPE-{i % 3}", "text": "x"}]})
+    document_id = store.query()["items"][0]["_id"]
+    store.update_after_review(document_id, [])
+    running = store.get_statistics()
+    store.close()
+
+    (tmp_path / "stats.json").unlink()
+    (tmp_path / "index.snapshot").unlink(missing_ok=True)
+    reopened = FileStore(str(tmp_path), write_behind=False)
+    assert reopened.get_statistics() == running
+    reopened.close()
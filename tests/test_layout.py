@@ -0,0 +1,53 @@
+# tests/test_layout.py
+from storage.file_store import FileStore
+from storage.layout import FLAT, SHARDED
+from storage.migrate_layout import migrate_to_flat, migrate_to_sharded
+
+def save_notes(store, count: int = 3):
+    return [store.save_annotation({"document": f"Note {i}", "entities": []}) for i in range(count)]
+
+def record_files(path):
+    annotations_dir = path / "annotations"
+    return sorted(str(file_path.relative_to(annotations_dir)) for file_path in annotations_dir.rglob("*.json"))
+
+def test_new_stores_are_flat_unless_sharding_is_asked_for(tmp_path):
+    store = FileStore(str(tmp_path / "flat"), refresh_interval=None)
+    document_ids = save_notes(store)
+    assert store._layout.mode == FLAT
+    assert record_files(tmp_path / "flat") == sorted(f"{document_id}.json" for document_id in document_ids)
+    store.close()
+
+    store = FileStore(str(tmp_path / "sharded"), refresh_interval=None, sharded_layout=True)
+    save_notes(store)
+    assert store._layout.mode == SHARDED
+    assert all("/" in name for name in record_files(tmp_path / "sharded"))
+    store.close()
+
+def test_existing_flat_store_stays_flat(tmp_path):
+    save_notes(FileStore(str(tmp_path), refresh_interval=None))
+    store = FileStore(str(tmp_path), refresh_interval=None, sharded_layout=True)
+    assert store._layout.mode == FLAT
+    store.close()
+
+def test_sharded_store_migrates_back_to_flat(tmp_path):
+    store = FileStore(str(tmp_path), refresh_interval=None)
+    document_ids = save_notes(store, 5)
+    store.close()
+
+    assert migrate_to_sharded(str(tmp_path), batch_size=2)["moved"] == 5
+    store = FileStore(str(tmp_path), refresh_interval=None)
+    assert store._layout.mode == SHARDED
+    # Written sharded while the flat copies are moved back
+    store.save_annotation(store.find_by_id(document_ids[0]))
+
+    assert migrate_to_flat(str(tmp_path), batch_size=2)["moved"] == 5
+    assert record_files(tmp_path) == sorted(f"{document_id}.json" for document_id in document_ids)
+    store.refresh()
+    store.save_annotation(store.find_by_id(document_ids[1]))
+    assert record_files(tmp_path) == sorted(f"{document_id}.json" for document_id in document_ids)
+    store.close()
+
+    store = FileStore(str(tmp_path), refresh_interval=None)
+    assert store._layout.mode == FLAT
+    assert [store.find_by_id(document_id)["version"] for document_id in document_ids[:2]] == [2, 2]
+    store.close()
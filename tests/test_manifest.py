@@ -0,0 +1,51 @@
+# tests/test_manifest.py
+from storage.file_store import FileStore
+from storage.manifest import Manifest, A_MODEL, A_VERSION
+from storage.summary import summarize_annotation
+
+def summary(version: int, model_name: str) -> dict:
+    return summarize_annotation({"_id": "doc-1", "timestamp": 1700000000.0, "version": version,
+                                 "model_name": model_name, "entities": []})
+
+def test_equal_version_rows_resolve_to_the_last_written(tmp_path):
+    path = tmp_path / "manifest.tsv"
+    Manifest(path).put_annotation(summary(1, "original"))
+
+    manifests = []
+    for _ in range(3):
+        manifest = Manifest(path)
+        manifest.load()
+        manifests.append(manifest)
+    reader, first, second = manifests
+
+    # Two writers both turned version 1 into version 2
+    first.put_annotation(summary(2, "first"))
+    second.put_annotation(summary(2, "second"))
+
+    for manifest in manifests:
+        manifest.refresh()
+        row = manifest.annotations["doc-1"]
+        assert (row[A_VERSION], row[A_MODEL]) == ("2", "second")
+
+    # Replaying a writer's own rows changes nothing
+    assert second.refresh() == []
+
+def test_saves_from_two_processes_never_share_a_version(tmp_path):
+    first = FileStore(str(tmp_path), refresh_interval=None)
+    second = FileStore(str(tmp_path), refresh_interval=None)
+
+    document_id = first.save_annotation({"document": "Aspirin.", "entities": [], "model_name": "a"})
+    second.refresh()
+    stale = dict(second.find_by_id(document_id), model_name="b")
+
+    # Both save edits of version 1
+    first.save_annotation(dict(first.find_by_id(document_id), model_name="a2"))
+    second.save_annotation(stale)
+
+    assert stale["version"] == 3
+    first.refresh()
+    for store in (first, second):
+        assert store.find_by_id(document_id)["model_name"] == "b"
+        assert store.get_statistics()["models"] == {"b": {"annotations": 1, "needs_review": 0}}
+    first.close()
+    second.close()
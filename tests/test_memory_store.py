@@ -0,0 +1,79 @@
+# tests/test_memory_store.py
+import pytest
+
+from storage.errors import VersionConflictError
+from storage.file_store import FileStore
+from storage.memory_store import MemoryStore
+from storage.retention import RetentionPolicy
+
+@pytest.fixture
+def store(tmp_path):
+    memory_store = MemoryStore(backing_store=FileStore(str(tmp_path)))
+    yield memory_store
+    memory_store.backing_store.close()
+
+def make_annotation() -> dict:
+    return {"document": "Aspirin 81 mg.", "timestamp": 1700000000.0,
+            "entities": [{"type": "MED", "text": "Aspirin", "start": 0, "end": 7}]}
+
+def test_find_by_id_returns_copies(store):
+    annotation = make_annotation()
+    document_id = store.save_annotation(annotation)
+    annotation["entities"].clear()
+
+    first = store.find_by_id(document_id)
+    first["entities"].append({"type": "DOSE"})
+    first["confidence_score"] = 0.0
+
+    cached = store.find_by_id(document_id)
+    assert cached["entities"] == [{"type": "MED", "text": "Aspirin", "start": 0, "end": 7}]
+    assert "confidence_score" not in cached
+    assert store.hits == 2
+
+def test_review_leaves_no_stale_cache_entry(store, monkeypatch):
+    document_id = store.save_annotation(make_annotation())
+    backing_update = store.backing_store.update_after_review
+
+    def update_while_reading(*args, **kwargs):
+        # A concurrent reader caches the pre-review version mid-update
+        store.find_by_id(document_id)
+        return backing_update(*args, **kwargs)
+    monkeypatch.setattr(store.backing_store, "update_after_review", update_while_reading)
+
+    store.update_after_review(document_id, [])
+    assert store.find_by_id(document_id)["human_reviewed"]
+
+    with pytest.raises(VersionConflictError):
+        store.update_after_review(document_id, [], expected_version=1)
+    assert store.find_by_id(document_id)["version"] == 2
+
+def test_writes_from_other_processes_invalidate_the_cache(tmp_path):
+    store = MemoryStore(backing_store=FileStore(str(tmp_path), refresh_interval=0))
+    document_id = store.save_annotation(make_annotation())
+    assert store.find_by_id(document_id)["version"] == 1
+
+    other = FileStore(str(tmp_path))
+    other.update_after_review(document_id, [])
+    other.close()
+    assert store.find_by_id(document_id)["version"] == 2
+    assert store.misses == 1
+    store.close()
+
+def test_archived_annotations_leave_the_cache(store):
+    document_id = store.save_annotation(make_annotation())
+    store.find_by_id(document_id)
+    store.apply_retention(RetentionPolicy(max_hot_annotations=0, keep_pending_review=False))
+
+    assert store.get_cache_metrics()["entries"] == 0
+    assert store.find_by_id(document_id)["version"] == 1
+    assert store.get_cache_metrics()["entries"] == 0
+    assert store.get_statistics()["archived_annotations"] == 1
+
+def test_default_backing_store_does_not_cache_twice(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    document_id = store.save_annotation(make_annotation())
+    assert store.find_by_id(document_id)["version"] == 1
+    assert store.backing_store.cache_size == 0 and not store.backing_store._annotation_lru
+    # Everything else is the backing store's
+    assert store.count() == 1 and store.data_dir == store.backing_store.data_dir
+    store.close()
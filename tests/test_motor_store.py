@@ -0,0 +1,42 @@
+# tests/test_motor_store.py
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from storage.errors import VersionConflictError
+from storage.motor_store import MotorAnnotationStore
+
+def make_annotation(**fields) -> dict:
+    annotation = {"document": "Aspirin 81 mg.", "confidence_score": 0.9, "timestamp": 1700000000.0,
+                  "entities": [{"type": "MED", "text": "Aspirin", "start": 0, "end": 7}]}
+    annotation.update(fields)
+    return annotation
+
+def test_save_upserts_and_bumps_the_stored_version():
+    async def run():
+        store = MotorAnnotationStore(client=mongomock_motor.AsyncMongoMockClient())
+        await store.ensure_indexes()
+
+        # A replacement for an ID the database hasn't seen is inserted
+        assert await store.asave_annotation(make_annotation(_id="imported-1")) == "imported-1"
+        stale = await store.afind_by_id("imported-1")
+        await store.asave_annotation(dict(stale))
+        await store.asave_annotation(dict(stale))
+        return await store.afind_by_id("imported-1")
+
+    assert asyncio.run(run())["version"] == 3
+
+def test_review_with_string_ids_and_conflicts():
+    async def run():
+        store = MotorAnnotationStore(client=mongomock_motor.AsyncMongoMockClient())
+        document_id = await store.asave_annotation(make_annotation(_id="65a1f0c2e4b0a1b2c3d4e5f6"))
+        await store.aupdate_after_review(document_id, [], expected_version=1)
+        with pytest.raises(VersionConflictError):
+            await store.aupdate_after_review(document_id, [], expected_version=1)
+        return await store.afind_by_id(document_id), await store.aget_corrections()
+
+    reviewed, corrections = asyncio.run(run())
+    assert reviewed["human_reviewed"] and reviewed["version"] == 2
+    assert [correction["document_id"] for correction in corrections] == ["65a1f0c2e4b0a1b2c3d4e5f6"]
@@ -0,0 +1,42 @@
+# tests/test_namespaces.py
+import pytest
+
+from storage.file_store import FileStore, list_namespaces
+
+ASPIRIN = [{"type": "MED", "text": "aspirin", "start": 0, "end": 7}]
+
+def test_same_ids_stay_separate_across_namespaces(tmp_path):
+    cardiology = FileStore(str(tmp_path), namespace="cardiology", refresh_interval=0)
+    oncology = FileStore(str(tmp_path), namespace="oncology", refresh_interval=0)
+    cardiology.save_annotation({"_id": "doc-1", "document": "Metoprolol 25 mg.", "entities": ASPIRIN,
+                                "needs_human_review": True, "model_name": "model-a"})
+    oncology.save_annotation({"_id": "doc-1", "document": "Tamoxifen 20 mg.", "entities": [],
+                              "needs_human_review": False, "model_name": "model-b"})
+    oncology.save_annotation({"_id": "doc-2", "document": "Letrozole 2.5 mg.", "entities": []})
+    cardiology.update_after_review("doc-1", [])
+
+    assert cardiology.find_by_id("doc-1")["document"] == "Metoprolol 25 mg."
+    assert (oncology.find_by_id("doc-1")["document"], oncology.find_by_id("doc-1")["version"]) == \
+        ("Tamoxifen 20 mg.", 1)
+    assert cardiology.find_by_id("doc-2") is None
+    assert oncology.get_corrections_for_document("doc-1") == []
+
+    # Statistics are kept per namespace
+    cardiology_stats, oncology_stats = cardiology.get_statistics(), oncology.get_statistics()
+    assert (cardiology_stats["total_annotations"], cardiology_stats["total_corrections"]) == (1, 1)
+    assert (oncology_stats["total_annotations"], oncology_stats["total_corrections"]) == (2, 0)
+    assert set(cardiology_stats["models"]) == {"model-a"}
+    assert "model-a" not in oncology_stats["models"]
+    cardiology.close()
+    oncology.close()
+
+    # The default store beside them is a namespace of its own
+    default = FileStore(str(tmp_path))
+    assert default.find_by_id("doc-1") is None
+    assert default.get_statistics()["total_annotations"] == 0
+    default.close()
+    assert list_namespaces(str(tmp_path)) == ["cardiology", "oncology"]
+
+def test_namespace_names_cannot_escape_the_data_dir(tmp_path):
+    with pytest.raises(ValueError):
+        FileStore(str(tmp_path), namespace="../elsewhere")
@@ -0,0 +1,38 @@
+# tests/test_parquet_export.py
+import pytest
+
+pytest.importorskip("pyarrow")
+import pyarrow.dataset as ds
+
+from storage.file_store import FileStore
+from storage.parquet_export import ParquetExporter, read_dataset
+
+ASPIRIN = [{"type": "MED", "text": "aspirin", "start": 18, "end": 25}]
+
+def export_versions(tmp_path, *versions):
+    """Save and export each version of one annotation in turn"""
+    store = FileStore(str(tmp_path / "store"), refresh_interval=None)
+    exporter = ParquetExporter(store, str(tmp_path / "parquet"))
+    annotation = {"_id": "doc-1", "document": "Patient was given aspirin.", "timestamp": 1700000000.0}
+    for fields in versions:
+        annotation.update(fields)
+        store.save_annotation(annotation)
+        exporter.export()
+    store.close()
+    return tmp_path / "parquet"
+
+def test_filter_applies_to_the_latest_version_only(tmp_path):
+    output_dir = export_versions(tmp_path, {"confidence_score": 0.9, "entities": ASPIRIN},
+                                 {"confidence_score": 0.2, "entities": ASPIRIN})
+
+    confident = ds.field("confidence_score") >= 0.5
+    assert read_dataset(str(output_dir / "documents"), ["document_id"], confident).num_rows == 0
+    assert read_dataset(str(output_dir / "documents"), ["version"]).column("version").to_pylist() == [2]
+    assert read_dataset(str(output_dir / "documents"), ["version"], confident,
+                        latest_only=False).column("version").to_pylist() == [1]
+
+def test_version_without_entities_replaces_old_entity_rows(tmp_path):
+    output_dir = export_versions(tmp_path, {"entities": ASPIRIN}, {"entities": []})
+
+    assert read_dataset(str(output_dir / "entities"), ["text"]).num_rows == 0
+    assert read_dataset(str(output_dir / "entities"), ["text"], latest_only=False).num_rows == 1
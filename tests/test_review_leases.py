@@ -0,0 +1,77 @@
+# tests/test_review_leases.py
+import time
+
+import pytest
+
+from core.human_review import HumanReviewInterface
+from storage.errors import LeaseError
+from storage.file_store import FileStore
+from storage.review_leases import ReviewLeaseManager
+from storage.review_queue import ReviewQueue
+
+ASPIRIN = [{"type": "MED", "text": "aspirin", "start": 0, "end": 7}]
+
+def make_interface(tmp_path, count: int = 3):
+    queue = ReviewQueue(str(tmp_path))
+    store = FileStore(str(tmp_path), review_queue=queue)
+    for i in range(count):
+        document_id = store.save_annotation({"document": f"Aspirin note {i}", "entities": ASPIRIN,
+                                             "confidence_score": 0.1 * (i + 1)})
+        queue.push(store.find_by_id(document_id))
+    leases = ReviewLeaseManager(str(tmp_path))
+    return HumanReviewInterface(store, review_queue=queue, lease_manager=leases), store
+
+def test_expired_leases_go_to_the_next_reviewer(tmp_path):
+    leases = ReviewLeaseManager(str(tmp_path))
+    [lease] = leases.checkout("alice", ["doc-1"], ttl=0.05)
+    assert leases.checkout("bob", ["doc-1"]) == []
+
+    time.sleep(0.1)
+    assert leases.get_lease("doc-1") is None
+    assert not leases.heartbeat(lease["lease_token"])
+    with pytest.raises(LeaseError):
+        leases.validate("doc-1", lease["lease_token"])
+    assert [lease["reviewer_id"] for lease in leases.checkout("bob", ["doc-1"])] == ["bob"]
+    leases.close()
+
+def test_heartbeat_keeps_a_lease_alive(tmp_path):
+    leases = ReviewLeaseManager(str(tmp_path))
+    [lease] = leases.checkout("alice", ["doc-1"], ttl=0.1)
+    for _ in range(3):
+        time.sleep(0.05)
+        assert leases.heartbeat(lease["lease_token"], ttl=0.1)
+    assert leases.validate("doc-1", lease["lease_token"])["reviewer_id"] == "alice"
+    leases.close()
+
+def test_competing_reviewers_never_get_the_same_document(tmp_path, monkeypatch):
+    interface, store = make_interface(tmp_path)
+    alice = interface.checkout_documents("alice", limit=2)
+    bob = interface.checkout_documents("bob", limit=2)
+
+    assert len(alice) == 2 and len(bob) == 1
+    assert not {doc["_id"] for doc in alice} & {doc["_id"] for doc in bob}
+    # Checking out again renews the reviewer's own leases
+    assert [doc["_id"] for doc in interface.checkout_documents("alice", limit=2)] == \
+        [doc["_id"] for doc in alice]
+
+    # Only the documents that end up leased are loaded
+    loaded = []
+    find_by_id = store.find_by_id
+    def recording_find_by_id(document_id):
+        loaded.append(document_id)
+        return find_by_id(document_id)
+    monkeypatch.setattr(store, "find_by_id", recording_find_by_id)
+    assert interface.checkout_documents("carol", limit=2) == []
+    assert loaded == []
+    store.close()
+
+def test_submitting_a_review_releases_the_lease(tmp_path):
+    interface, store = make_interface(tmp_path, count=1)
+    [document] = interface.checkout_documents("alice", limit=1)
+
+    interface.submit_correction(document["_id"], [], lease_token=document["lease_token"])
+    assert interface.lease_manager.get_lease(document["_id"]) is None
+    assert document["_id"] not in interface.review_queue
+    with pytest.raises(LeaseError):
+        interface.submit_correction(document["_id"], ASPIRIN, lease_token=document["lease_token"])
+    store.close()
@@ -0,0 +1,99 @@
+# tests/test_review_router.py
+import mongomock
+
+from core.review_router import ReviewReason, ReviewRouter
+from storage.annotation_store import AnnotationStore
+from storage.file_store import FileStore
+from storage.review_queue import ReviewQueue
+
+def make_annotation(confidence_score: float) -> dict:
+    return {
+        "document": "Patient was given metoprolol.",
+        "entities": [{"type": "MED", "text": "metoprolol", "start": 18, "end": 28,
+                      "validation": {"valid": True, "issues": []}}],
+        "confidence_score": confidence_score,
+        "validation_score": 1.0,
+        "model_name": "test-model"
+    }
+
+def test_route_annotation_does_not_touch_the_queue(tmp_path):
+    queue = ReviewQueue(str(tmp_path))
+    router = ReviewRouter(review_queue=queue, calibration_path=None)
+
+    annotation = router.route_annotation(make_annotation(0.1))
+
+    assert annotation["needs_human_review"]
+    assert "_id" not in annotation
+    assert len(queue) == 0
+
+def test_enqueue_uses_the_id_the_store_assigned(tmp_path):
+    queue = ReviewQueue(str(tmp_path))
+    router = ReviewRouter(review_queue=queue, calibration_path=None)
+    store = FileStore(str(tmp_path / "store"))
+
+    annotation = router.route_annotation(make_annotation(0.1))
+    document_id = store.save_annotation(annotation)
+    router.enqueue(annotation, document_id)
+
+    assert queue.peek() == document_id
+    assert store.find_by_id(queue.peek()) is not None
+    store.close()
+
+def test_enqueue_with_mongo_store_keeps_the_inserted_document(tmp_path):
+    queue = ReviewQueue(str(tmp_path))
+    router = ReviewRouter(review_queue=queue, calibration_path=None)
+    store = AnnotationStore(client=mongomock.MongoClient())
+
+    annotation = router.route_annotation(make_annotation(0.1))
+    document_id = store.save_annotation(annotation)
+    router.enqueue(annotation, document_id)
+
+    assert store.annotations.count_documents({}) == 1
+    assert store.find_by_id(queue.peek())["confidence_score"] == 0.1
+
+def test_enqueue_removes_auto_approved_documents(tmp_path):
+    queue = ReviewQueue(str(tmp_path))
+    router = ReviewRouter(review_queue=queue, calibration_path=None)
+    store = FileStore(str(tmp_path / "store"))
+
+    annotation = router.route_annotation(make_annotation(0.1))
+    document_id = store.save_annotation(annotation)
+    router.enqueue(annotation, document_id)
+
+    annotation["confidence_score"] = 0.99
+    router.route_annotation(annotation)
+    router.enqueue(annotation, store.save_annotation(annotation))
+
+    assert not annotation["needs_human_review"]
+    assert len(queue) == 0
+    store.close()
+
+def test_route_batch_reports_the_evaluated_reasons():
+    router = ReviewRouter(calibration_path=None)
+    invalid = make_annotation(0.99)
+    invalid["entities"][0]["validation"] = {"valid": False, "issues": ["span mismatch"]}
+
+    result = router.route_batch([make_annotation(0.1), make_annotation(0.99), invalid])
+
+    assert [d["reasons"] for d in result["decisions"]] == [
+        ReviewReason.LOW_CONFIDENCE, ReviewReason.NONE, ReviewReason.VALIDATION_ISSUES]
+    assert result["reason_counts"]["LOW_CONFIDENCE"] == 1
+    assert result["reason_counts"]["VALIDATION_ISSUES"] == 1
+    assert result["needs_review"] == 2
+
+def test_enqueue_batch_writes_the_journal_once(tmp_path):
+    queue = ReviewQueue(str(tmp_path))
+    router = ReviewRouter(review_queue=queue, calibration_path=None)
+    queue.push(dict(make_annotation(0.1), _id="approved"))
+
+    annotations = router.route_batch([make_annotation(0.1), make_annotation(0.2),
+                                      make_annotation(0.99)])["annotations"]
+    writes = []
+    append_journal = queue._append_journal
+    queue._append_journal = lambda *records: (writes.append(records), append_journal(*records))
+    router.enqueue_batch(annotations, ["low", "lower", "approved"])
+
+    assert len(writes) == 1
+    assert queue.peek_many() == ["low", "lower"]
+    # The journal replays to the same queue
+    assert ReviewQueue(str(tmp_path)).peek_many() == ["low", "lower"]
@@ -0,0 +1,70 @@
+# tests/test_search_index.py
+import threading
+
+import pytest
+
+from storage.file_store import FileStore
+from storage.retention import RetentionPolicy
+from storage.search_index import SearchIndex
+
+def test_entities_without_type_or_text_are_indexed(tmp_path):
+    index = SearchIndex(tmp_path)
+
+    index.add("doc-1", 1, "Patient was given aspirin.",
+              [{"type": None, "text": "aspirin"}, {"type": "MED", "text": None},
+               {"type": "MED", "text": "aspirin"}])
+
+    assert index.document_ids() == ["doc-1"]
+    assert index.version("doc-1") == 1
+
+def test_file_store_only_indexes_when_asked_to(tmp_path):
+    store = FileStore(str(tmp_path / "plain"))
+    store.save_annotation({"document": "Patient was given aspirin.", "entities": []})
+    with pytest.raises(ValueError):
+        store.search("aspirin")
+    store.close()
+    assert not (tmp_path / "plain" / "search").exists()
+
+    store = FileStore(str(tmp_path / "indexed"), search_index=True)
+    store.save_annotation({"document": "Patient was given aspirin.", "entities": []})
+    assert store.search("aspirin")["total"] == 1
+    store.close()
+
+def test_search_does_not_wait_for_writers(tmp_path):
+    store = FileStore(str(tmp_path), search_index=True)
+    store.save_annotation({"document": "Patient was given aspirin.", "entities": []})
+
+    results = []
+    with store._lock:
+        # Another process holding the store lock must not block indexing or searching
+        searcher = threading.Thread(target=lambda: results.append(store.search("aspirin")), daemon=True)
+        searcher.start()
+        searcher.join(timeout=5)
+        assert not searcher.is_alive()
+    assert results[0]["total"] == 1
+    store.close()
+
+def test_limit_counts_only_hot_annotations(tmp_path, monkeypatch):
+    store = FileStore(str(tmp_path), refresh_interval=None, search_index=True)
+    document_ids = [store.save_annotation({"document": f"Aspirin note {i}", "entities": [],
+                                           "timestamp": 1700000000.0 + i}) for i in range(4)]
+    store.search("aspirin")
+    # Saved again, the two oldest are now the most recently indexed
+    for document_id in document_ids[:2]:
+        store.save_annotation(store.find_by_id(document_id))
+    assert store.search("aspirin", limit=2)["total"] == 4
+
+    # Another process archives them while the search runs
+    sync = store._sync_search_index
+    def sync_then_archive():
+        sync()
+        archiver = FileStore(str(tmp_path), refresh_interval=None)
+        archiver.apply_retention(RetentionPolicy(max_hot_annotations=2, keep_pending_review=False))
+        archiver.close()
+        store.refresh()
+    monkeypatch.setattr(store, "_sync_search_index", sync_then_archive)
+
+    results = store.search("aspirin", limit=2, projection=["_id"])
+    assert results["total"] == 2
+    assert [item["_id"] for item in results["items"]] == document_ids[:1:-1]
+    store.close()
@@ -0,0 +1,66 @@
+# tests/test_segment_store.py
+from storage.segment_store import SegmentStore
+
+ASPIRIN = [{"type": "MED", "text": "aspirin", "start": 0, "end": 7}]
+CORRECTED = [{"type": "MEDICATION", "text": "aspirin", "start": 0, "end": 7}]
+
+def test_annotations_and_corrections_round_trip(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    document_id = store.save_annotation({"document": "Aspirin 81 mg daily.", "entities": ASPIRIN,
+                                         "confidence_score": 0.4, "needs_human_review": True})
+    assert [doc["_id"] for doc in store.find_by_review_status(needs_review=True)] == [document_id]
+
+    store.update_after_review(document_id, CORRECTED)
+    annotation = store.find_by_id(document_id)
+    assert (annotation["entities"], annotation["version"]) == (CORRECTED, 2)
+    [correction] = store.get_corrections_for_document(document_id)
+    assert (correction["original_entities"], correction["corrected_entities"]) == (ASPIRIN, CORRECTED)
+    assert store.get_statistics()["total_corrections"] == 1
+    store.close()
+
+def test_saving_a_stale_copy_still_bumps_the_version(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    document_id = store.save_annotation({"document": "Aspirin.", "entities": ASPIRIN})
+    stale = store.find_by_id(document_id)
+    store.save_annotation(store.find_by_id(document_id))
+    store.save_annotation(stale)
+    assert store.find_by_id(document_id)["version"] == 3
+
+    # Repeated within one batch, each copy gets its own version
+    store.save_annotations([store.find_by_id(document_id), store.find_by_id(document_id)])
+    assert store.find_by_id(document_id)["version"] == 5
+    store.close()
+
+def test_compaction_keeps_live_records(tmp_path):
+    store = SegmentStore(str(tmp_path), max_segment_bytes=1024, compaction_threshold=0.5)
+    document_ids = [store.save_annotation({"document": f"Note {i}", "entities": ASPIRIN}) for i in range(20)]
+    for document_id in document_ids:
+        store.save_annotation(store.find_by_id(document_id))
+    store.update_after_review(document_ids[0], CORRECTED)
+    segments_before = store.get_statistics()["segments"]
+
+    assert store.compact() > 0
+    stats = store.get_statistics()
+    assert stats["segments"] < segments_before
+    assert [store.find_by_id(document_id)["version"] for document_id in document_ids] == [3] + [2] * 19
+    assert len(store.get_corrections_for_document(document_ids[0])) == 1
+    store.close()
+
+def test_reopen_rebuilds_the_index_and_skips_a_torn_write(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    document_id = store.save_annotation({"document": "Aspirin.", "entities": ASPIRIN})
+    store.update_after_review(document_id, CORRECTED)
+    store.close()
+
+    # A crash in the middle of an append leaves a record without its newline
+    [segment] = (tmp_path / "segments").glob("segment-*.log")
+    with open(segment, "ab") as f:
+        f.write(b"A\tpartial")
+
+    store = SegmentStore(str(tmp_path))
+    assert store.find_by_id(document_id)["version"] == 2
+    assert store.get_statistics()["total_annotations"] == 1
+    assert len(store.get_corrections_for_document(document_id)) == 1
+    store.save_annotation(store.find_by_id(document_id))
+    assert store.find_by_id(document_id)["version"] == 3
+    store.close()
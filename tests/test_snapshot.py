@@ -0,0 +1,75 @@
+# tests/test_snapshot.py
+import pickle
+
+import pytest
+
+from storage import snapshot
+from storage.file_store import FileStore
+
+class Exploit:
+    """Unpickling this would run code"""
+    def __reduce__(self):
+        return (exec, ("raise SystemExit('pickle snapshot was loaded')",))
+
+def make_store(path) -> FileStore:
+    store = FileStore(str(path), snapshot_interval=1, search_index=True)
+    for i in range(3):
+        store.save_annotation({"document": f"Patient {i} was given aspirin.", "timestamp": 1700000000.0 + i,
+                               "entities": [{"type": "MED", "text": "aspirin", "start": 20, "end": 27}]})
+    store.search("aspirin")
+    store.close()
+    return store
+
+def test_pickle_snapshots_are_never_loaded(tmp_path):
+    store = make_store(tmp_path)
+    # Snapshots in the pickle format of earlier releases
+    payload = b"ASNAPP1\n" + pickle.dumps({"snapshot_version": 1, "exploit": Exploit()})
+    store._snapshot_path.write_bytes(payload)
+    (tmp_path / "search" / "search.snapshot").write_bytes(payload)
+
+    reopened = FileStore(str(tmp_path), search_index=True)
+    assert reopened.get_statistics()["total_annotations"] == 3
+    assert reopened.search("aspirin")["total"] == 3
+    reopened.close()
+
+def test_without_msgpack_indexes_are_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "msgpack", None)
+    store = make_store(tmp_path)
+
+    assert not store._snapshot_path.exists()
+    assert not (tmp_path / "search" / "search.snapshot").exists()
+    reopened = FileStore(str(tmp_path), search_index=True)
+    assert reopened.get_statistics()["total_annotations"] == 3
+    assert reopened.search("aspirin")["total"] == 3
+    reopened.close()
+
+def test_snapshots_are_taken_by_default(tmp_path):
+    pytest.importorskip("msgpack")
+    store = FileStore(str(tmp_path))
+    for i in range(3):
+        store.save_annotation({"document": f"Note {i}", "entities": []})
+    store.close()
+
+    # A store opened without a snapshot parses the manifest, so it takes one for the next open
+    FileStore(str(tmp_path)).close()
+    assert store._snapshot_path.exists()
+    reopened = FileStore(str(tmp_path), snapshot_interval=None)
+    assert reopened._manifest.line_count == reopened._snapshot_lines == 3
+    assert reopened.get_statistics()["total_annotations"] == 3
+    reopened.close()
+
+def test_snapshot_interval_bounds_the_replayed_tail(tmp_path):
+    pytest.importorskip("msgpack")
+    store = FileStore(str(tmp_path), snapshot_interval=2)
+    for i in range(7):
+        store.save_annotation({"document": f"Note {i}", "entities": []})
+        assert store._manifest.line_count - store._snapshot_lines < 2
+    store.close()
+
+def test_msgpack_snapshots_round_trip():
+    pytest.importorskip("msgpack")
+    state = {"line_count": 3, "rows": [["A", "doc-1"]], "data": b"\x00\x01"}
+
+    decoded = snapshot.decode_snapshot(snapshot.encode_snapshot(state))
+
+    assert decoded == dict(state, snapshot_version=snapshot.SNAPSHOT_VERSION)
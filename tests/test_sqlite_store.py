@@ -0,0 +1,87 @@
+# tests/test_sqlite_store.py
+import pytest
+
+from storage.file_store import FileStore
+from storage.sqlite_store import SQLiteStore
+
+def make_annotations() -> list:
+    annotations = []
+    for i in range(7):
+        annotations.append({
+            "document": f"Note {i}: patient was given aspirin.",
+            "entities": [{"type": "MED", "text": "aspirin", "start": 24, "end": 31,
+                          "validation": {"valid": i % 3 != 0}}] +
+                        ([{"type": "DOSE", "text": "81 mg", "start": 0, "end": 5}] if i % 2 else []),
+            "confidence_score": i / 10,
+            "validation_score": 1.0,
+            "needs_human_review": i < 4,
+            "model_name": "model-a" if i % 2 else "model-b",
+            "timestamp": 1700000000.0 + i
+        })
+    return annotations
+
+@pytest.fixture
+def stores(tmp_path):
+    sqlite_store = SQLiteStore(str(tmp_path / "sqlite"))
+    file_store = FileStore(str(tmp_path / "file"))
+    for store in (sqlite_store, file_store):
+        store.save_annotations(make_annotations())
+        first = store.query({"needs_review": True}, limit=1)["items"][0]
+        store.update_after_review(first["_id"], first["entities"][:1])
+    yield sqlite_store, file_store
+    sqlite_store.close()
+    file_store.close()
+
+def test_statistics_match_file_store(stores):
+    sqlite_store, file_store = stores
+
+    assert sqlite_store.get_statistics() == file_store.get_statistics()
+    assert sqlite_store.get_statistics()["models"]["model-a"] == {"annotations": 3, "needs_review": 2}
+
+@pytest.mark.parametrize("filters", [
+    None,
+    {"needs_review": True},
+    {"human_reviewed": False},
+    {"model_name": "model-a"},
+    {"min_confidence": 0.2, "max_confidence": 0.5},
+    {"start": 1700000002.0, "end": 1700000005.0},
+    {"entity_type": "DOSE"},
+])
+def test_query_and_count_match_file_store(stores, filters):
+    sqlite_store, file_store = stores
+
+    def all_pages(store, projection):
+        items, cursor = [], None
+        while True:
+            page = store.query(filters, projection=projection, limit=2, cursor=cursor)
+            items.extend(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return items
+
+    expected = [item["confidence_score"] for item in all_pages(file_store, ["confidence_score"])]
+    assert [item["confidence_score"] for item in all_pages(sqlite_store, ["confidence_score"])] == expected
+    assert [item["confidence_score"] for item in all_pages(sqlite_store, None)] == expected
+    assert sqlite_store.count(filters) == file_store.count(filters) == len(expected)
+
+def test_query_derives_entity_fields(stores):
+    sqlite_store, _ = stores
+
+    item = sqlite_store.query({"model_name": "model-a"}, projection=["entity_types", "invalid_entities"],
+                              limit=1)["items"][0]
+
+    assert item["entity_types"] == {"MED": [1, 0], "DOSE": [1, 0]}
+    assert item["invalid_entities"] == 0
+
+def test_saving_a_stale_copy_does_not_regress_the_version(tmp_path):
+    store = SQLiteStore(str(tmp_path))
+    document_id = store.save_annotation({"document": "Aspirin.", "entities": []})
+    stale = store.find_by_id(document_id)
+    store.update_after_review(document_id, [])
+    store.save_annotation(stale)
+    assert store.find_by_id(document_id)["version"] == 3
+
+    store.save_annotations([store.find_by_id(document_id), store.find_by_id(document_id)])
+    assert store.find_by_id(document_id)["version"] == 5
+    assert store.query({"needs_review": False}, projection=["version"])["items"][0]["version"] == 5
+    store.close()
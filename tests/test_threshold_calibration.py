@@ -0,0 +1,40 @@
+# tests/test_threshold_calibration.py
+import json
+
+from core.review_router import ReviewRouter
+from core.threshold_calibration import correction_outcomes
+
+def write_calibration(path) -> str:
+    path.write_text(json.dumps({
+        "global": {"confidence_threshold": 0.9},
+        "entity_types": {"MED": {"confidence_threshold": 0.95}}
+    }))
+    return str(path)
+
+def test_calibration_replaces_the_default_threshold(tmp_path):
+    router = ReviewRouter(calibration_path=write_calibration(tmp_path / "calibration.json"))
+
+    assert router.confidence_threshold == 0.9
+    assert router.entity_thresholds == {"MED": 0.95}
+
+def test_explicit_threshold_is_not_overridden(tmp_path):
+    router = ReviewRouter(confidence_threshold=0.5,
+                          calibration_path=write_calibration(tmp_path / "calibration.json"))
+
+    assert router.confidence_threshold == 0.5
+    assert router._confidence_threshold_for([{"type": "MED"}]) == 0.5
+
+def test_outcomes_tolerate_missing_entity_fields():
+    corrections = [{
+        "original_confidence": 0.4,
+        "original_entities": [{"type": "MED", "text": "aspirin", "start": 0, "end": 7},
+                              {"type": None, "text": "dose"}],
+        "corrected_entities": [{"type": "MED", "text": "aspirin", "start": 0, "end": 7},
+                               {"type": "DOSE", "text": "dose", "start": None, "end": 12}]
+    }]
+
+    samples = correction_outcomes(corrections)
+
+    assert samples["__all__"] == [(0.4, 1)]
+    assert samples["MED"] == [(0.4, 0)]
+    assert samples["DOSE"] == [(0.4, 1)]
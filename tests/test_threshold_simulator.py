@@ -0,0 +1,16 @@
+# tests/test_threshold_simulator.py
+from core.threshold_simulator import _corrected_document_ids
+
+def test_reordered_or_revalidated_entities_are_not_corrections():
+    original = [{"type": "MED", "text": "aspirin", "start": 0, "end": 7, "validation": {"valid": True}},
+                {"type": "DOSE", "text": "81 mg", "start": 8, "end": 13}]
+    corrections = [
+        # Same entities in a different order, without validation details
+        {"document_id": "a", "original_entities": original,
+         "corrected_entities": [{"type": "DOSE", "text": "81 mg", "start": 8, "end": 13},
+                                {"type": "MED", "text": "aspirin", "start": 0, "end": 7}]},
+        {"document_id": "b", "original_entities": original,
+         "corrected_entities": original[:1]},
+    ]
+
+    assert _corrected_document_ids(corrections) == {"b"}
@@ -0,0 +1,72 @@
+# tests/test_transfer.py
+import json
+
+import pytest
+
+from storage.file_store import FileStore
+from storage.memory_store import MemoryStore
+from storage.retention import RetentionPolicy
+from storage.transfer import BulkTransfer, JSONLSink, JSONLSource, StoreSink, StoreSource, checksum_location
+
+def make_store(path, count: int = 4, archived: int = 2):
+    store = FileStore(str(path), refresh_interval=None)
+    document_ids = [store.save_annotation({"document": f"Note {i}: aspirin.", "timestamp": 1700000000.0 + i,
+                                           "entities": [{"type": "MEDICATION", "text": "aspirin"}]})
+                    for i in range(count)]
+    store.apply_retention(RetentionPolicy(max_hot_annotations=count - archived, keep_pending_review=False))
+    return store, document_ids
+
+def test_file_store_iterates_hot_and_archived_annotations(tmp_path):
+    store, document_ids = make_store(tmp_path / "store")
+    assert store.get_statistics()["archived_annotations"] == 2
+
+    annotations = list(store.iter_annotations())
+    assert [annotation["_id"] for annotation in annotations] == sorted(document_ids)
+    assert all(annotation["document"].startswith("Note") for annotation in annotations)
+    after = sorted(document_ids)[1]
+    assert [annotation["_id"] for annotation in store.iter_annotations(after, batch_size=1)] == \
+        sorted(document_ids)[2:]
+
+    # Exports get their own copies, not the store's cached objects
+    annotations[0]["document"] = "changed"
+    assert store.find_by_id(annotations[0]["_id"])["document"] != "changed"
+    store.close()
+
+def test_memory_store_iterates_its_backing_store(tmp_path):
+    store, document_ids = make_store(tmp_path / "store")
+    memory = MemoryStore(backing_store=store)
+    assert [annotation["_id"] for annotation in memory.iter_annotations()] == sorted(document_ids)
+    store.close()
+
+def test_export_includes_archived_annotations_and_verifies(tmp_path):
+    store, document_ids = make_store(tmp_path / "store")
+    store.close()
+    destination = tmp_path / "annotations.jsonl"
+
+    transfer = BulkTransfer(StoreSource(FileStore(str(tmp_path / "store"), refresh_interval=None)),
+                            JSONLSink(str(destination)), str(tmp_path / "checkpoint.json"),
+                            workers=0, report_interval=None)
+    result = transfer.run()
+    assert result["records"] == len(document_ids)
+    verified = checksum_location(str(destination), workers=0)
+    assert (verified["records"], verified["checksum"]) == (result["records"], result["checksum"])
+    assert verified == checksum_location(f"filestore:{tmp_path / 'store'}", workers=0)
+
+def test_mongo_import_keeps_object_ids(tmp_path, mongo_client):
+    bson = pytest.importorskip("bson")
+    from storage.annotation_store import AnnotationStore
+
+    object_id = str(bson.ObjectId())
+    source = tmp_path / "annotations.jsonl"
+    source.write_text(json.dumps({"_id": object_id, "document": "Aspirin.", "timestamp": "2024-01-01",
+                                  "entities": []}) + "\n" +
+                      json.dumps({"_id": "note-1", "document": "Ibuprofen.", "timestamp": "2024-01-02",
+                                  "entities": []}) + "\n")
+
+    store = AnnotationStore(client=mongo_client)
+    BulkTransfer(JSONLSource(str(source)), StoreSink(store, object_ids=True),
+                 str(tmp_path / "checkpoint.json"), workers=0, report_interval=None).run()
+
+    assert isinstance(store.annotations.find_one({"document": "Aspirin."})["_id"], bson.ObjectId)
+    assert store.find_by_id(object_id)["document"] == "Aspirin."
+    assert store.find_by_id("note-1")["document"] == "Ibuprofen."
@@ -0,0 +1,83 @@
+# tests/test_version_history.py
+import time
+
+import pytest
+
+from storage.file_store import FileStore
+
+ASPIRIN = [{"type": "MED", "text": "aspirin", "start": 18, "end": 25}]
+CORRECTED = [{"type": "MEDICATION", "text": "aspirin", "start": 18, "end": 25}]
+
+def review_one(store) -> str:
+    document_id = store.save_annotation({"document": "Patient was given aspirin.", "entities": ASPIRIN})
+    store.update_after_review(document_id, CORRECTED)
+    return document_id
+
+def test_history_is_only_kept_when_asked_for(tmp_path):
+    store = FileStore(str(tmp_path))
+    document_id = review_one(store)
+    with pytest.raises(ValueError):
+        store.get_version(document_id, 1)
+    [correction] = store.get_corrections_for_document(document_id)
+    assert correction["original_entities"] == ASPIRIN
+    store.close()
+    assert not (tmp_path / "history").exists()
+
+def test_stores_with_history_keep_it_until_it_is_dropped(tmp_path):
+    store = FileStore(str(tmp_path), keep_history=True)
+    document_id = review_one(store)
+    store.close()
+
+    store = FileStore(str(tmp_path))
+    assert store.get_version(document_id, 1)["entities"] == ASPIRIN
+    with pytest.raises(ValueError):
+        FileStore(str(tmp_path), keep_history=False)
+
+    # Dropping the history puts the original entities back into the corrections
+    assert store.compact_history(keep_versions=0)["versions_dropped"] == 1
+    store.close()
+    store = FileStore(str(tmp_path), keep_history=False)
+    [correction] = store.get_corrections_for_document(document_id)
+    assert (correction["original_entities"], correction["corrected_entities"]) == (ASPIRIN, CORRECTED)
+    store.close()
+
+def test_versions_are_rebuilt_from_reverse_deltas(tmp_path):
+    store = FileStore(str(tmp_path), keep_history=True)
+    document_id = store.save_annotation({"document": "Patient was given aspirin.", "entities": ASPIRIN,
+                                         "timestamp": 1700000000.0})
+    store.update_after_review(document_id, CORRECTED)
+    annotation = store.find_by_id(document_id)
+    time.sleep(0.01)
+    store.save_annotation(dict(annotation, document="Patient was given aspirin 81 mg."))
+
+    history = store.get_history(document_id)
+    assert [entry["version"] for entry in history] == [3, 2, 1]
+    assert history[0]["superseded"] is None
+    first_superseded, second_superseded = history[2]["superseded"], history[1]["superseded"]
+    assert first_superseded < second_superseded
+
+    first, second, third = (store.get_version(document_id, version) for version in (1, 2, 3))
+    assert (first["entities"], first.get("human_reviewed", False)) == (ASPIRIN, False)
+    assert (second["entities"], second["human_reviewed"], second["document"]) == \
+        (CORRECTED, True, "Patient was given aspirin.")
+    assert third == store.find_by_id(document_id)
+
+    assert store.as_of(document_id, 1699999999.0) is None
+    assert store.as_of(document_id, 1700000000.0) == first
+    assert store.as_of(document_id, second_superseded)["version"] == 3
+    assert store.as_of(document_id, first_superseded) == second
+    store.close()
+
+def test_correction_reads_flush_the_writer_once(tmp_path, monkeypatch):
+    store = FileStore(str(tmp_path), keep_history=True, write_behind=True)
+    document_ids = [review_one(store) for _ in range(3)]
+    flushes = []
+    flush = store._writer.flush
+    monkeypatch.setattr(store._writer, "flush", lambda: flushes.append(1) or flush())
+
+    corrections = store.get_corrections()
+    assert [correction["original_entities"] for correction in corrections] == [ASPIRIN] * 3
+    assert len(flushes) == 1
+    assert [len(store.get_corrections_for_document(document_id)) for document_id in document_ids] == [1, 1, 1]
+    assert len(flushes) == 4
+    store.close()